@@ -0,0 +1,113 @@
+"""
+Action traces for deterministic regression replays.
+
+A recorded run keeps, per step, what was done (intent, tap point or the
+model's function calls) and the screen fingerprint before and after it.
+Replaying a trace re-executes those actions directly; the model is only
+asked again once a live screen stops matching the recorded one (within
+SCREEN_CACHE_MAX_DISTANCE bits of dhash), and from there the run
+continues live.
+
+Traces are JSON files under ACTION_TRACE_DIR:
+
+    <dir>/agent_loop/<test_case>.json
+    <dir>/vision/<name>.json
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+
+from agent.screen_cache import dhash, hamming
+from config.settings import ACTION_TRACE_DIR, SCREEN_CACHE_MAX_DISTANCE
+
+RUN_MODES = ("live", "record", "replay")
+
+
+def fingerprint(png_bytes: bytes) -> str:
+    return f"{dhash(png_bytes):016x}"
+
+
+def same_screen(a, b, max_distance: int = SCREEN_CACHE_MAX_DISTANCE) -> bool:
+    """Fingerprints (hex strings) close enough to count as the same screen."""
+    if a is None or b is None:
+        return a is b
+    return hamming(int(a, 16), int(b, 16)) <= max_distance
+
+
+def trace_name(text: str) -> str:
+    """File-safe name for a test case or start URL."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", text).strip("_") or "trace"
+
+
+def check_mode(mode: str) -> str:
+    if mode not in RUN_MODES:
+        raise ValueError(f"Unknown run mode {mode!r}; expected one of {', '.join(RUN_MODES)}")
+    return mode
+
+
+class ActionTrace:
+    def __init__(self, kind: str, name: str, steps=None, meta=None, root: str = ACTION_TRACE_DIR):
+        self.kind = kind
+        self.name = trace_name(name)
+        self.steps = list(steps or [])
+        self.meta = dict(meta or {})
+        self.root = root
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.root, self.kind, f"{self.name}.json")
+
+    def add(self, **step):
+        self.steps.append(step)
+
+    def step(self, index: int):
+        """Recorded step `index`, or None past the end of the trace."""
+        return self.steps[index] if index < len(self.steps) else None
+
+    def save(self) -> str:
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        data = {
+            "kind": self.kind,
+            "name": self.name,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "meta": self.meta,
+            "steps": self.steps,
+        }
+        # Own temp file per writer: parallel runs of one test case must not share it
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{self.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, default=str)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return self.path
+
+    @classmethod
+    def load(cls, kind: str, name: str, root: str = ACTION_TRACE_DIR):
+        """The recorded trace, or None if there isn't one."""
+        trace = cls(kind, name, root=root)
+        if not os.path.isfile(trace.path):
+            return None
+        with open(trace.path, encoding="utf-8") as f:
+            data = json.load(f)
+        trace.steps = data.get("steps", [])
+        trace.meta = data.get("meta", {})
+        return trace
+
+
+def candidate_for_trace(candidate) -> dict:
+    """The model turn as JSON, for a vision trace step."""
+    return candidate.content.model_dump(mode="json", exclude_none=True)
+
+
+def replayed_candidate(step: dict):
+    """Rebuild the recorded model turn so the vision loop can run it again."""
+    from google.genai import types
+
+    return types.Candidate(content=types.Content.model_validate(step["content"]))
@@ -0,0 +1,130 @@
+"""
+Lazy Playwright browser with a small pool of warm contexts.
+
+Nothing is launched until the first session is requested. Contexts are
+kept after use and reset (cookies, storage, a fresh page) before they are
+handed out again, so back-to-back assessments skip the Chromium cold
+start and the context setup.
+
+Sync Playwright objects are bound to the thread that created them, so a
+pool must be used from a single thread. For concurrent runs use
+agent.vision_async.
+"""
+
+from contextlib import contextmanager
+
+from playwright.sync_api import sync_playwright
+
+from agent.computer_use import SCREEN_WIDTH, SCREEN_HEIGHT
+from config.settings import BROWSER_HEADLESS, BROWSER_POOL_SIZE
+
+
+class BrowserPool:
+    def __init__(self, headless: bool = BROWSER_HEADLESS, size: int = BROWSER_POOL_SIZE,
+                 viewport: dict = None):
+        self.headless = headless
+        self.size = size
+        self.viewport = viewport or {"width": SCREEN_WIDTH, "height": SCREEN_HEIGHT}
+
+        self._playwright = None
+        self._browser = None
+        self._idle = []         # warm (context, page, origins) ready for reuse
+        self.launches = 0
+        self.reuses = 0
+
+    def _ensure_browser(self):
+        if self._browser is None or not self._browser.is_connected():
+            if self._playwright is None:
+                self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=self.headless)
+            self._idle = []
+            self.launches += 1
+        return self._browser
+
+    def _new_context(self):
+        context = self._ensure_browser().new_context(viewport=self.viewport)
+        origins = set()
+        return context, self._new_page(context, origins), origins
+
+    @staticmethod
+    def _new_page(context, origins):
+        page = context.new_page()
+
+        def remember_origin(frame):
+            url = frame.url
+            if url.startswith("http"):
+                origins.add("/".join(url.split("/", 3)[:3]))
+
+        page.on("framenavigated", remember_origin)
+        return page
+
+    def _reset(self, context, origins):
+        """
+        Bring a used context back to a clean state. sessionStorage and
+        in-page JS state belong to the page, so it is swapped for a fresh
+        one; returns the page to hand out next.
+        """
+        fresh = self._new_page(context, origins)
+        for old in context.pages:
+            if old is not fresh:
+                old.close()
+        context.clear_cookies()
+        context.clear_permissions()
+        if origins:
+            cdp = context.new_cdp_session(fresh)
+            try:
+                for origin in origins:
+                    cdp.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            finally:
+                cdp.detach()
+            origins.clear()
+        return fresh
+
+    def acquire(self):
+        """Return (context, page, origins); prefer a warm context."""
+        self._ensure_browser()
+        if self._idle:
+            self.reuses += 1
+            return self._idle.pop()
+        return self._new_context()
+
+    def release(self, entry):
+        context, page, origins = entry
+        if len(self._idle) < self.size and not page.is_closed():
+            try:
+                self._idle.append((context, self._reset(context, origins), origins))
+                return
+            except Exception as e:
+                print(f"Warning: could not reset browser context, discarding it: {e}")
+        context.close()
+
+    @contextmanager
+    def session(self):
+        """Yield a clean page; the context goes back to the pool afterwards."""
+        entry = self.acquire()
+        try:
+            yield entry[1]
+        finally:
+            self.release(entry)
+
+    def close(self):
+        for context, _, _ in self._idle:
+            context.close()
+        self._idle = []
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+
+_default_pool = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Process-wide pool built from config.settings on first use."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = BrowserPool()
+    return _default_pool
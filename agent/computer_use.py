@@ -0,0 +1,403 @@
+"""
+Shared pieces of the Gemini computer-use loop.
+
+Used by both the sync loop (agent/vision.py) and the asyncio loop
+(agent/vision_async.py). Nothing here touches a browser at import time.
+"""
+
+import bisect
+import json
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+from agent.prompts import MYSTERY_SHOPPER_SYSTEM_PROMPT
+from config.settings import PRINT_THOUGHTS
+
+load_dotenv()
+
+COMPUTER_USE_MODEL = "gemini-2.5-computer-use-preview-10-2025"
+START_URL = "https://specterai.duckdns.org/"
+
+SCREEN_WIDTH = 375
+SCREEN_HEIGHT = 812
+
+_client = None
+
+
+def get_client():
+    """
+    Process-wide genai client (sync API on .models, async on .aio.models).
+
+    With GEMINI_REPLAY_MODE=record|replay the client goes through the
+    ai.replay record/replay layer; replay needs no API key or network.
+    """
+    global _client
+    if _client is None:
+        mode = (os.getenv("GEMINI_REPLAY_MODE") or "passthrough").lower()
+        if mode == "passthrough":
+            _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        else:
+            from ai.replay import wrap_client
+            real = None if mode == "replay" else genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+            _client = wrap_client(real, mode=mode)
+    return _client
+
+
+def build_config():
+    """
+    Computer-use tool config with the mystery shopper system prompt.
+    Thought summaries are only requested when they will be printed.
+    """
+    return types.GenerateContentConfig(
+        tools=[types.Tool(computer_use=types.ComputerUse(
+            environment=types.Environment.ENVIRONMENT_BROWSER
+        ))],
+        thinking_config=types.ThinkingConfig(include_thoughts=PRINT_THOUGHTS),
+        system_instruction=MYSTERY_SHOPPER_SYSTEM_PROMPT,
+    )
+
+
+_DECODER = json.JSONDecoder()
+
+# Where a JSON object can start: "{" then a key or "}"
+_OBJECT_START = re.compile(r'\{\s*["}]')
+
+# Characters that can change scanner state inside an object
+_JSON_TOKENS = re.compile(r'[{}"\\]')
+
+# A failed in-place decode costs O(position) (the error locates its line
+# and column from the start of the text); after this many, decode slices
+_IN_PLACE_FAILURES = 8
+
+
+def _decode_in_place(text: str, start: int):
+    """(object, end) for a JSON object at `start`, or (None, start)."""
+    try:
+        obj, end = _DECODER.raw_decode(text, start)
+    except (ValueError, RecursionError):   # RecursionError: absurdly deep nesting
+        return None, start
+    return (obj, end) if isinstance(obj, dict) else (None, start)
+
+
+def _decode_span(text: str, start: int, end: int):
+    """
+    (object, None) if text[start:end] is one JSON object, else (None, the
+    absolute position where decoding failed). Decodes a slice, so building
+    the error never rescans text before `start`.
+    """
+    chunk = text[start:end]
+    try:
+        obj, obj_end = _DECODER.raw_decode(chunk)
+    except json.JSONDecodeError as e:
+        return None, start + e.pos
+    except (ValueError, RecursionError):   # RecursionError: absurdly deep nesting
+        return None, start
+    if isinstance(obj, dict) and obj_end == len(chunk):
+        return obj, None
+    return None, start + obj_end
+
+
+def _balanced_spans(text: str, start: int):
+    """
+    One pass from the "{" at `start`, string-aware. Returns the end of
+    that brace's balanced span (-1 if it never closes) and every balanced
+    span found inside it, as (start, end) pairs.
+    """
+    depth = 0
+    in_string = False
+    skip = -1
+    opened = []
+    spans = []
+    for match in _JSON_TOKENS.finditer(text, start):
+        i = match.start()
+        if i == skip:
+            continue
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                skip = i + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+            opened.append(i)
+        elif ch == "}":
+            depth -= 1
+            span_start = opened.pop()
+            if depth == 0:
+                return i + 1, spans
+            spans.append((span_start, i + 1))
+    return -1, spans
+
+
+def extract_json_objects(text: str) -> list:
+    """
+    Every top-level JSON object in `text` (prose, code fences and all),
+    nested objects included, in order.
+
+    Valid objects are decoded in place by the C JSON scanner. A failed
+    in-place decode costs time proportional to its position, so after a
+    few failures each plausible start is first brace-scanned (string-aware)
+    to where it closes and only that slice is decoded: a failure then
+    costs the span, not the text before it. Where a span is not valid JSON, the balanced objects inside it are tried outermost first,
+    skipping any that contain a position some enclosing decode already
+    failed at (the same bad token fails them too). Each character is
+    scanned and decoded a bounded number of times, so long or adversarial
+    replies cost linear time, with no regex backtracking.
+    """
+    found = []
+    pos = 0
+    in_place = _IN_PLACE_FAILURES
+    while True:
+        match = _OBJECT_START.search(text, pos)
+        if match is None:
+            break
+        start = match.start()
+
+        if in_place:
+            obj, end = _decode_in_place(text, start)
+            if obj is not None:
+                found.append(obj)
+                pos = end
+                continue
+            in_place -= 1
+        end, spans = _balanced_spans(text, start)
+
+        if end > 0:
+            obj, failed_at = _decode_span(text, start, end)
+            if obj is not None:
+                found.append(obj)
+                pos = end
+                continue
+            failures = [failed_at]
+        else:
+            failures = []   # never closes: only the spans inside can be JSON
+
+        # Not JSON from here: salvage the outermost valid objects inside it
+        covered = start
+        for span_start, span_end in sorted(spans):
+            if span_start < covered or not _OBJECT_START.match(text, span_start):
+                continue
+            i = bisect.bisect_left(failures, span_start)
+            if i < len(failures) and failures[i] < span_end:
+                continue
+            obj, failed_at = _decode_span(text, span_start, span_end)
+            if obj is not None:
+                found.append(obj)
+                covered = span_end
+            else:
+                bisect.insort(failures, failed_at)
+        pos = end if end > 0 else len(text)
+    return found
+
+
+def _screen_analysis(obj):
+    """First dict with a "screen_type" in `obj` or anything nested in it."""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            if "screen_type" in item:
+                return item
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+    return None
+
+
+def extract_json_from_text(text: str) -> dict:
+    """
+    The screen analysis in a model reply: the first JSON object with a
+    "screen_type" (at any depth), else the first JSON object, else None.
+    """
+    objects = extract_json_objects(text)
+    for obj in objects:
+        analysis = _screen_analysis(obj)
+        if analysis is not None:
+            return analysis
+    return objects[0] if objects else None
+
+
+def denormalize_x(x: int, screen_width: int) -> int:
+    """Convert normalized x coordinate (0-1000) to actual pixel coordinate."""
+    return int(x / 1000 * screen_width)
+
+
+def denormalize_y(y: int, screen_height: int) -> int:
+    """Convert normalized y coordinate (0-1000) to actual pixel coordinate."""
+    return int(y / 1000 * screen_height)
+
+
+def parse_analyses(candidate, turn: int, url: str, verbose: bool = True) -> list:
+    """Pull the JSON screen analyses out of a model reply's text parts."""
+    pending = []
+    text_parts = [part.text for part in candidate.content.parts if part.text]
+    if not text_parts:
+        return pending
+
+    if verbose:
+        print("\n" + "="*60)
+        print("AGENT RESPONSE:")
+        print("="*60)
+    for text in text_parts:
+        if verbose:
+            print(text)
+        json_data = extract_json_from_text(text)
+        if json_data:
+            pending.append(stamp_analysis(json_data, turn, url))
+    if verbose:
+        print("="*60 + "\n")
+    return pending
+
+
+def stamp_analysis(json_data: dict, turn: int, url: str) -> dict:
+    json_data['turn'] = turn
+    json_data['url'] = url
+    json_data['timestamp'] = int(time.time())
+    return json_data
+
+
+class JsonObjectStream:
+    """
+    Finds top-level JSON objects in text that arrives in pieces.
+
+    One pass over each character: tracks brace depth and string state
+    inside a candidate object, and tries json.loads only when an object
+    closes. Text outside objects (prose, code fences) is skipped.
+    """
+
+    def __init__(self):
+        self._buf = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> list:
+        found = []
+        for ch in text:
+            if self._depth == 0:
+                if ch == "{":
+                    self._buf = ["{"]
+                    self._depth = 1
+                continue
+
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads("".join(self._buf))
+                    except json.JSONDecodeError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        found.append(obj)
+                    self._buf = []
+        return found
+
+
+class StreamedTurn:
+    """
+    Assembles one streamed model turn.
+
+    feed(chunk) returns the function calls completed by that chunk (the
+    API sends each call whole), so the loop can start acting before the
+    rest of the turn arrives. Screen analyses are parsed out of the reply
+    text as it streams. `candidate` is the merged turn for the history.
+    """
+
+    def __init__(self, verbose: bool = True, print_thoughts: bool = PRINT_THOUGHTS):
+        self.verbose = verbose
+        self.print_thoughts = print_thoughts
+        self.parts = []
+        self.function_calls = []
+        self.analyses = []
+        self._json = JsonObjectStream()
+        self._printing = None
+
+    def _print(self, text, thought):
+        if thought and not self.print_thoughts:
+            return
+        label = "THOUGHTS" if thought else "AGENT RESPONSE"
+        if self._printing != label:
+            print("\n" + "="*60 + f"\n{label}:\n" + "="*60)
+            self._printing = label
+        print(text, end="", flush=True)
+
+    def feed(self, chunk) -> list:
+        if not chunk.candidates or chunk.candidates[0].content is None:
+            return []
+        new_calls = []
+        for part in chunk.candidates[0].content.parts or []:
+            if part.function_call:
+                self.finish()
+                self.parts.append(part)
+                self.function_calls.append(part.function_call)
+                new_calls.append(part.function_call)
+            elif part.text is not None:
+                thought = bool(part.thought)
+                last = self.parts[-1] if self.parts else None
+                if (last is not None and last.text is not None and bool(last.thought) == thought
+                        and not last.function_call):
+                    last.text += part.text
+                    if part.thought_signature:
+                        last.thought_signature = part.thought_signature
+                else:
+                    self.parts.append(part.model_copy())
+                if self.verbose:
+                    self._print(part.text, thought)
+                if not thought:
+                    self.analyses.extend(self._json.feed(part.text))
+            else:
+                self.parts.append(part)
+        return new_calls
+
+    def finish(self):
+        if self.verbose and self._printing:
+            print("\n" + "="*60 + "\n")
+        self._printing = None
+
+    @property
+    def candidate(self):
+        return types.Candidate(content=types.Content(role="model", parts=self.parts))
+
+
+class AnalysisLog:
+    """Collects per-turn screen analyses and tracks consecutive repeats."""
+
+    def __init__(self):
+        self.analyses = []
+        self._last_screen_type = None
+        self._repeat_count = 0
+
+    def record(self, pending: list, turn_duration: int, attempts: int, last_action):
+        for json_data in pending:
+            screen_type = json_data.get('screen_type')
+            if screen_type and screen_type == self._last_screen_type:
+                self._repeat_count += 1
+            else:
+                self._repeat_count = 1
+                self._last_screen_type = screen_type
+            json_data['time_on_screen'] = turn_duration
+            json_data['attempts'] = attempts
+            json_data['last_action'] = last_action
+            json_data['screen_repeat_count'] = self._repeat_count
+            self.analyses.append(json_data)
+            print(f"\n✓ Captured analysis for: {json_data.get('screen_type', 'unknown')}")
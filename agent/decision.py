@@ -1,35 +1,132 @@
-def decide_next_action(test_case, step_index):
+"""
+Test-case flows as a precompiled graph.
+
+Flows are declared once in agent/flows.json (SPECTER_FLOWS points
+elsewhere). Each node has an intent and a `next` transition:
+
+    "open_contact": {
+        "intent": {"action": "tap", "target": "CONTACT_US"},
+        "next": {"homepage": "scroll", "*": "name"}
+    }
+
+`next` is a node id, a map from the screen_type observed after the
+intent ran to a node id ("*" = any other screen), or null to end the
+flow. Leaving it out means "the next node in the file". Node order also
+gives the start node (the first one).
+
+Compiling flattens every transition into one dict keyed on
+(flow, node, screen_type), so next_intent() is a constant-time lookup.
+"""
+
+import json
+import threading
+
+from config.settings import FLOWS_PATH
+
+ANY_SCREEN = "*"
+_END = object()
+
+
+class FlowGraph:
+    def __init__(self, spec: dict):
+        self.flows = {}           # flow -> start node
+        self._intents = {}        # (flow, node) -> intent
+        self._edges = {}          # (flow, node, screen_type) -> node | None
+        self._linear = {}         # flow -> intents along the default ("*") path
+
+        for flow, definition in spec.get("flows", {}).items():
+            self._compile(flow, definition.get("nodes", {}))
+
+    def _compile(self, flow, nodes):
+        order = list(nodes)
+        if not order:
+            raise ValueError(f"Flow {flow!r} has no nodes")
+        self.flows[flow] = order[0]
+
+        for index, node in enumerate(order):
+            definition = nodes[node]
+            if "intent" not in definition:
+                raise ValueError(f"Node {flow}.{node} has no intent")
+            self._intents[(flow, node)] = dict(definition["intent"])
+
+            following = order[index + 1] if index + 1 < len(order) else None
+            transition = definition.get("next", following)
+            if not isinstance(transition, dict):
+                transition = {ANY_SCREEN: transition}
+            transition.setdefault(ANY_SCREEN, following)
+
+            for screen_type, target in transition.items():
+                if target is not None and target not in nodes:
+                    raise ValueError(f"Node {flow}.{node} goes to unknown node {target!r}")
+                self._edges[(flow, node, screen_type.lower())] = target
+
+        # Default path, for step-indexed callers; stop if it cycles
+        path, node, seen = [], order[0], set()
+        while node is not None and node not in seen:
+            seen.add(node)
+            path.append(self._intents[(flow, node)])
+            node = self._edges[(flow, node, ANY_SCREEN)]
+        self._linear[flow] = path
+
+    def start(self, flow: str):
+        if flow not in self.flows:
+            raise KeyError(f"Unknown flow {flow!r}")
+        return self.flows[flow]
+
+    def intent(self, flow: str, node: str) -> dict:
+        return dict(self._intents[(flow, node)])
+
+    def next_node(self, flow: str, node: str, screen_type: str = None):
+        """Node to run after `node` given the screen it led to (None = flow done)."""
+        screen = (screen_type or "").lower()
+        target = self._edges.get((flow, node, screen), _END)
+        if target is _END:
+            target = self._edges[(flow, node, ANY_SCREEN)]
+        return target
+
+    def linear(self, flow: str) -> list:
+        return self._linear[flow]
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def load_flow_graph(path: str = FLOWS_PATH) -> FlowGraph:
+    with open(path, encoding="utf-8") as f:
+        return FlowGraph(json.load(f))
+
+
+def get_flow_graph() -> FlowGraph:
+    """The compiled flows from FLOWS_PATH, built on first use."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = load_flow_graph()
+    return _graph
+
+
+def next_intent(test_case, node=None, screen_type=None):
     """
-    Returns the next INTENT only
+    Returns (node, intent) to run next, or (None, None) when the flow is
+    done. Pass node=None to start; otherwise the node just executed and
+    the screen_type observed after it.
     """
+    graph = get_flow_graph()
+    node = graph.start(test_case) if node is None else graph.next_node(test_case, node, screen_type)
+    if node is None:
+        return None, None
+    return node, graph.intent(test_case, node)
 
-    flows = {
-        "login": [
-            {"action": "scroll"},
-            {"action": "tap", "target": "LOGIN"},
-            {"action": "tap", "target": "LOGIN"},
-            {"action": "tap", "target": "LOGIN"},
-        ],
-
-        "contact": [
-            {"action": "scroll"},
-            {"action": "tap", "target": "CONTACT_US"},
-            {"action": "type", "target": "NAME", "text": "Luis Infante"},
-            {"action": "type", "target": "EMAIL", "text": "adress@domain.com"},
-            {"action": "type", "target": "SUBJECT", "text": "Inquiry"},
-            {"action": "type", "target": "MESSAGE", "text": "Test message"},
-            {"action": "tap", "target": "SUBMIT"},
-        ],
-
-        "buy": [
-            {"action": "tap", "target": "NEW_FLAVOURS"},
-            {"action": "tap", "target": "BUY"},
-        ]
-    }
 
-    flow = flows[test_case]
+def decide_next_action(test_case, step_index):
+    """
+    Returns the next INTENT only (default path, no screen conditions)
+    """
+    flow = get_flow_graph().linear(test_case)
 
     if step_index >= len(flow):
         return None
 
-    return flow[step_index]
+    return dict(flow[step_index])
@@ -1,13 +1,225 @@
-import os
+"""
+Root-cause diagnosis for detected frictions.
+
+diagnose() is the instant heuristic. DiagnosisService sends frictions to
+the model in batches: everything raised within `max_wait` seconds of the
+first pending friction (up to `max_batch_size`) goes out as one
+structured-output request, so a fleet of sessions hitting friction at
+once costs one call, not one each. A caller that waits longer than
+`timeout` gets the heuristic result instead.
+
+Both return the same dict shape; where a diagnosis came from ("model",
+"heuristic" or "timeout") goes on the enclosing trace span as `source`
+and into DiagnosisService.stats().
+"""
+
+import itertools
 import json
-#import google.generativeai as genai
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from google.genai import types
+from google.genai.types import Content, Part
+
+from agent.computer_use import get_client
 from agent.prompts import DIAGNOSIS_PROMPT
+from agent.tracing import current_span
+from config.settings import DIAGNOSIS_MAX_BATCH, DIAGNOSIS_MAX_WAIT, DIAGNOSIS_TIMEOUT
+
+DIAGNOSIS_MODEL = os.getenv("GEMINI_DIAGNOSIS_MODEL", "gemini-2.5-flash")
+
+DIAGNOSIS_FIELDS = ("issue_type", "severity", "root_cause", "suggested_team")
 
-def diagnose(vision, state, friction_type):
+_SCHEMA = types.Schema(
+    type="ARRAY",
+    items=types.Schema(
+        type="OBJECT",
+        properties={
+            "id": types.Schema(type="INTEGER"),
+            "issue_type": types.Schema(type="STRING"),
+            "severity": types.Schema(type="STRING", enum=["P1", "P2", "P3"]),
+            "root_cause": types.Schema(type="STRING"),
+            "suggested_team": types.Schema(type="STRING"),
+        },
+        required=["id", *DIAGNOSIS_FIELDS],
+    ),
+)
+
+_STOP = object()
+
+
+def diagnose(vision, state, friction_type, severity="P2"):
+    """Heuristic diagnosis: no model call."""
     return {
         "issue_type": "UX Friction",
-        "severity": "P2",
+        "severity": severity,
         "root_cause": f"Friction detected: {friction_type}",
-        "suggested_team": "Frontend"
+        "suggested_team": "Frontend",
     }
 
+
+class _DiagnosisFuture(Future):
+    """Future that also records whether the model or the heuristic answered."""
+
+    source = None
+
+
+class _Pending:
+    __slots__ = ("id", "vision", "state", "friction_type", "severity", "future")
+
+    def __init__(self, id, vision, state, friction_type, severity):
+        self.id = id
+        self.vision = vision
+        self.state = state
+        self.friction_type = friction_type
+        self.severity = severity
+        self.future = _DiagnosisFuture()
+
+    def fallback(self):
+        return diagnose(self.vision, self.state, self.friction_type, self.severity)
+
+
+class DiagnosisService:
+    """
+    Batches diagnosis requests on a background thread.
+
+    submit() returns a Future; diagnose() waits up to `timeout` and falls
+    back to the heuristic. Thread-safe; one service can serve every run
+    in the process.
+    """
+
+    def __init__(self, client=None, model: str = DIAGNOSIS_MODEL, max_batch_size: int = DIAGNOSIS_MAX_BATCH,
+                 max_wait: float = DIAGNOSIS_MAX_WAIT, timeout: float = DIAGNOSIS_TIMEOUT):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.timeout = timeout
+
+        self._client = client
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.batches = 0
+        self.diagnosed = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+
+    def submit(self, vision, state, friction_type, severity="P2") -> Future:
+        if hasattr(state, "as_dict"):
+            state = state.as_dict()
+        item = _Pending(next(self._ids), vision, state, friction_type, severity)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DiagnosisService is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="specter-diagnosis", daemon=True)
+                self._thread.start()
+            self._queue.put(item)
+        return item.future
+
+    def diagnose(self, vision, state, friction_type, severity="P2", timeout: float = None) -> dict:
+        """Model diagnosis, or the heuristic one if it takes longer than `timeout`."""
+        future = self.submit(vision, state, friction_type, severity)
+        try:
+            diagnosis, source = future.result(timeout=self.timeout if timeout is None else timeout), future.source
+        except FutureTimeout:
+            self.timeouts += 1
+            diagnosis, source = diagnose(vision, state, friction_type, severity), "timeout"
+        s = current_span()
+        if s is not None:
+            s.set(source=source)
+        return diagnosis
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._send(batch)
+
+    def _send(self, batch):
+        self.batches += 1
+        items = [
+            {"id": p.id, "friction_type": p.friction_type, "vision": p.vision, "state": p.state}
+            for p in batch
+        ]
+        try:
+            client = self._client or get_client()
+            response = client.models.generate_content(
+                model=self.model,
+                contents=[Content(role="user", parts=[
+                    Part(text=DIAGNOSIS_PROMPT + json.dumps(items, default=str)),
+                ])],
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    response_schema=_SCHEMA,
+                    http_options=types.HttpOptions(timeout=int(self.timeout * 1000)),
+                ),
+            )
+            results = {r.get("id"): r for r in json.loads(response.text or "[]") if isinstance(r, dict)}
+        except Exception as e:
+            print(f"⚠️ Diagnosis batch of {len(batch)} failed, using heuristics: {e}")
+            results = {}
+
+        for p in batch:
+            result = results.get(p.id)
+            if result and all(result.get(k) for k in DIAGNOSIS_FIELDS):
+                diagnosis = {k: result[k] for k in DIAGNOSIS_FIELDS}
+                p.future.source = "model"
+                self.diagnosed += 1
+            else:
+                diagnosis = p.fallback()
+                p.future.source = "heuristic"
+                self.fallbacks += 1
+            p.future.set_result(diagnosis)
+
+    def close(self):
+        """Flush what is queued and stop the worker."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "diagnosed": self.diagnosed,
+            "fallbacks": self.fallbacks,
+            "timeouts": self.timeouts,
+        }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_diagnosis_service() -> DiagnosisService:
+    """Process-wide service, so concurrent runs share batches."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DiagnosisService()
+    return _service
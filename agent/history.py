@@ -0,0 +1,186 @@
+"""
+Bounded conversation history for the vision agent loop.
+
+Every computer-use turn adds the model reply plus a FunctionResponse that
+carries a full screenshot, so sending the raw `contents` list makes the
+request grow with every turn. ConversationHistory keeps only the last N
+screenshots inline and folds older turns into one short text summary
+(screen_type, elements, action taken), so the payload stays roughly flat.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from google.genai.types import Content, Part
+
+# Rough Gemini cost of one inline image, used for the token estimate only.
+IMAGE_TOKENS = 258
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class _Turn:
+    index: int
+    model: Content
+    response: Optional[Content]
+    summary: str
+    screenshots: int
+
+
+@dataclass
+class PayloadStats:
+    turn: int
+    bytes: int
+    approx_tokens: int
+    inline_screenshots: int
+    compacted_turns: int
+
+
+def _part_size(part) -> tuple:
+    """Return (bytes, tokens, images) for one Part."""
+    size, tokens, images = 0, 0, 0
+    if part.text:
+        size += len(part.text.encode("utf-8"))
+        tokens += len(part.text) // CHARS_PER_TOKEN
+    if part.inline_data and part.inline_data.data:
+        size += len(part.inline_data.data)
+        tokens += IMAGE_TOKENS
+        images += 1
+    if part.function_call:
+        args = json.dumps(dict(part.function_call.args or {}), default=str)
+        size += len(args)
+        tokens += len(args) // CHARS_PER_TOKEN
+    if part.function_response:
+        fr = part.function_response
+        body = json.dumps(fr.response or {}, default=str)
+        size += len(body)
+        tokens += len(body) // CHARS_PER_TOKEN
+        for fr_part in fr.parts or []:
+            if fr_part.inline_data and fr_part.inline_data.data:
+                size += len(fr_part.inline_data.data)
+                tokens += IMAGE_TOKENS
+                images += 1
+    return size, tokens, images
+
+
+def measure(contents: List[Content]) -> tuple:
+    """Return (bytes, approx_tokens, inline_images) for a request payload."""
+    size, tokens, images = 0, 0, 0
+    for content in contents:
+        for part in content.parts or []:
+            s, t, i = _part_size(part)
+            size += s
+            tokens += t
+            images += i
+    return size, tokens, images
+
+
+def turn_summary(turn: int, analyses: list, function_calls: list, url: str) -> str:
+    """One line describing a turn: what screen we saw and what we did."""
+    screens = ", ".join(a.get("screen_type", "unknown") for a in analyses) or "unknown"
+    elements = []
+    for a in analyses:
+        elements.extend(str(e) for e in a.get("elements", []))
+    actions = []
+    for fc in function_calls:
+        args = dict(fc.args or {})
+        if "x" in args and "y" in args:
+            actions.append(f"{fc.name}({args['x']},{args['y']})")
+        else:
+            actions.append(fc.name)
+    line = f"Turn {turn}: screen={screens}"
+    if elements:
+        line += f"; elements={', '.join(elements[:8])}"
+    line += f"; action={', '.join(actions) or 'none'}; url={url}"
+    return line
+
+
+@dataclass
+class ConversationHistory:
+    """
+    Sliding-window history for generate_content.
+
+    max_screenshots: how many of the most recent screenshots stay inline.
+    max_bytes / max_tokens: optional budget; when the built payload is over
+    it, more old turns are compacted (at least one turn always stays inline).
+    """
+
+    max_screenshots: int = 3
+    max_bytes: Optional[int] = None
+    max_tokens: Optional[int] = None
+    payload_log: List[PayloadStats] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._prompt_text = ""
+        self._prompt_image: Optional[Part] = None
+        self._turns: List[_Turn] = []
+
+    def start(self, prompt_text: str, screenshot: bytes, mime_type: str = "image/png"):
+        self._prompt_text = prompt_text
+        self._prompt_image = Part.from_bytes(data=screenshot, mime_type=mime_type)
+        self._turns = []
+        self.payload_log = []
+
+    def add_turn(self, model: Content, response: Optional[Content] = None, summary: str = ""):
+        screenshots = 0
+        if response is not None:
+            screenshots = 1 if any(
+                p.function_response and p.function_response.parts for p in response.parts or []
+            ) else 0
+        self._turns.append(_Turn(len(self._turns) + 1, model, response, summary, screenshots))
+
+    def _build(self, keep_from: int) -> List[Content]:
+        """Turns before `keep_from` are compacted, the rest are sent as-is."""
+        inline_screens = sum(t.screenshots for t in self._turns[keep_from:])
+        prompt_parts = [Part(text=self._prompt_text)]
+        # The prompt screenshot is the oldest one, so it goes first
+        if self._prompt_image is not None and keep_from == 0 and inline_screens < self.max_screenshots:
+            prompt_parts.append(self._prompt_image)
+        contents = [Content(role="user", parts=prompt_parts)]
+
+        compacted = [t.summary for t in self._turns[:keep_from] if t.summary]
+        if compacted:
+            contents.append(Content(role="user", parts=[Part(text=(
+                "Summary of earlier turns (screenshots omitted):\n- " + "\n- ".join(compacted)
+            ))]))
+
+        for t in self._turns[keep_from:]:
+            contents.append(t.model)
+            if t.response is not None:
+                contents.append(t.response)
+        return contents
+
+    def _over_budget(self, size: int, tokens: int) -> bool:
+        if self.max_bytes is not None and size > self.max_bytes:
+            return True
+        if self.max_tokens is not None and tokens > self.max_tokens:
+            return True
+        return False
+
+    def contents(self) -> List[Content]:
+        """Build the request payload and record its size in payload_log."""
+        # Walk back from the newest turn until the screenshot window is full
+        keep_from = len(self._turns)
+        screens = 0
+        while keep_from > 0:
+            screens += self._turns[keep_from - 1].screenshots
+            if screens > self.max_screenshots:
+                break
+            keep_from -= 1
+
+        contents = self._build(keep_from)
+        size, tokens, images = measure(contents)
+        while self._over_budget(size, tokens) and keep_from < len(self._turns) - 1:
+            keep_from += 1
+            contents = self._build(keep_from)
+            size, tokens, images = measure(contents)
+
+        self.payload_log.append(PayloadStats(
+            turn=len(self._turns) + 1,
+            bytes=size,
+            approx_tokens=tokens,
+            inline_screenshots=images,
+            compacted_turns=keep_from,
+        ))
+        return contents
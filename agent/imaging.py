@@ -0,0 +1,105 @@
+"""
+Screenshot encoding between capture and model upload.
+
+Screens are captured as full-resolution PNG. Before a screenshot is sent to
+Gemini it can be downscaled to a target long edge, re-encoded as
+PNG/JPEG/WebP and optionally converted to grayscale. The computer-use model
+works in normalised 0-1000 coordinates, so downscaling does not change
+where clicks land. Evidence should always be written from the original bytes.
+
+Pillow is optional: without it the PNG is passed through unchanged.
+"""
+
+import io
+import time
+from dataclasses import dataclass
+
+from config.settings import (
+    SCREENSHOT_MAX_EDGE,
+    SCREENSHOT_FORMAT,
+    SCREENSHOT_QUALITY,
+    SCREENSHOT_GRAYSCALE,
+)
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on environment
+    Image = None
+
+MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+_warned_no_pillow = False
+
+
+@dataclass
+class EncodeOptions:
+    max_edge: int = SCREENSHOT_MAX_EDGE     # 0 = keep original size
+    format: str = SCREENSHOT_FORMAT
+    quality: int = SCREENSHOT_QUALITY
+    grayscale: bool = SCREENSHOT_GRAYSCALE
+
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    mime_type: str
+    original_size: int
+    encode_ms: float
+
+    @property
+    def ratio(self) -> float:
+        """Compression ratio (original bytes / encoded bytes)."""
+        return self.original_size / max(1, len(self.data))
+
+    def describe(self) -> str:
+        return (f"{self.original_size / 1024:.0f} KB → {len(self.data) / 1024:.0f} KB "
+                f"{self.mime_type} ({self.ratio:.1f}x) in {self.encode_ms:.0f} ms")
+
+
+def encode_for_model(png_bytes: bytes, options: EncodeOptions = None) -> EncodedImage:
+    """Downscale / re-encode a PNG screenshot for upload."""
+    global _warned_no_pillow
+    options = options or EncodeOptions()
+    start = time.perf_counter()
+
+    fmt = options.format.upper()
+    if fmt == "JPG":
+        fmt = "JPEG"
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"Unsupported screenshot format: {options.format}")
+
+    if Image is None:
+        if not _warned_no_pillow:
+            print("Warning: Pillow not installed, sending screenshots as raw PNG")
+            _warned_no_pillow = True
+        return EncodedImage(png_bytes, "image/png", len(png_bytes), 0.0)
+
+    img = Image.open(io.BytesIO(png_bytes))
+
+    if options.max_edge and max(img.size) > options.max_edge:
+        scale = options.max_edge / max(img.size)
+        new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+    if options.grayscale:
+        img = img.convert("L")
+    elif fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        # JPEG has no alpha channel
+        img = img.convert("RGB")
+
+    out = io.BytesIO()
+    if fmt == "PNG":
+        img.save(out, format="PNG", optimize=True)
+    else:
+        img.save(out, format=fmt, quality=options.quality)
+
+    return EncodedImage(
+        data=out.getvalue(),
+        mime_type=MIME_TYPES[fmt],
+        original_size=len(png_bytes),
+        encode_ms=(time.perf_counter() - start) * 1000,
+    )
@@ -1,5 +1,7 @@
 # agent/mock_ai.py
 
+import time
+
 def mock_vision(step):
     if step == 1:
         return {
@@ -19,3 +21,26 @@ def mock_vision(step):
             "elements": ["ERROR_POPUP"],
             "error_text": "Invalid credentials"
         }
+
+
+class ScriptedVision:
+    """
+    Fake vision model driven by a scripted screen sequence.
+
+    Each call returns the next screen in `screens` (the last one repeats
+    once the script runs out), after sleeping `latency` seconds.
+    """
+
+    def __init__(self, screens, latency=0.0):
+        self.screens = list(screens)
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, screenshot):
+        time.sleep(self.latency)
+        screen = self.screens[min(self.calls, len(self.screens) - 1)]
+        self.calls += 1
+        return {"error_text": None, **screen}
+
+    def reset(self):
+        self.calls = 0
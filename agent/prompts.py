@@ -85,3 +85,34 @@ Visit at least 3-5 different pages (e.g., home page, product page, checkout if a
 Provide JSON responses after analyzing each screen.
 When you've gathered enough information, provide a final summary report.
 """
+
+ANALYZE_SCREEN_PROMPT = """
+Analyze this single screenshot of a mobile website. Do not take any action.
+Reply with JSON only, using this exact structure:
+{
+  "screen_type": "string (e.g., login, signup, homepage, product, checkout, contact, error)",
+  "elements": ["string (list of key UI element names)"],
+  "error_text": "string or null (visible error message, if any)",
+  "targets": [{"label": "string (visible text of a tappable element)", "x": 500, "y": 500}],
+  "confidence": 0.95
+}
+"targets" lists the tappable elements (buttons, links, form fields) with the centre of each
+in normalized coordinates: 0-1000 across the screenshot width (x) and height (y).
+"""
+
+DIAGNOSIS_PROMPT = """
+You are triaging UX friction reported by automated mystery shopper sessions on a mobile website.
+Each item below is one session that got stuck. It has an "id", the "friction_type" that fired,
+the "vision" analysis of the current screen and the session "state" (time on screen, attempts,
+screen repeats, recent screen history, whether the last action succeeded).
+
+For every item, return one diagnosis with the same "id":
+- "issue_type": short category (e.g. "UX Friction", "Functional Bug", "Validation Error", "Navigation Loop")
+- "severity": "P1" (blocks the flow), "P2" (degrades the flow) or "P3" (cosmetic)
+- "root_cause": one or two sentences on the most likely cause, grounded in the screen and state
+- "suggested_team": "Frontend", "Backend", "Design" or "QA"
+
+Return a JSON array only, one object per item, in any order.
+
+Items:
+"""
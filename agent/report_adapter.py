@@ -50,6 +50,7 @@ def to_issue_report(
         ],
         metadata={
             "friction_type": diagnosis.get("friction_type"),
+            "screen_type": screen_type,   # part of the alert fingerprint (ai.routing.fingerprint)
             "test_id": test_id,
         },
     )
@@ -0,0 +1,206 @@
+"""
+Persistent cache of screen analyses keyed on a perceptual hash + URL.
+
+analyze_screen is the slowest part of a loop step, and many steps land on a
+screen that is identical (or nearly so) to one already analysed in this run
+or an earlier one. ScreenCache stores vision outputs in SQLite next to a
+64-bit dHash of the screenshot; a lookup returns the closest entry for the
+same URL within `max_distance` bits and skips the model call.
+
+Lookups use multi-index hashing: each hash is split into max_distance + 1
+bands, indexed separately. Two hashes within max_distance bits must agree
+exactly on at least one band, so only rows sharing a band are compared,
+not every row for the URL (in the Appium native context the URL is always
+"", which would mean the whole cache).
+
+Entries are evicted least-recently-used once `max_entries` is exceeded.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import (
+    SCREEN_CACHE_PATH,
+    SCREEN_CACHE_MAX_DISTANCE,
+    SCREEN_CACHE_MAX_ENTRIES,
+)
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on environment
+    Image = None
+
+_warned_no_pillow = False
+
+
+def dhash(png_bytes: bytes, size: int = 8) -> int:
+    """
+    64-bit difference hash: shrink to (size+1) x size grayscale and record
+    whether each pixel is brighter than its right neighbour.
+
+    Without Pillow this falls back to an exact content hash, so only
+    byte-identical screens will match.
+    """
+    global _warned_no_pillow
+    if Image is None:
+        if not _warned_no_pillow:
+            print("Warning: Pillow not installed, screen cache only matches identical screenshots")
+            _warned_no_pillow = True
+        return int.from_bytes(hashlib.sha256(png_bytes).digest()[:8], "big")
+
+    img = Image.open(io.BytesIO(png_bytes)).convert("L").resize(
+        (size + 1, size), Image.Resampling.BILINEAR
+    )
+    pixels = img.tobytes()
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def hash_bands(phash: int, count: int) -> list:
+    """Split a 64-bit hash into `count` contiguous bands: [(band, value), ...]."""
+    bands = []
+    start = 0
+    for band in range(count):
+        width = 64 // count + (band < 64 % count)
+        bands.append((band, (phash >> (64 - start - width)) & ((1 << width) - 1)))
+        start += width
+    return bands
+
+
+class ScreenCache:
+    """SQLite-backed vision cache. Safe to share between runner threads."""
+
+    def __init__(self, path: str = SCREEN_CACHE_PATH,
+                 max_distance: int = SCREEN_CACHE_MAX_DISTANCE,
+                 max_entries: int = SCREEN_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        # Pigeonhole: max_distance differing bits leave at least one band
+        # intact. At least 2 bands, so no band value needs all 64 bits
+        # (SQLite integers are signed 64-bit).
+        self.bands = min(64, max(2, max_distance + 1))
+        self.hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS screens (
+                id        INTEGER PRIMARY KEY,
+                url       TEXT NOT NULL,
+                phash     TEXT NOT NULL,
+                result    TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS screens_url ON screens (url, phash)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS screens_lru ON screens (last_used)")
+        # `layout` is the band count, so caches opened with different
+        # max_distance values can share one file
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS screen_bands (
+                layout    INTEGER NOT NULL,
+                url       TEXT NOT NULL,
+                band      INTEGER NOT NULL,
+                value     INTEGER NOT NULL,
+                screen_id INTEGER NOT NULL,
+                PRIMARY KEY (layout, url, band, value, screen_id)
+            ) WITHOUT ROWID
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS screen_bands_screen ON screen_bands (screen_id)")
+        # Index rows stored before this layout existed (older cache files)
+        missing = self._db.execute(
+            "SELECT id, url, phash FROM screens WHERE id NOT IN "
+            "(SELECT screen_id FROM screen_bands WHERE layout = ?)", (self.bands,)
+        ).fetchall()
+        for row_id, url, row_hash in missing:
+            self._index(row_id, url, int(row_hash, 16))
+        self._db.commit()
+
+    def _index(self, row_id: int, url: str, phash: int):
+        self._db.executemany(
+            "INSERT OR IGNORE INTO screen_bands (layout, url, band, value, screen_id) VALUES (?, ?, ?, ?, ?)",
+            [(self.bands, url, band, value, row_id) for band, value in hash_bands(phash, self.bands)],
+        )
+
+    def lookup(self, phash: int, url: str):
+        """Return the cached vision output closest to `phash`, or None."""
+        with self._lock:
+            # One index probe per band
+            bands = hash_bands(phash, self.bands)
+            probe = "SELECT screen_id FROM screen_bands WHERE layout = ? AND url = ? AND band = ? AND value = ?"
+            rows = self._db.execute(
+                f"SELECT id, phash, result FROM screens WHERE id IN ({' UNION '.join([probe] * len(bands))})",
+                [arg for band, value in bands for arg in (self.bands, url, band, value)],
+            ).fetchall()
+
+            best = None
+            for row_id, row_hash, result in rows:
+                distance = hamming(phash, int(row_hash, 16))
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, row_id, result)
+                    if distance == 0:
+                        break
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE screens SET last_used = ? WHERE id = ?", (time.time(), best[1]))
+            self._db.commit()
+            self.hits += 1
+            return json.loads(best[2])
+
+    def store(self, phash: int, url: str, vision_output: dict):
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO screens (url, phash, result, last_used) VALUES (?, ?, ?, ?)",
+                (url, f"{phash:016x}", json.dumps(vision_output), time.time()),
+            )
+            self._index(cursor.lastrowid, url, phash)
+            (count,) = self._db.execute("SELECT COUNT(*) FROM screens").fetchone()
+            if count > self.max_entries:
+                evicted = self._db.execute(
+                    "SELECT id FROM screens ORDER BY last_used ASC LIMIT ?",
+                    (count - self.max_entries,),
+                ).fetchall()
+                self._db.executemany("DELETE FROM screens WHERE id = ?", evicted)
+                self._db.executemany("DELETE FROM screen_bands WHERE screen_id = ?", evicted)
+            self._db.commit()
+
+    def analyze(self, png_bytes: bytes, url: str, analyze_fn):
+        """
+        Return (vision_output, hit). On a miss, analyze_fn(png_bytes) is
+        called and its result stored.
+        """
+        phash = dhash(png_bytes)
+        cached = self.lookup(phash, url or "")
+        if cached is not None:
+            return cached, True
+
+        vision_output = analyze_fn(png_bytes)
+        self.store(phash, url or "", vision_output)
+        return vision_output, False
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
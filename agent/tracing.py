@@ -0,0 +1,170 @@
+"""
+Lightweight span tracing for the agent loops.
+
+    with trace_run(run_id):
+        with span("step", step=3):
+            with span("vision") as s:
+                s.set(cache_hit=True)
+
+Spans nest through a context variable, so parent ids follow the call
+stack per thread / asyncio task, and every span inherits run_id (and
+step, when an enclosing span set one). Finished spans go to the active
+exporter:
+
+- JsonlExporter: one JSON line per span (SPECTER_TRACE_PATH turns it on)
+- InMemoryExporter: keeps spans in a list, for tests and benchmarks
+
+With no exporter a span is just two perf_counter() calls.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from config.settings import TRACE_PATH
+
+_current = contextvars.ContextVar("specter_span", default=None)
+_run_id = contextvars.ContextVar("specter_run_id", default=None)
+
+_exporter = None
+_exporter_lock = threading.Lock()
+_exporter_from_env = False
+
+
+class Span:
+    __slots__ = ("name", "run_id", "span_id", "parent_id", "start", "duration_ms",
+                 "attributes", "status", "error")
+
+    def __init__(self, name, run_id, parent, attributes):
+        self.name = name
+        self.run_id = run_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration_ms = None
+        self.attributes = attributes
+        self.status = "ok"
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "run_id": self.run_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span to `path`."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span):
+        line = json.dumps(span.as_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class InMemoryExporter:
+    """Keeps finished spans in `self.spans` (in finish order)."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def by_name(self, name: str) -> list:
+        return [s for s in self.spans if s.name == name]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def close(self):
+        pass
+
+
+def set_exporter(exporter):
+    """Install the process-wide exporter (None turns export off). Returns the previous one."""
+    global _exporter, _exporter_from_env
+    with _exporter_lock:
+        previous, _exporter = _exporter, exporter
+        _exporter_from_env = True   # an explicit choice wins over SPECTER_TRACE_PATH
+    return previous
+
+
+def get_exporter():
+    global _exporter, _exporter_from_env
+    if not _exporter_from_env:
+        with _exporter_lock:
+            if not _exporter_from_env:
+                if TRACE_PATH:
+                    _exporter = JsonlExporter(TRACE_PATH)
+                _exporter_from_env = True
+    return _exporter
+
+
+def current_span():
+    """The innermost open span in this thread / task, or None."""
+    return _current.get()
+
+
+@contextmanager
+def trace_run(run_id: str):
+    """Tag every span opened inside this block with `run_id`."""
+    token = _run_id.set(run_id)
+    try:
+        yield
+    finally:
+        _run_id.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time the enclosed block as one span. Exceptions are recorded on the
+    span (status "error") and re-raised.
+    """
+    parent = _current.get()
+    if parent is not None and "step" in parent.attributes and "step" not in attributes:
+        attributes["step"] = parent.attributes["step"]
+    s = Span(name, _run_id.get(), parent, attributes)
+    token = _current.set(s)
+    start = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.status = "error"
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.duration_ms = round((time.perf_counter() - start) * 1000, 3)
+        _current.reset(token)
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(s)
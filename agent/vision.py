@@ -1,113 +1,182 @@
+"""
+Mystery shopper loop on the Gemini computer-use model (sync Playwright).
+
+Importing this module is cheap: the browser is only launched when
+run_assessment() asks the pool for a session.
+
+    python -m agent.vision
+"""
+
+import json
 import os
-from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright
-from google import genai
 from google.genai import types
 from google.genai.types import Content, Part
 from typing import Any, List, Tuple
 import time
 from pathlib import Path
-import json
-import re
-from prompts import MYSTERY_SHOPPER_SYSTEM_PROMPT, INITIAL_TASK_PROMPT
+from agent.prompts import MYSTERY_SHOPPER_SYSTEM_PROMPT, INITIAL_TASK_PROMPT, ANALYZE_SCREEN_PROMPT
+from agent.computer_use import (
+    COMPUTER_USE_MODEL,
+    START_URL,
+    SCREEN_WIDTH,
+    SCREEN_HEIGHT,
+    get_client,
+    build_config,
+    parse_analyses,
+    stamp_analysis,
+    StreamedTurn,
+    AnalysisLog,
+    extract_json_from_text,
+    denormalize_x,
+    denormalize_y,
+)
+from agent.browser import BrowserPool, get_browser_pool
+from agent.history import ConversationHistory, turn_summary
+from agent.imaging import encode_for_model
+from agent.action_trace import (
+    ActionTrace,
+    candidate_for_trace,
+    check_mode,
+    fingerprint,
+    replayed_candidate,
+    same_screen,
+)
+from agent.tracing import span, trace_run
+from controller.stability import wait_for_page_stable
+from evidence.collector import EvidenceStore
+from config.settings import EVIDENCE_ROOT, HISTORY_MAX_SCREENSHOTS, HISTORY_MAX_BYTES, HISTORY_MAX_TOKENS, RUN_MODE, VISION_STRUCTURED_OUTPUT
+
+# Plain (non computer-use) model for one-shot screen classification
+ANALYSIS_MODEL = os.getenv("GEMINI_VISION_MODEL", "gemini-2.5-flash")
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=GEMINI_API_KEY)
+TURN_LIMIT = 15
 
-SCREEN_WIDTH = 375
-SCREEN_HEIGHT = 812
+# Response schema for analyze_screen(structured=True)
+SCREEN_ANALYSIS_SCHEMA = types.Schema(
+    type="OBJECT",
+    properties={
+        "screen_type": types.Schema(type="STRING"),
+        "elements": types.Schema(type="ARRAY", items=types.Schema(type="STRING")),
+        "error_text": types.Schema(type="STRING", nullable=True),
+        "targets": types.Schema(type="ARRAY", items=types.Schema(
+            type="OBJECT",
+            properties={
+                "label": types.Schema(type="STRING"),
+                "x": types.Schema(type="INTEGER"),
+                "y": types.Schema(type="INTEGER"),
+            },
+            required=["label", "x", "y"],
+        )),
+        "confidence": types.Schema(type="NUMBER"),
+    },
+    required=["screen_type", "elements", "confidence"],
+)
+
+def analyze_screen(screenshot, structured: bool = VISION_STRUCTURED_OUTPUT) -> dict:
+    """
+    Classify a single screenshot without taking any action.
+
+    `screenshot` is a file path or raw PNG bytes. With `structured`, the
+    model is constrained to SCREEN_ANALYSIS_SCHEMA and replies with bare
+    JSON; otherwise the JSON is scanned out of free text.
+    Returns {"screen_type", "elements", "error_text", "targets", "confidence"};
+    targets are {"label", "x", "y"} in 0-1000 coordinates (see controller/locator.py).
+    """
+    if isinstance(screenshot, (str, Path)):
+        screenshot = Path(screenshot).read_bytes()
+
+    config = types.GenerateContentConfig(system_instruction=MYSTERY_SHOPPER_SYSTEM_PROMPT)
+    if structured:
+        config.response_mime_type = "application/json"
+        config.response_schema = SCREEN_ANALYSIS_SCHEMA
+
+    encoded = encode_for_model(screenshot)
+    response = get_client().models.generate_content(
+        model=ANALYSIS_MODEL,
+        contents=[Content(role="user", parts=[
+            Part(text=ANALYZE_SCREEN_PROMPT),
+            Part.from_bytes(data=encoded.data, mime_type=encoded.mime_type),
+        ])],
+        config=config,
+    )
+
+    data = None
+    if structured:
+        try:
+            data = json.loads(response.text or "")
+        except ValueError:
+            pass
+    if not isinstance(data, dict):
+        data = extract_json_from_text(response.text or "") or {}
+    return {
+        "screen_type": data.get("screen_type", "unknown"),
+        "elements": data.get("elements", []),
+        "error_text": data.get("error_text"),
+        "targets": data.get("targets", []),
+        "confidence": data.get("confidence", 0),
+    }
 
-playwright = sync_playwright().start()
-browser = playwright.chromium.launch(headless=False)
-context = browser.new_context(viewport={"width": SCREEN_WIDTH, "height": SCREEN_HEIGHT})
-page = context.new_page()
+def execute_function_call(function_call, page, screen_width, screen_height):
+    """Run one computer-use call on the page. Returns (name, result)."""
+    action_result = {}
+    fname = function_call.name
+    args = function_call.args
+    print(f"  -> Executing: {fname}")
 
-def extract_json_from_text(text: str) -> dict:
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        # Look for JSON within code blocks or plain text
-        json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```|(\{[^{}]*"screen_type"[^{}]*\})'
-        matches = re.findall(json_pattern, text, re.DOTALL)
-        for match in matches:
-            json_str = match[0] or match[1]
-            try:
-                return json.loads(json_str)
-            except json.JSONDecodeError:
-                continue
-        return None
-
-def denormalize_x(x: int, screen_width: int) -> int:
-    """Convert normalized x coordinate (0-1000) to actual pixel coordinate."""
-    return int(x / 1000 * screen_width)
-
-def denormalize_y(y: int, screen_height: int) -> int:
-    """Convert normalized y coordinate (0-1000) to actual pixel coordinate."""
-    return int(y / 1000 * screen_height)
+        if fname == "open_web_browser":
+            pass # Already open
+        elif fname == "click_at":
+            actual_x = denormalize_x(args["x"], screen_width)
+            actual_y = denormalize_y(args["y"], screen_height)
+            page.mouse.click(actual_x, actual_y)
+        elif fname == "type_text_at":
+            actual_x = denormalize_x(args["x"], screen_width)
+            actual_y = denormalize_y(args["y"], screen_height)
+            text = args["text"]
+            press_enter = args.get("press_enter", False)
+
+            page.mouse.click(actual_x, actual_y)
+            # Simple clear (Command+A, Backspace for Mac)
+            page.keyboard.press("Meta+A")
+            page.keyboard.press("Backspace")
+            page.keyboard.type(text)
+            if press_enter:
+                page.keyboard.press("Enter")
+        else:
+            print(f"Warning: Unimplemented or custom function {fname}")
+
+        # Wait for potential navigations/renders to settle
+        settle = wait_for_page_stable(page)
+        if not settle.stable:
+            print(f"  (page still changing after {settle.elapsed:.1f}s)")
+
+    except Exception as e:
+        print(f"Error executing {fname}: {e}")
+        action_result = {"error": str(e)}
+
+    return fname, action_result
 
 def execute_function_calls(candidate, page, screen_width, screen_height):
-    results = []
-    function_calls = []
-    for part in candidate.content.parts:
-        if part.function_call:
-            function_calls.append(part.function_call)
-
-    for function_call in function_calls:
-        action_result = {}
-        fname = function_call.name
-        args = function_call.args
-        print(f"  -> Executing: {fname}")
+    return [
+        execute_function_call(part.function_call, page, screen_width, screen_height)
+        for part in candidate.content.parts if part.function_call
+    ]
 
-        try:
-            if fname == "open_web_browser":
-                pass # Already open
-            elif fname == "click_at":
-                actual_x = denormalize_x(args["x"], screen_width)
-                actual_y = denormalize_y(args["y"], screen_height)
-                page.mouse.click(actual_x, actual_y)
-            elif fname == "type_text_at":
-                actual_x = denormalize_x(args["x"], screen_width)
-                actual_y = denormalize_y(args["y"], screen_height)
-                text = args["text"]
-                press_enter = args.get("press_enter", False)
-
-                page.mouse.click(actual_x, actual_y)
-                # Simple clear (Command+A, Backspace for Mac)
-                page.keyboard.press("Meta+A")
-                page.keyboard.press("Backspace")
-                page.keyboard.type(text)
-                if press_enter:
-                    page.keyboard.press("Enter")
-            else:
-                print(f"Warning: Unimplemented or custom function {fname}")
-
-            # Wait for potential navigations/renders
-            page.wait_for_load_state(timeout=5000)
-            time.sleep(1)
-
-        except Exception as e:
-            print(f"Error executing {fname}: {e}")
-            action_result = {"error": str(e)}
-
-        results.append((fname, action_result))
-
-    return results
-
-def get_function_responses(page, results):
+def get_function_responses(page, results, evidence, step):
     screenshot_bytes = page.screenshot(type="png")
     current_url = page.url
     function_responses = []
-    
-    # Save screenshot to evidence/screenshots folder
-    screenshot_dir = Path("evidence/screenshots")
-    screenshot_dir.mkdir(parents=True, exist_ok=True)
-    timestamp = int(time.time() * 1000)  # milliseconds for uniqueness
-    screenshot_path = screenshot_dir / f"screenshot_{timestamp}.png"
-    with open(screenshot_path, "wb") as f:
-        f.write(screenshot_bytes)
+
+    # Written in the background by the evidence store
+    screenshot_path = evidence.put(step, screenshot_bytes, url=current_url,
+                                   actions=[name for name, _ in results])
     print(f"  Saved: {screenshot_path}")
-    
+
+    # Only the upload copy is downscaled / re-encoded
+    encoded = encode_for_model(screenshot_bytes)
+    print(f"  Encoded: {encoded.describe()}")
+
     for name, result in results:
         response_data = {"url": current_url, "screenshot_path": str(screenshot_path)}
         response_data.update(result)
@@ -117,133 +186,171 @@ def get_function_responses(page, results):
                 response=response_data,
                 parts=[types.FunctionResponsePart(
                         inline_data=types.FunctionResponseBlob(
-                            mime_type="image/png",
-                            data=screenshot_bytes))
+                            mime_type=encoded.mime_type,
+                            data=encoded.data))
                 ]
             )
         )
-    return function_responses
-
-try:
-  # Go to initial page
-  page.goto("https://specterai.duckdns.org/")
-
-  # Configure the model with system prompt
-  config = types.GenerateContentConfig(
-    tools=[types.Tool(computer_use=types.ComputerUse(
-            environment=types.Environment.ENVIRONMENT_BROWSER
-        ))],
-        thinking_config=types.ThinkingConfig(include_thoughts=True),
-        system_instruction=MYSTERY_SHOPPER_SYSTEM_PROMPT,
-  )
-
-  initial_screenshot = page.screenshot(type="png")
-  USER_PROMPT = INITIAL_TASK_PROMPT
-  print(f"Goal: Mystery Shopping Assessment")
-  print(f"Instructions: {USER_PROMPT[:100]}...")
-
-  contents = [
-        Content(role="user", parts=[
-            Part(text=USER_PROMPT),
-            Part.from_bytes(data=initial_screenshot, mime_type='image/png')
-        ])
-    ]
-  
-  # Store all screen analyses
-  screen_analyses = []
-  last_screen_type = None
-  screen_repeat_count = 0
-  
-  turn_limit = 15
-  for i in range(turn_limit):
-      turn_start_time = time.time()
-      pending_jsons = []
-      print(f"\n--- Turn {i+1} ---")
-      print("Thinking...")
-      response = client.models.generate_content(
-          model='gemini-2.5-computer-use-preview-10-2025',
-          contents=contents,
-          config=config,
-      )
-
-      candidate = response.candidates[0]
-      contents.append(candidate.content)
-
-      # Print any text responses (including JSON analysis)
-      text_parts = [part.text for part in candidate.content.parts if part.text]
-      if text_parts:
-          print("\n" + "="*60)
-          print("AGENT RESPONSE:")
-          print("="*60)
-          for text in text_parts:
-              print(text)
-              # Extract and store JSON analysis
-              json_data = extract_json_from_text(text)
-              if json_data:
-                  json_data['turn'] = i + 1
-                  json_data['url'] = page.url
-                  json_data['timestamp'] = int(time.time())
-                  pending_jsons.append(json_data)
-          print("="*60 + "\n")
-
-      function_calls = [part.function_call for part in candidate.content.parts if part.function_call]
-      attempts = len(function_calls)
-      last_action = function_calls[-1].name if function_calls else None
-      has_function_calls = attempts > 0
-      if not has_function_calls:
-          turn_duration = max(0, round(time.time() - turn_start_time))
-          for json_data in pending_jsons:
-              screen_type = json_data.get('screen_type')
-              if screen_type and screen_type == last_screen_type:
-                  screen_repeat_count += 1
-              else:
-                  screen_repeat_count = 1
-                  last_screen_type = screen_type
-              json_data['time_on_screen'] = turn_duration
-              json_data['attempts'] = attempts
-              json_data['last_action'] = last_action
-              json_data['screen_repeat_count'] = screen_repeat_count
-              screen_analyses.append(json_data)
-              print(f"\n✓ Captured analysis for: {json_data.get('screen_type', 'unknown')}")
-          print("\nAgent finished exploration.")
-          break
-
-      print("Executing actions...")
-      results = execute_function_calls(candidate, page, SCREEN_WIDTH, SCREEN_HEIGHT)
-
-      print("Capturing state...")
-      function_responses = get_function_responses(page, results)
-
-      contents.append(
-          Content(role="user", parts=[Part(function_response=fr) for fr in function_responses])
-      )
-
-      turn_duration = max(0, round(time.time() - turn_start_time))
-      for json_data in pending_jsons:
-          screen_type = json_data.get('screen_type')
-          if screen_type and screen_type == last_screen_type:
-              screen_repeat_count += 1
-          else:
-              screen_repeat_count = 1
-              last_screen_type = screen_type
-          json_data['time_on_screen'] = turn_duration
-          json_data['attempts'] = attempts
-          json_data['last_action'] = last_action
-          json_data['screen_repeat_count'] = screen_repeat_count
-          screen_analyses.append(json_data)
-          print(f"\n✓ Captured analysis for: {json_data.get('screen_type', 'unknown')}")
-  
-  # Print summary of collected analyses
-  print("\n" + "="*60)
-  print(f"SUMMARY: Collected {len(screen_analyses)} screen analyses")
-  print("="*60)
-  for analysis in screen_analyses:
-      print(f"  - Turn {analysis['turn']}: {analysis.get('screen_type', 'unknown')} (confidence: {analysis.get('confidence', 0):.2f})")
-  print("="*60)
-
-finally:
-    # Cleanup
-    print("\nClosing browser...")
-    browser.close()
-    playwright.stop()
-    print(screen_analyses)
+    return function_responses, screenshot_bytes
+
+
+def run_assessment(start_url: str = START_URL, turn_limit: int = TURN_LIMIT,
+                   pool: BrowserPool = None, run_id: str = None,
+                   mode: str = RUN_MODE, trace_name: str = None) -> list:
+    """
+    Run one mystery-shopper assessment on a warm page from `pool`
+    (defaults to the process-wide pool).
+
+    mode "record" saves the model's turns with before/after screen
+    fingerprints (under trace_name, default the start URL) once the agent
+    finishes within turn_limit. mode "replay"
+    re-runs those turns without calling the model until the page stops
+    matching the recording, then continues live.
+
+    Returns the list of screen analyses collected along the way.
+    """
+    pool = pool or get_browser_pool()
+    client = get_client()
+    run_id = run_id or f"vision-{time.strftime('%Y%m%d-%H%M%S')}"
+    evidence = EvidenceStore(Path(EVIDENCE_ROOT) / run_id)
+    log = AnalysisLog()
+
+    check_mode(mode)
+    name = trace_name or start_url
+    replay = ActionTrace.load("vision", name) if mode == "replay" else None
+    if mode == "replay" and replay is None:
+        print(f"No recorded trace for {name}; running live.")
+    recording = ActionTrace("vision", name, meta={"start_url": start_url})
+    ttfa_log = []   # time to first action per streamed turn (ms)
+    completed = False
+
+    history = ConversationHistory(
+        max_screenshots=HISTORY_MAX_SCREENSHOTS,
+        max_bytes=HISTORY_MAX_BYTES,
+        max_tokens=HISTORY_MAX_TOKENS,
+    )
+
+    try:
+        with trace_run(run_id), span("assessment", start_url=start_url), pool.session() as page:
+            # Go to initial page
+            page.goto(start_url)
+
+            # Configure the model with system prompt
+            config = build_config()
+
+            initial_screenshot = page.screenshot(type="png")
+            evidence.put(0, initial_screenshot, url=page.url)
+            print(f"Goal: Mystery Shopping Assessment")
+            print(f"Instructions: {INITIAL_TASK_PROMPT[:100]}...")
+
+            initial_encoded = encode_for_model(initial_screenshot)
+            print(f"Initial screenshot encoded: {initial_encoded.describe()}")
+            history.start(INITIAL_TASK_PROMPT, initial_encoded.data, mime_type=initial_encoded.mime_type)
+            screen = fingerprint(initial_screenshot)
+
+            for i in range(turn_limit):
+                with span("turn", step=i + 1) as turn_span:
+                    turn_start_time = time.time()
+                    print(f"\n--- Turn {i+1} ---")
+                    recorded = replay.step(i) if replay else None
+                    results = None
+                    if recorded is not None and same_screen(screen, recorded["before"]):
+                        print("Replaying recorded turn...")
+                        candidate = replayed_candidate(recorded)
+                        pending_jsons = parse_analyses(candidate, i + 1, page.url)
+                        turn_span.set(replayed=True)
+                    else:
+                        if recorded is not None:
+                            print(f"Replay diverged at turn {i+1}; continuing live.")
+                            replay = None
+                        contents = history.contents()
+                        stats = history.payload_log[-1]
+                        print(f"Payload: {stats.bytes / 1024:.1f} KB (~{stats.approx_tokens} tokens, "
+                              f"{stats.inline_screenshots} screenshots inline, {stats.compacted_turns} turns compacted)")
+                        print("Thinking...")
+
+                        # Each function call runs as soon as it arrives; the rest keeps streaming
+                        streamed = StreamedTurn()
+                        results = []
+                        request_start = time.perf_counter()
+                        with span("model_request", model=COMPUTER_USE_MODEL, payload_bytes=stats.bytes) as request_span:
+                            for chunk in client.models.generate_content_stream(
+                                model=COMPUTER_USE_MODEL,
+                                contents=contents,
+                                config=config,
+                            ):
+                                for function_call in streamed.feed(chunk):
+                                    if not results:
+                                        ttfa_ms = round((time.perf_counter() - request_start) * 1000)
+                                        request_span.set(time_to_first_action_ms=ttfa_ms)
+                                        turn_span.set(time_to_first_action_ms=ttfa_ms)
+                                        ttfa_log.append(ttfa_ms)
+                                        print(f"\nFirst action after {ttfa_ms} ms")
+                                    with span("function_execution", actions=[function_call.name]):
+                                        results.append(execute_function_call(
+                                            function_call, page, SCREEN_WIDTH, SCREEN_HEIGHT))
+                        streamed.finish()
+
+                        candidate = streamed.candidate
+                        pending_jsons = [stamp_analysis(a, i + 1, page.url) for a in streamed.analyses]
+
+                    function_calls = [part.function_call for part in candidate.content.parts if part.function_call]
+                    attempts = len(function_calls)
+                    last_action = function_calls[-1].name if function_calls else None
+                    turn_span.set(function_calls=attempts)
+                    if not function_calls:
+                        with span("state_update"):
+                            log.record(pending_jsons, max(0, round(time.time() - turn_start_time)), attempts, last_action)
+                            recording.add(turn=i + 1, before=screen, after=None, content=candidate_for_trace(candidate))
+                        print("\nAgent finished exploration.")
+                        completed = True
+                        break
+
+                    if results is None:
+                        print("Executing actions...")
+                        with span("function_execution", actions=[fc.name for fc in function_calls]):
+                            results = execute_function_calls(candidate, page, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+                    print("Capturing state...")
+                    with span("screenshot"):
+                        function_responses, screenshot_bytes = get_function_responses(page, results, evidence, i + 1)
+                        after = fingerprint(screenshot_bytes)
+
+                    with span("state_update"):
+                        history.add_turn(
+                            candidate.content,
+                            Content(role="user", parts=[Part(function_response=fr) for fr in function_responses]),
+                            summary=turn_summary(i + 1, pending_jsons, function_calls, page.url),
+                        )
+                        log.record(pending_jsons, max(0, round(time.time() - turn_start_time)), attempts, last_action)
+                        recording.add(turn=i + 1, before=screen, after=after, content=candidate_for_trace(candidate))
+                        screen = after
+
+    finally:
+        evidence.close()
+
+    if mode == "record" and completed:
+        print(f"Action trace saved: {recording.save()}")
+    elif mode == "record":
+        print("Turn limit reached; action trace not saved.")
+
+    # Print summary of collected analyses
+    print("\n" + "="*60)
+    print(f"SUMMARY: Collected {len(log.analyses)} screen analyses")
+    print("="*60)
+    for analysis in log.analyses:
+        print(f"  - Turn {analysis['turn']}: {analysis.get('screen_type', 'unknown')} (confidence: {analysis.get('confidence', 0):.2f})")
+    print("Payload per turn (KB):", [round(s.bytes / 1024, 1) for s in history.payload_log])
+    print("Time to first action per turn (ms):", ttfa_log)
+    print("="*60)
+
+    return log.analyses
+
+
+if __name__ == "__main__":
+    pool = BrowserPool(headless=False)
+    try:
+        print(run_assessment(pool=pool))
+    finally:
+        print("\nClosing browser...")
+        pool.close()
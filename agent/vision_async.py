@@ -0,0 +1,299 @@
+"""
+asyncio version of the mystery shopper loop in agent/vision.py.
+
+Uses async Playwright and the async genai client (client.aio). Evidence
+goes through the EvidenceStore writer thread and screenshot encoding runs
+in a worker thread, so the write of turn N overlaps with the model request
+for turn N+1. One process can drive many
+browser contexts at once with run_assessments_async().
+
+    python -m agent.vision_async
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from pathlib import Path
+
+from google.genai.types import Content, Part
+from google.genai import types
+from playwright.async_api import async_playwright
+
+from agent.prompts import INITIAL_TASK_PROMPT
+from agent.computer_use import (
+    COMPUTER_USE_MODEL,
+    START_URL,
+    SCREEN_WIDTH,
+    SCREEN_HEIGHT,
+    AnalysisLog,
+    get_client,
+    build_config,
+    parse_analyses,
+    stamp_analysis,
+    StreamedTurn,
+    denormalize_x,
+    denormalize_y,
+)
+from agent.history import ConversationHistory, turn_summary
+from agent.imaging import encode_for_model
+from agent.action_trace import (
+    ActionTrace,
+    candidate_for_trace,
+    check_mode,
+    fingerprint,
+    replayed_candidate,
+    same_screen,
+)
+from agent.tracing import span, trace_run
+from controller.stability import wait_for_page_stable_async
+from evidence.collector import EvidenceStore
+from config.settings import (
+    EVIDENCE_ROOT,
+    HISTORY_MAX_SCREENSHOTS,
+    HISTORY_MAX_BYTES,
+    HISTORY_MAX_TOKENS,
+    RUN_MODE,
+)
+
+TURN_LIMIT = 15
+
+
+async def execute_function_call_async(function_call, page, screen_width, screen_height):
+    """Run one computer-use call on the page. Returns (name, result)."""
+    action_result = {}
+    fname = function_call.name
+    args = function_call.args
+    print(f"  -> Executing: {fname}")
+
+    try:
+        if fname == "open_web_browser":
+            pass # Already open
+        elif fname == "click_at":
+            actual_x = denormalize_x(args["x"], screen_width)
+            actual_y = denormalize_y(args["y"], screen_height)
+            await page.mouse.click(actual_x, actual_y)
+        elif fname == "type_text_at":
+            actual_x = denormalize_x(args["x"], screen_width)
+            actual_y = denormalize_y(args["y"], screen_height)
+            text = args["text"]
+            press_enter = args.get("press_enter", False)
+
+            await page.mouse.click(actual_x, actual_y)
+            await page.keyboard.press("Meta+A")
+            await page.keyboard.press("Backspace")
+            await page.keyboard.type(text)
+            if press_enter:
+                await page.keyboard.press("Enter")
+        else:
+            print(f"Warning: Unimplemented or custom function {fname}")
+
+        settle = await wait_for_page_stable_async(page)
+        if not settle.stable:
+            print(f"  (page still changing after {settle.elapsed:.1f}s)")
+
+    except Exception as e:
+        print(f"Error executing {fname}: {e}")
+        action_result = {"error": str(e)}
+
+    return fname, action_result
+
+
+async def execute_function_calls_async(candidate, page, screen_width, screen_height):
+    results = []
+    for part in candidate.content.parts:
+        if part.function_call:
+            results.append(await execute_function_call_async(part.function_call, page, screen_width, screen_height))
+    return results
+
+
+async def get_function_responses_async(page, results, evidence, step):
+    """
+    Screenshot the page, hand it to the evidence writer and return the
+    FunctionResponses built from the encoded upload copy.
+    """
+    screenshot_bytes = await page.screenshot(type="png")
+    current_url = page.url
+    screenshot_path = evidence.put(step, screenshot_bytes, url=current_url,
+                                   actions=[name for name, _ in results])
+
+    encoded = await asyncio.to_thread(encode_for_model, screenshot_bytes)
+    print(f"  Encoded: {encoded.describe()}")
+
+    function_responses = []
+    for name, result in results:
+        response_data = {"url": current_url, "screenshot_path": str(screenshot_path)}
+        response_data.update(result)
+        function_responses.append(
+            types.FunctionResponse(
+                name=name,
+                response=response_data,
+                parts=[types.FunctionResponsePart(
+                        inline_data=types.FunctionResponseBlob(
+                            mime_type=encoded.mime_type,
+                            data=encoded.data))
+                ]
+            )
+        )
+    return function_responses, screenshot_bytes
+
+
+async def run_assessment_async(context, start_url: str = START_URL, turn_limit: int = TURN_LIMIT,
+                               run_id: str = None, client=None, mode: str = RUN_MODE,
+                               trace_name: str = None) -> list:
+    """
+    Run one mystery-shopper assessment in an existing browser context.
+    mode / trace_name work as in agent.vision.run_assessment.
+
+    Returns the list of screen analyses collected along the way.
+    """
+    client = client or get_client()
+    run_id = run_id or f"vision-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    evidence = EvidenceStore(Path(EVIDENCE_ROOT) / run_id)
+    config = build_config()
+
+    page = await context.new_page()
+    log = AnalysisLog()
+
+    check_mode(mode)
+    name = trace_name or start_url
+    replay = ActionTrace.load("vision", name) if mode == "replay" else None
+    if mode == "replay" and replay is None:
+        print(f"[{run_id}] No recorded trace for {name}; running live.")
+    recording = ActionTrace("vision", name, meta={"start_url": start_url})
+    completed = False
+
+    history = ConversationHistory(
+        max_screenshots=HISTORY_MAX_SCREENSHOTS,
+        max_bytes=HISTORY_MAX_BYTES,
+        max_tokens=HISTORY_MAX_TOKENS,
+    )
+
+    try:
+        with trace_run(run_id), span("assessment", start_url=start_url):
+            await page.goto(start_url)
+            initial_screenshot = await page.screenshot(type="png")
+            evidence.put(0, initial_screenshot, url=page.url)
+            initial_encoded = await asyncio.to_thread(encode_for_model, initial_screenshot)
+            history.start(INITIAL_TASK_PROMPT, initial_encoded.data, mime_type=initial_encoded.mime_type)
+            print(f"[{run_id}] Goal: Mystery Shopping Assessment")
+            screen = await asyncio.to_thread(fingerprint, initial_screenshot)
+
+            for i in range(turn_limit):
+                with span("turn", step=i + 1) as turn_span:
+                    turn_start_time = time.time()
+                    print(f"\n--- [{run_id}] Turn {i+1} ---")
+
+                    recorded = replay.step(i) if replay else None
+                    results = None
+                    if recorded is not None and same_screen(screen, recorded["before"]):
+                        candidate = replayed_candidate(recorded)
+                        pending_jsons = parse_analyses(candidate, i + 1, page.url)
+                        turn_span.set(replayed=True)
+                    else:
+                        if recorded is not None:
+                            print(f"[{run_id}] Replay diverged at turn {i+1}; continuing live.")
+                            replay = None
+                        contents = history.contents()
+                        stats = history.payload_log[-1]
+                        print(f"[{run_id}] Payload: {stats.bytes / 1024:.1f} KB (~{stats.approx_tokens} tokens)")
+
+                        # Evidence writes from the previous turn keep running meanwhile, and
+                        # each function call runs as soon as it arrives on the stream
+                        streamed = StreamedTurn()
+                        results = []
+                        request_start = time.perf_counter()
+                        with span("model_request", model=COMPUTER_USE_MODEL, payload_bytes=stats.bytes) as request_span:
+                            stream = await client.aio.models.generate_content_stream(
+                                model=COMPUTER_USE_MODEL,
+                                contents=contents,
+                                config=config,
+                            )
+                            async for chunk in stream:
+                                for function_call in streamed.feed(chunk):
+                                    if not results:
+                                        ttfa_ms = round((time.perf_counter() - request_start) * 1000)
+                                        request_span.set(time_to_first_action_ms=ttfa_ms)
+                                        turn_span.set(time_to_first_action_ms=ttfa_ms)
+                                        print(f"\n[{run_id}] First action after {ttfa_ms} ms")
+                                    with span("function_execution", actions=[function_call.name]):
+                                        results.append(await execute_function_call_async(
+                                            function_call, page, SCREEN_WIDTH, SCREEN_HEIGHT))
+                        streamed.finish()
+
+                        candidate = streamed.candidate
+                        pending_jsons = [stamp_analysis(a, i + 1, page.url) for a in streamed.analyses]
+
+                    function_calls = [part.function_call for part in candidate.content.parts if part.function_call]
+                    attempts = len(function_calls)
+                    last_action = function_calls[-1].name if function_calls else None
+                    turn_span.set(function_calls=attempts)
+                    if not function_calls:
+                        with span("state_update"):
+                            log.record(pending_jsons, max(0, round(time.time() - turn_start_time)), attempts, last_action)
+                            recording.add(turn=i + 1, before=screen, after=None, content=candidate_for_trace(candidate))
+                        print(f"\n[{run_id}] Agent finished exploration.")
+                        completed = True
+                        break
+
+                    if results is None:
+                        with span("function_execution", actions=[fc.name for fc in function_calls]):
+                            results = await execute_function_calls_async(candidate, page, SCREEN_WIDTH, SCREEN_HEIGHT)
+                    with span("screenshot"):
+                        function_responses, screenshot_bytes = await get_function_responses_async(
+                            page, results, evidence, i + 1
+                        )
+                        after = await asyncio.to_thread(fingerprint, screenshot_bytes)
+
+                    with span("state_update"):
+                        history.add_turn(
+                            candidate.content,
+                            Content(role="user", parts=[Part(function_response=fr) for fr in function_responses]),
+                            summary=turn_summary(i + 1, pending_jsons, function_calls, page.url),
+                        )
+                        log.record(pending_jsons, max(0, round(time.time() - turn_start_time)), attempts, last_action)
+                        recording.add(turn=i + 1, before=screen, after=after, content=candidate_for_trace(candidate))
+                        screen = after
+
+    finally:
+        # Make sure every screenshot is on disk before we report back
+        await asyncio.to_thread(evidence.close)
+        await page.close()
+
+    if mode == "record" and completed:
+        print(f"[{run_id}] Action trace saved: {recording.save()}")
+    elif mode == "record":
+        print(f"[{run_id}] Turn limit reached; action trace not saved.")
+
+    return log.analyses
+
+
+async def run_assessments_async(start_urls, max_contexts: int = 4, headless: bool = True,
+                                turn_limit: int = TURN_LIMIT) -> list:
+    """
+    Run one assessment per start URL, at most `max_contexts` at a time, all
+    sharing a single Chromium process. Returns one analyses list per URL.
+    """
+    semaphore = asyncio.Semaphore(max_contexts)
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=headless)
+
+        async def one(url):
+            async with semaphore:
+                context = await browser.new_context(viewport={"width": SCREEN_WIDTH, "height": SCREEN_HEIGHT})
+                try:
+                    return await run_assessment_async(context, start_url=url, turn_limit=turn_limit)
+                finally:
+                    await context.close()
+
+        try:
+            return await asyncio.gather(*(one(url) for url in start_urls))
+        finally:
+            await browser.close()
+
+
+if __name__ == "__main__":
+    urls = [u for u in os.getenv("SPECTER_START_URLS", START_URL).split(",") if u.strip()]
+    for analyses in asyncio.run(run_assessments_async(urls, headless=False)):
+        print(analyses)
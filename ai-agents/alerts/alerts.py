@@ -3,13 +3,19 @@
 from __future__ import annotations
 
 import logging
+import re
+import time
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, Protocol
+from urllib.parse import parse_qs, urlsplit
 
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
+from ai.alerts.ratelimit import RateLimited, RetryLater, get_rate_limiter, retry_after, send_limited
 from ai.config import MultiChannelConfig
 from ai.models.report import IssueReport, Severity, Team
 
@@ -32,6 +38,17 @@ CHANNEL_BY_TEAM: dict[Team, str] = {
 }
 P0_CHANNEL = "#incidents"
 
+_ARCHIVES_LINK = re.compile(r"/archives/([A-Z0-9]+)/p(\d{10})(\d{6})")
+
+# Seconds each backend gets before its AlertResult is reported as failed.
+# Slack is longer: its 429/5xx retries back off on top of the request.
+DEFAULT_DEADLINES: dict[str, float] = {
+    "slack": 30.0,
+    "teams": 15.0,
+    "discord": 15.0,
+    "webhook": 15.0,
+}
+
 
 class AlertBackend(Protocol):
     def send(
@@ -39,7 +56,21 @@ class AlertBackend(Protocol):
         report: IssueReport,
         screenshot_url: str,
         test_id: str,
+    ) -> Future[str]:
+        """Queue the alert; the Future resolves to its permalink. See ratelimit.send_and_wait to block."""
+        ...
+
+    def rate_key(self, report: IssueReport) -> str:
+        """Channel the report goes to; one rate-limit bucket per (backend, channel)."""
+        ...
+
+    def deliver(
+        self,
+        report: IssueReport,
+        screenshot_url: str,
+        test_id: str,
     ) -> str:
+        """A single attempt; raises RetryLater / RateLimited instead of sleeping."""
         ...
 
 
@@ -52,6 +83,19 @@ class AlertResult:
     details: dict[str, Any] = field(default_factory=dict)
 
 
+def slack_message_ref(permalink: str | None) -> tuple[str, str] | None:
+    """(channel_id, ts) from a permalink or our app_redirect fallback URL; None if it has no ts."""
+    if not permalink:
+        return None
+    match = _ARCHIVES_LINK.search(permalink)
+    if match:
+        return match.group(1), f"{match.group(2)}.{match.group(3)}"
+    query = parse_qs(urlsplit(permalink).query)
+    if query.get("channel") and query.get("message_ts"):
+        return query["channel"][0], query["message_ts"][0]
+    return None
+
+
 class AlertRouter:
     """Slack Block Kit: channel by team/severity, compose blocks, post, permalink."""
 
@@ -65,7 +109,7 @@ class AlertRouter:
         report: IssueReport,
         screenshot_url: str,
         test_id: str,
-    ) -> str:
+    ) -> Future[str]:
         return self.send_alert(report, screenshot_url, test_id)
 
     def send_alert(
@@ -73,7 +117,20 @@ class AlertRouter:
         report: IssueReport,
         screenshot_url: str,
         test_id: str,
+    ) -> Future[str]:
+        """Queue the post; the Future resolves to the message permalink."""
+        return send_limited("slack", self, report, screenshot_url, test_id)
+
+    def rate_key(self, report: IssueReport) -> str:
+        return self._get_channel(report)
+
+    def deliver(
+        self,
+        report: IssueReport,
+        screenshot_url: str,
+        test_id: str,
     ) -> str:
+        """One post + permalink. 429s and 5xx raise RetryLater for the limiter to reschedule."""
         channel = self._get_channel(report)
         mentions = self._get_mentions(report)
         blocks = self.compose_blocks(report, screenshot_url, test_id, mentions)
@@ -81,7 +138,7 @@ class AlertRouter:
         fallback_text = f"{SEVERITY_EMOJI.get(report.severity, '')} {report.title}"
 
         try:
-            response = self._post_with_retry(channel, fallback_text, blocks)
+            response = self._post(channel, fallback_text, blocks)
         except SlackApiError as e:
             logger.exception("Slack chat_postMessage failed: %s", e.response.get("error"))
             raise
@@ -108,35 +165,59 @@ class AlertRouter:
 
         return f"https://slack.com/app_redirect?channel={channel_id}&message_ts={message_ts}"
 
-    def _post_with_retry(
+    def update(
+        self,
+        report: IssueReport,
+        screenshot_url: str,
+        test_id: str,
+        permalink: str | None,
+        occurrences: int,
+    ) -> str:
+        """Edit the message at `permalink` to show the occurrence count (chat.update; no new post)."""
+        ref = slack_message_ref(permalink)
+        if ref is None:
+            raise RuntimeError(f"Cannot find the Slack message to update from {permalink!r}")
+        channel, ts = ref
+        blocks = self.compose_blocks(report, screenshot_url, test_id, self._get_mentions(report), occurrences)
+        fallback_text = f"{SEVERITY_EMOJI.get(report.severity, '')} {report.title} (seen {occurrences}x)"
+        try:
+            response = self._client.chat_update(channel=channel, ts=ts, text=fallback_text, blocks=blocks)
+        except SlackApiError as e:
+            self._raise_retryable(e, self._get_channel(report))
+            logger.exception("Slack chat_update failed: %s", e.response.get("error"))
+            raise
+        if not response.get("ok"):
+            raise RuntimeError(f"Slack API returned ok=false: {response.get('error', 'unknown')}")
+        return permalink or ""
+
+    def _post(
         self,
         channel: str,
         text: str,
         blocks: list[dict[str, Any]],
-        max_retries: int = 3,
     ) -> Any:
-        import time
-        last_error: Exception | None = None
-        for attempt in range(max_retries):
-            try:
-                return self._client.chat_postMessage(
-                    channel=channel,
-                    text=text,
-                    blocks=blocks,
-                    unfurl_links=False,
-                    unfurl_media=False,
-                )
-            except SlackApiError as e:
-                last_error = e
-                if e.response.status_code == 429:
-                    wait = int(e.response.headers.get("Retry-After", 2 ** attempt))
-                    logger.warning("Slack rate limit; retrying after %ss", wait)
-                    time.sleep(wait)
-                elif e.response.status_code >= 500 and attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                else:
-                    raise
-        raise last_error or RuntimeError("Slack post failed after retries")
+        try:
+            return self._client.chat_postMessage(
+                channel=channel,
+                text=text,
+                blocks=blocks,
+                unfurl_links=False,
+                unfurl_media=False,
+            )
+        except SlackApiError as e:
+            self._raise_retryable(e, channel)
+            raise
+
+    def _raise_retryable(self, e: SlackApiError, channel: str) -> None:
+        """Turn 429s and 5xx into RetryLater for the limiter; other errors are left to the caller."""
+        headers = e.response.headers or {}
+        get_rate_limiter().observe("slack", channel, headers)
+        if e.response.status_code == 429:
+            wait = retry_after(headers) or 1.0
+            logger.warning("Slack rate limit on %s; retrying after %ss", channel, wait)
+            raise RateLimited(wait, f"Slack rate limited on {channel}") from e
+        if e.response.status_code >= 500:
+            raise RetryLater(None, f"Slack returned {e.response.status_code}") from e
 
     def _get_channel(self, report: IssueReport) -> str:
         if report.severity == Severity.P0:
@@ -154,6 +235,7 @@ class AlertRouter:
         screenshot_url: str,
         test_id: str,
         mentions: str = "",
+        occurrences: int = 1,
     ) -> list[dict[str, Any]]:
         emoji = SEVERITY_EMOJI.get(report.severity, "⚪")
         header_text = f"{emoji} {report.title}"
@@ -209,35 +291,67 @@ class AlertRouter:
         })
 
         ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-        blocks.append({
-            "type": "context",
-            "elements": [
-                {"type": "mrkdwn", "text": f"Test ID: `{test_id}`"},
-                {"type": "mrkdwn", "text": f"Timestamp: {ts}"},
-            ],
-        })
+        context = [
+            {"type": "mrkdwn", "text": f"Test ID: `{test_id}`"},
+            {"type": "mrkdwn", "text": f"Timestamp: {ts}"},
+        ]
+        if occurrences > 1:
+            # Set when duplicates of this report are folded into the message (ai.routing.outbox)
+            context.append({"type": "mrkdwn", "text": f"*Seen {occurrences} times* (last {ts})"})
+        blocks.append({"type": "context", "elements": context})
 
         return blocks
 
 
 class MultiChannelAlertRouter:
-    """Sends one report to Slack, Teams, Discord, Jira. One AlertResult per backend."""
-
-    def __init__(self, config: MultiChannelConfig) -> None:
+    """
+    Sends one report to Slack, Teams, Discord, Jira. One AlertResult per backend.
+
+    Backends run concurrently on the process-wide RateLimiter (per-channel
+    token buckets, scheduled retries), each against its own deadline
+    (DEFAULT_DEADLINES, overridable per backend). A backend that misses its
+    deadline is reported as failed: dropped if it had not started, else
+    marked in_flight, since that send may still be delivered.
+    Every result carries latency_ms and deadline_s in details.
+    """
+
+    def __init__(
+        self,
+        config: MultiChannelConfig,
+        deadlines: dict[str, float] | None = None,
+    ) -> None:
         from ai.alerts.backends.teams import TeamsAlertBackend
         from ai.alerts.backends.discord import DiscordAlertBackend
         from ai.alerts.backends.webhook import WebhookAlertBackend
+        from ai.alerts.transport import shared_transport
 
+        # One keep-alive pool for every webhook backend (and every router with these settings)
+        transport = shared_transport(
+            timeout=config.http_timeout,
+            connect_timeout=config.http_connect_timeout,
+            max_per_host=config.http_max_per_host,
+        )
         self._slack_router = AlertRouter(slack_token=config.slack_token)
         self._backends = [
             ("slack", self._slack_router),
-            ("teams", TeamsAlertBackend(config.teams_webhook_url)),
-            ("discord", DiscordAlertBackend(config.discord_webhook_url)),
+            ("teams", TeamsAlertBackend(config.teams_webhook_url, transport=transport)),
+            ("discord", DiscordAlertBackend(config.discord_webhook_url, transport=transport)),
             ("webhook", WebhookAlertBackend(
                 jira_url=config.jira_webhook_url,
                 jira_webhook_secret=config.jira_webhook_secret,
+                transport=transport,
             )),
         ]
+        self._deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+        for name, seconds in self._deadlines.items():
+            if seconds <= 0:
+                raise ValueError(f"deadline for {name} must be positive, got {seconds}")
+        self._limiter = get_rate_limiter()
+
+    @property
+    def backends(self) -> dict[str, AlertBackend]:
+        """Backends by name, e.g. for ai.routing.outbox.OutboxWorkerPool."""
+        return dict(self._backends)
 
     def get_slack_blocks(
         self,
@@ -254,18 +368,62 @@ class MultiChannelAlertRouter:
         screenshot_url: str,
         test_id: str,
     ) -> list[AlertResult]:
-        results: list[AlertResult] = []
+        """All backend results, in the order they finished."""
+        return list(self.iter_alert(report, screenshot_url, test_id))
+
+    def iter_alert(
+        self,
+        report: IssueReport,
+        screenshot_url: str,
+        test_id: str,
+    ) -> Iterator[AlertResult]:
+        """Dispatch to every backend at once; yield each AlertResult as it finishes."""
+        started = time.monotonic()
+        finished: dict[Future[str], float] = {}
+        pending: dict[Future[str], tuple[str, float]] = {}
         for name, backend in self._backends:
-            try:
-                permalink = backend.send(report, screenshot_url, test_id)
-                results.append(AlertResult(permalink=permalink, backend=name, success=True))
-            except Exception as e:  # noqa: BLE001
-                logger.exception("Backend %s failed", name)
-                results.append(
-                    AlertResult(
-                        backend=name,
-                        success=False,
-                        error=str(e),
-                    )
+            deadline = self._deadlines.get(name, max(DEFAULT_DEADLINES.values()))
+            future = self._limiter.submit(
+                name, backend.rate_key(report), backend.deliver, report, screenshot_url, test_id,
+            )
+            future.add_done_callback(lambda f: finished.setdefault(f, time.monotonic()))
+            pending[future] = (name, deadline)
+
+        while pending:
+            now = time.monotonic()
+            first_due = started + min(deadline for _, deadline in pending.values())
+            timeout = max(0.0, first_due - now)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, deadline = pending.pop(future)
+                latency_ms = round((finished.get(future, time.monotonic()) - started) * 1000, 1)
+                details = {"latency_ms": latency_ms, "deadline_s": deadline}
+                error = future.exception()
+                if error is None:
+                    yield AlertResult(permalink=future.result(), backend=name, success=True, details=details)
+                else:
+                    logger.error("Backend %s failed", name, exc_info=error)
+                    yield AlertResult(backend=name, success=False, error=str(error), details=details)
+
+            now = time.monotonic()
+            for future, (name, deadline) in list(pending.items()):
+                if now < started + deadline:
+                    continue
+                del pending[future]
+                # cancel() fails once the send has started; it may still land
+                in_flight = not future.cancel()
+                logger.error(
+                    "Backend %s missed its %.1fs deadline%s",
+                    name, deadline, " (send still in flight)" if in_flight else "",
+                )
+                yield AlertResult(
+                    backend=name,
+                    success=False,
+                    error=f"deadline exceeded after {deadline:g}s" + ("; send still in flight" if in_flight else ""),
+                    details={
+                        "latency_ms": round((now - started) * 1000, 1),
+                        "deadline_s": deadline,
+                        "timed_out": True,
+                        "in_flight": in_flight,
+                    },
                 )
-        return results
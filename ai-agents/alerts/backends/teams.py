@@ -2,12 +2,12 @@
 
 from __future__ import annotations
 
-import json
 import logging
-import urllib.error
-import urllib.request
+from concurrent.futures import Future
 from typing import Any
 
+from ai.alerts.ratelimit import RateLimited, RetryLater, get_rate_limiter, retry_after, send_limited
+from ai.alerts.transport import TRANSPORT_ERRORS, HttpTransport, shared_transport
 from ai.models.report import IssueReport, Severity
 
 logger = logging.getLogger(__name__)
@@ -21,37 +21,48 @@ SEVERITY_EMOJI = {
 
 
 class TeamsAlertBackend:
-    def __init__(self, webhook_url: str) -> None:
+    def __init__(self, webhook_url: str, transport: HttpTransport | None = None) -> None:
         if not webhook_url or not webhook_url.strip():
             raise ValueError("teams_webhook_url is required")
         self._webhook_url = webhook_url.strip()
+        self._transport = transport or shared_transport()
 
     def send(
         self,
         report: IssueReport,
         screenshot_url: str,
         test_id: str,
+    ) -> Future[str]:
+        return send_limited("teams", self, report, screenshot_url, test_id)
+
+    def rate_key(self, report: IssueReport) -> str:
+        return self._webhook_url
+
+    def deliver(
+        self,
+        report: IssueReport,
+        screenshot_url: str,
+        test_id: str,
     ) -> str:
+        """One POST. Raises RateLimited on 429 and RetryLater on 5xx or a transport error so the limiter reschedules it."""
         card = self._build_adaptive_card(report, screenshot_url, test_id)
         payload = {"type": "message", "attachments": [{"contentType": "application/vnd.microsoft.card.adaptive", "content": card}]}
 
-        req = urllib.request.Request(
-            self._webhook_url,
-            data=json.dumps(payload).encode("utf-8"),
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
         try:
-            with urllib.request.urlopen(req, timeout=15) as resp:
-                if resp.status not in (200, 201, 202):
-                    raise RuntimeError(f"Teams webhook returned {resp.status}")
-        except urllib.error.HTTPError as e:
-            body = e.read().decode("utf-8", errors="replace")
-            logger.error("Teams webhook HTTP error: %s %s", e.code, body)
-            raise RuntimeError(f"Teams webhook failed: {e.code} - {body}") from e
-        except urllib.error.URLError as e:
-            logger.exception("Teams webhook request failed")
-            raise RuntimeError(f"Teams webhook request failed: {e}") from e
+            resp = self._transport.post_json(self._webhook_url, payload)
+        except TRANSPORT_ERRORS as e:
+            # Timeouts, resets, a full pool: the next attempt may well get through
+            raise RetryLater(None, f"Teams webhook request failed: {e}") from e
+        get_rate_limiter().observe("teams", self._webhook_url, resp.headers)
+        if resp.status == 429:
+            raise RateLimited(retry_after(resp.headers) or 1.0, "Teams webhook rate limited")
+        if resp.status >= 500:
+            raise RetryLater(None, f"Teams webhook returned {resp.status}")
+        if resp.status >= 400:
+            logger.error("Teams webhook HTTP error: %s %s", resp.status, resp.text)
+            raise RuntimeError(f"Teams webhook failed: {resp.status} - {resp.text}")
+        if resp.status not in (200, 201, 202):
+            raise RuntimeError(f"Teams webhook returned {resp.status}")
 
         return self._webhook_url
 
@@ -2,53 +2,116 @@
 
 from __future__ import annotations
 
-import json
 import logging
-import urllib.error
-import urllib.request
+from concurrent.futures import Future
 from typing import Any
 
+from ai.alerts.ratelimit import RateLimited, RetryLater, get_rate_limiter, retry_after, send_limited
+from ai.alerts.transport import TRANSPORT_ERRORS, HttpTransport, shared_transport
 from ai.models.report import IssueReport
 
 logger = logging.getLogger(__name__)
 
 
+def _fingerprint_label(fingerprint: str) -> str:
+    """Jira label that ties an issue to its report fingerprint (ai.routing.fingerprint)."""
+    return f"ms-fp-{fingerprint[:16]}"
+
+
 class WebhookAlertBackend:
     """Jira webhook. Secret sent as X-Automation-Webhook-Token when set."""
 
-    def __init__(self, jira_url: str, jira_webhook_secret: str = "") -> None:
+    def __init__(
+        self,
+        jira_url: str,
+        jira_webhook_secret: str = "",
+        transport: HttpTransport | None = None,
+    ) -> None:
         self._jira_url = (jira_url or "").strip()
         if not self._jira_url:
             raise ValueError("jira_webhook_url is required")
         self._jira_webhook_secret = (jira_webhook_secret or "").strip()
+        self._transport = transport or shared_transport()
 
     def send(
         self,
         report: IssueReport,
         screenshot_url: str,
         test_id: str,
+    ) -> Future[str]:
+        return send_limited("webhook", self, report, screenshot_url, test_id)
+
+    def rate_key(self, report: IssueReport) -> str:
+        return self._jira_url
+
+    def deliver(
+        self,
+        report: IssueReport,
+        screenshot_url: str,
+        test_id: str,
     ) -> str:
+        """One POST. Raises RateLimited on 429 and RetryLater on 5xx or a transport error so the limiter reschedules it."""
         payload = self._build_payload(report, screenshot_url, test_id)
         try:
-            self._post(self._jira_url, self._jira_payload(report, payload))
+            self._post(self._jira_url, self._jira_payload(report, payload), report.metadata.get("idempotency_key"))
             return "jira:ok"
+        except RetryLater:
+            raise
         except Exception as e:
             logger.exception("Jira webhook failed")
             raise RuntimeError(f"Jira webhook failed: {e}") from e
 
-    def _post(self, url: str, data: dict[str, Any]) -> None:
-        headers: dict[str, str] = {"Content-Type": "application/json"}
+    def update(
+        self,
+        report: IssueReport,
+        screenshot_url: str,
+        test_id: str,
+        permalink: str | None,
+        occurrences: int,
+    ) -> str:
+        """
+        Tell Jira the issue happened again instead of creating a new one. The
+        automation finds the issue by its fingerprint label (see _jira_payload).
+        """
+        fingerprint = report.metadata.get("fingerprint")
+        if not fingerprint:
+            raise RuntimeError("Report has no fingerprint; cannot match an existing Jira issue")
+        data = {
+            "event": "occurrence",
+            "summary": report.title,
+            "fingerprint": fingerprint,
+            "labels": [_fingerprint_label(fingerprint)],
+            "occurrences": occurrences,
+            "test_id": test_id,
+        }
+        try:
+            self._post(self._jira_url, data, report.metadata.get("idempotency_key"))
+            return "jira:updated"
+        except RetryLater:
+            raise
+        except Exception as e:
+            logger.exception("Jira occurrence update failed")
+            raise RuntimeError(f"Jira occurrence update failed: {e}") from e
+
+    def _post(self, url: str, data: dict[str, Any], idempotency_key: str | None = None) -> None:
+        headers: dict[str, str] = {}
+        if idempotency_key:
+            # Set by the outbox; lets the receiving automation drop redelivered alerts
+            headers["Idempotency-Key"] = idempotency_key
         if self._jira_webhook_secret:
             headers["X-Automation-Webhook-Token"] = self._jira_webhook_secret
-        req = urllib.request.Request(
-            url,
-            data=json.dumps(data).encode("utf-8"),
-            headers=headers,
-            method="POST",
-        )
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            if resp.status not in (200, 201, 202, 204):
-                raise RuntimeError(f"Webhook returned {resp.status}")
+        try:
+            resp = self._transport.post_json(url, data, headers=headers)
+        except TRANSPORT_ERRORS as e:
+            # Timeouts, resets, a full pool: the next attempt may well get through
+            raise RetryLater(None, f"Jira webhook request failed: {e}") from e
+        get_rate_limiter().observe("webhook", url, resp.headers)
+        if resp.status == 429:
+            raise RateLimited(retry_after(resp.headers) or 1.0, "Jira webhook rate limited")
+        if resp.status >= 500:
+            raise RetryLater(None, f"Jira webhook returned {resp.status}")
+        if resp.status not in (200, 201, 202, 204):
+            raise RuntimeError(f"Webhook returned {resp.status}")
 
     def _build_payload(
         self,
@@ -83,10 +146,14 @@ class WebhookAlertBackend:
             f"*Recommended actions:*\n{payload['recommended_actions']}\n\n"
             f"Screenshot: {payload['screenshot_url']}\nTest ID: {payload['test_id']}"
         )
+        labels = [report.severity.value, report.team.value, "mystery-shopper"]
+        fingerprint = report.metadata.get("fingerprint")
+        if fingerprint:
+            labels.append(_fingerprint_label(fingerprint))
         return {
             "summary": payload["title"],
             "description": description,
-            "labels": [report.severity.value, report.team.value, "mystery-shopper"],
+            "labels": labels,
             "customfield_severity": report.severity.value,
             "customfield_team": report.team.value,
             **{k: v for k, v in payload.items() if k not in ("title", "root_cause", "reproduction_steps", "expected_behavior", "actual_behavior", "recommended_actions", "screenshot_url", "test_id")},
@@ -0,0 +1,374 @@
+"""Process-wide token-bucket rate limiting and scheduled retries for alert delivery."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable, Mapping
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# (requests per second, burst) per backend, from each service's published limits.
+# Buckets are per (backend, channel): a Slack channel, a webhook URL.
+DEFAULT_LIMITS: dict[str, tuple[float, float]] = {
+    "slack": (1.0, 4),       # chat.postMessage: ~1 message/s per channel
+    "discord": (2.5, 5),     # webhooks: 5 requests / 2 s
+    "teams": (4.0, 4),       # incoming webhooks: 4 requests/s
+    "webhook": (10.0, 10),   # Jira automation: no published limit
+}
+FALLBACK_LIMIT = (5.0, 5)
+
+
+class RetryLater(Exception):
+    """Transient failure; the limiter schedules another attempt after `delay` (None = backoff)."""
+
+    def __init__(self, delay: float | None = None, message: str = "") -> None:
+        super().__init__(message or "retry later")
+        self.delay = delay
+
+
+class RateLimited(RetryLater):
+    """The service said 429. The whole bucket waits `delay` seconds, not just this alert."""
+
+    def __init__(self, delay: float, message: str = "") -> None:
+        super().__init__(delay, message or f"rate limited; retry after {delay:g}s")
+
+
+def retry_after(headers: Mapping[str, str] | None) -> float | None:
+    """Seconds to wait from Retry-After (seconds or HTTP date) or X-RateLimit-Reset-After."""
+    lowered = {k.lower(): v for k, v in (headers or {}).items()}
+    for name in ("retry-after", "x-ratelimit-reset-after"):
+        value = lowered.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of blocking.
+
+    reserve() takes a token and returns how long to wait before using it;
+    tokens may go negative, which queues later callers behind earlier ones
+    at exactly `rate`. hold() stops refilling until a Retry-After passes
+    and forgets the queue: reservations made before it are re-reserved by
+    the limiter when they come due inside the hold (see held_for()).
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()   # tokens are accurate as of this time
+        self._hold_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._stamp:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            ready = self._stamp + max(0.0, -self._tokens) / self.rate
+            return max(0.0, ready - now)
+
+    def hold(self, seconds: float) -> None:
+        """Nothing goes out for `seconds`; the bucket refills from empty after it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._stamp:
+                self._tokens = 0.0
+                self._stamp = until
+            self._hold_until = max(self._hold_until, until)
+
+    def held_for(self) -> float:
+        """Seconds left on the current hold (0 if none)."""
+        with self._lock:
+            return max(0.0, self._hold_until - time.monotonic())
+
+    def configure(self, rate: float | None = None, burst: float | None = None) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            if rate and rate > 0:
+                self.rate = float(rate)
+            if burst and burst >= 1:
+                self.burst = float(burst)
+                self._tokens = min(self._tokens, self.burst)
+
+    def sync(self, remaining: float) -> None:
+        """The service reports `remaining` requests left in its window."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, float(remaining))
+
+
+@dataclass
+class _Job:
+    backend: str
+    channel: str
+    fn: Callable[..., Any]
+    args: tuple[Any, ...]
+    future: Future[Any] = field(default_factory=Future)
+    attempt: int = 0
+    slot: bool = False   # holds one of its backend's in-flight slots
+
+
+class RateLimiter:
+    """
+    Buckets per (backend, channel) plus a timer that runs each send when
+    its bucket allows. submit() returns a Future at once; nothing ever
+    sleeps on the caller's thread or a worker. A send that raises
+    RetryLater (RateLimited for 429s) is rescheduled, up to max_retries.
+    At most max_in_flight sends per backend run at once; the rest wait
+    off-thread for a slot, so one hung service can't take every worker.
+    The Future is cancellable until its first attempt starts. After that,
+    cancel() returns False: the send is in flight (or waiting to retry)
+    and may still be delivered, so callers must treat it as still running.
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[str, tuple[float, float]] | None = None,
+        max_workers: int = 16,
+        max_retries: int = 3,
+        base_backoff: float = 1.0,
+        max_in_flight: int = 4,
+    ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+        self.base_backoff = base_backoff
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, int] = defaultdict(int)
+        self._waiting: dict[str, deque[_Job]] = defaultdict(deque)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="alert-send")
+        self._timers: list[tuple[float, int, _Job]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._timer_thread: threading.Thread | None = None
+        self.sent = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    def bucket(self, backend: str, channel: str) -> TokenBucket:
+        key = (backend, channel)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate, burst = self.limits.get(backend, FALLBACK_LIMIT)
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+            return bucket
+
+    def observe(self, backend: str, channel: str, headers: Mapping[str, str] | None) -> None:
+        """Learn from X-RateLimit-Limit / -Remaining / -Reset-After on any response."""
+        lowered = {k.lower(): v for k, v in (headers or {}).items()}
+        try:
+            limit = float(lowered["x-ratelimit-limit"]) if "x-ratelimit-limit" in lowered else None
+            remaining = float(lowered["x-ratelimit-remaining"]) if "x-ratelimit-remaining" in lowered else None
+            reset_after = float(lowered["x-ratelimit-reset-after"]) if "x-ratelimit-reset-after" in lowered else None
+        except ValueError:
+            return
+        if remaining is None:
+            return
+        bucket = self.bucket(backend, channel)
+        # First request of a window: the window length is the reset time
+        if limit and reset_after and remaining == limit - 1:
+            bucket.configure(rate=limit / reset_after, burst=limit)
+        if remaining <= 0 and reset_after:
+            bucket.hold(reset_after)
+        else:
+            bucket.sync(remaining)
+
+    def submit(self, backend: str, channel: str, fn: Callable[..., Any], *args: Any) -> Future[Any]:
+        job = _Job(backend, channel, fn, args)
+        self._schedule(job, self.bucket(backend, channel).reserve())
+        return job.future
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            scheduled = len(self._timers)
+        with self._lock:
+            in_flight = sum(self._in_flight.values())
+            waiting = sum(len(q) for q in self._waiting.values())
+        return {
+            "sent": self.sent,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "scheduled": scheduled,
+            "in_flight": in_flight,
+            "waiting": waiting,
+            "buckets": len(self._buckets),
+        }
+
+    def _schedule(self, job: _Job, delay: float) -> None:
+        if delay <= 0:
+            self._executor.submit(self._run, job)
+            return
+        with self._cond:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._seq), job))
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._timer_loop, name="alert-timer", daemon=True)
+                self._timer_thread.start()
+            self._cond.notify()
+
+    def _timer_loop(self) -> None:
+        with self._cond:
+            while True:
+                if not self._timers:
+                    self._cond.wait()
+                    continue
+                due, _, job = self._timers[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._timers)
+                self._executor.submit(self._run, job)
+
+    def _claim(self, job: _Job) -> bool:
+        """Take an in-flight slot for the job's backend, or queue it for the next free one."""
+        if job.slot:
+            return True
+        with self._lock:
+            if self._in_flight[job.backend] >= self.max_in_flight:
+                self._waiting[job.backend].append(job)
+                return False
+            self._in_flight[job.backend] += 1
+        job.slot = True
+        return True
+
+    def _release(self, job: _Job) -> None:
+        """Give the job's slot to the next waiting send for that backend, if any."""
+        if not job.slot:
+            return
+        job.slot = False
+        with self._lock:
+            waiting = self._waiting[job.backend]
+            successor = waiting.popleft() if waiting else None
+            if successor is None:
+                self._in_flight[job.backend] -= 1
+        if successor is not None:
+            successor.slot = True
+            self._executor.submit(self._run, successor)
+
+    def _run(self, job: _Job) -> None:
+        if job.future.cancelled():
+            self._release(job)
+            return
+        bucket = self.bucket(job.backend, job.channel)
+        if bucket.held_for() > 0:
+            # Reserved before a 429 / exhausted window: queue again behind the hold
+            self._release(job)
+            self._schedule(job, bucket.reserve())
+            return
+        if not self._claim(job):
+            return
+        # From here on cancel() fails; retries keep the future running
+        if not job.future.running() and not job.future.set_running_or_notify_cancel():
+            self._release(job)
+            return
+        try:
+            result = job.fn(*job.args)
+        except BaseException as e:  # noqa: BLE001
+            self._release(job)
+            self._failed(job, bucket, e)
+        else:
+            self._release(job)
+            self._count("sent")
+            self._settle(job, result=result)
+
+    def _failed(self, job: _Job, bucket: TokenBucket, error: BaseException) -> None:
+        """Reschedule a RetryLater while attempts remain; settle anything else as the result."""
+        if isinstance(error, RateLimited):
+            self._count("rate_limited")
+            bucket.hold(error.delay or 0.0)
+        if not isinstance(error, RetryLater) or job.attempt >= self.max_retries:
+            self._settle(job, exception=error)
+            return
+        job.attempt += 1
+        self._count("retries")
+        delay = bucket.reserve()
+        if not isinstance(error, RateLimited):
+            delay = max(delay, error.delay if error.delay is not None else self.base_backoff * 2 ** (job.attempt - 1))
+        logger.warning(
+            "%s (%s) attempt %d: %s; retrying in %.2fs",
+            job.backend, job.channel, job.attempt, error, delay,
+        )
+        self._schedule(job, delay)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _settle(job: _Job, result: Any = None, exception: BaseException | None = None) -> None:
+        try:
+            if exception is not None:
+                job.future.set_exception(exception)
+            else:
+                job.future.set_result(result)
+        except InvalidStateError:
+            pass  # already settled
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """The limiter every router and backend in this process shares."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def send_limited(name: str, backend: Any, report: Any, screenshot_url: str, test_id: str) -> Future[str]:
+    """AlertBackend.send: queue one delivery (retries included) on the shared limiter; returns its Future."""
+    return get_rate_limiter().submit(
+        name, backend.rate_key(report), backend.deliver, report, screenshot_url, test_id,
+    )
+
+
+def send_and_wait(
+    backend: Any,
+    report: Any,
+    screenshot_url: str,
+    test_id: str,
+    timeout: float | None = None,
+) -> str:
+    """
+    Blocking form of backend.send(), for scripts and tests. Raises
+    concurrent.futures.TimeoutError after `timeout` seconds; the send may
+    still be delivered after that. Not for worker threads or event loops.
+    """
+    return backend.send(report, screenshot_url, test_id).result(timeout=timeout)
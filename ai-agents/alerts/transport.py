@@ -0,0 +1,217 @@
+"""Pooled keep-alive HTTP transport shared by the webhook backends (stdlib http.client)."""
+
+from __future__ import annotations
+
+import functools
+import http.client
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "MysteryShopper-Alerts/1.0"
+
+# What a request can fail with before there is a response to inspect
+TRANSPORT_ERRORS = (OSError, http.client.HTTPException)
+
+# A reused connection the server has already closed fails like this on first use
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+class PoolTimeoutError(TimeoutError):
+    """Every connection to the host stayed busy for pool_timeout seconds."""
+
+
+class _HostPool:
+    """Idle connections to one (scheme, host, port), plus a cap on how many may exist."""
+
+    def __init__(self, max_connections: int) -> None:
+        self.idle: deque[tuple[http.client.HTTPConnection, float]] = deque()
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.lock = threading.Lock()
+
+
+class HttpTransport:
+    """
+    Thread-safe pool of persistent HTTP(S) connections.
+
+    Connections are kept per (scheme, host, port), at most max_per_host at
+    a time. Idle ones are reused most-recent-first and dropped after
+    idle_timeout seconds. connect_timeout bounds the TCP/TLS handshake and
+    timeout every read after it. A reused connection the server closed in
+    the meantime is retried once on a fresh one.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 15.0,
+        connect_timeout: float = 5.0,
+        max_per_host: int = 4,
+        pool_timeout: float = 30.0,
+        idle_timeout: float = 60.0,
+    ) -> None:
+        if timeout <= 0 or connect_timeout <= 0:
+            raise ValueError("timeout and connect_timeout must be positive")
+        if max_per_host < 1:
+            raise ValueError("max_per_host must be at least 1")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_per_host = max_per_host
+        self.pool_timeout = pool_timeout
+        self.idle_timeout = idle_timeout
+        self._pools: dict[tuple[str, str, int], _HostPool] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> HttpResponse:
+        """Send one request and read the whole response (any status; no raising on 4xx/5xx)."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported URL: {url!r}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        send_headers = {"User-Agent": USER_AGENT, **(headers or {})}
+
+        pool = self._pool(key)
+        if not pool.slots.acquire(timeout=self.pool_timeout):
+            raise PoolTimeoutError(f"No free connection to {parts.hostname}:{port} after {self.pool_timeout}s")
+        try:
+            conn, reused = self._checkout(key, pool)
+            try:
+                try:
+                    response = self._roundtrip(conn, method, path, body, send_headers)
+                except _STALE_CONNECTION_ERRORS:
+                    if not reused:
+                        raise
+                    logger.debug("Stale keep-alive connection to %s:%s; reconnecting", parts.hostname, port)
+                    conn.close()
+                    conn = self._new_connection(key)
+                    response = self._roundtrip(conn, method, path, body, send_headers)
+            except BaseException:
+                conn.close()
+                raise
+
+            if response.headers.get("connection", "").lower() == "close" or conn.sock is None:
+                conn.close()
+            else:
+                with pool.lock:
+                    pool.idle.append((conn, time.monotonic()))
+            return response
+        finally:
+            pool.slots.release()
+
+    def post_json(self, url: str, payload: Any, headers: dict[str, str] | None = None) -> HttpResponse:
+        return self.request(
+            "POST",
+            url,
+            body=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json", **(headers or {})},
+        )
+
+    def close(self) -> None:
+        """Close every idle connection. In-flight requests finish and close their own."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            with pool.lock:
+                while pool.idle:
+                    pool.idle.popleft()[0].close()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            idle = sum(len(pool.idle) for pool in self._pools.values())
+        return {
+            "requests": self.requests_sent,
+            "connections_opened": self.connections_opened,
+            "idle_connections": idle,
+        }
+
+    def _pool(self, key: tuple[str, str, int]) -> _HostPool:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _HostPool(self.max_per_host)
+            return pool
+
+    def _checkout(self, key: tuple[str, str, int], pool: _HostPool) -> tuple[http.client.HTTPConnection, bool]:
+        """Most recently used idle connection still within idle_timeout, else a new one."""
+        now = time.monotonic()
+        with pool.lock:
+            while pool.idle:
+                conn, last_used = pool.idle.pop()
+                if now - last_used < self.idle_timeout:
+                    return conn, True
+                conn.close()
+        return self._new_connection(key), False
+
+    def _new_connection(self, key: tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = cls(host, port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.timeout)
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    def _roundtrip(
+        self,
+        conn: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        body: bytes | None,
+        headers: dict[str, str],
+    ) -> HttpResponse:
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        data = resp.read()  # drain fully so the connection can be reused
+        with self._lock:
+            self.requests_sent += 1
+        return HttpResponse(
+            status=resp.status,
+            headers={k.lower(): v for k, v in resp.getheaders()},
+            body=data,
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def shared_transport(
+    timeout: float = 15.0,
+    connect_timeout: float = 5.0,
+    max_per_host: int = 4,
+) -> HttpTransport:
+    """Process-wide transport per settings, so every router and backend reuses the same pool."""
+    return HttpTransport(timeout=timeout, connect_timeout=connect_timeout, max_per_host=max_per_host)
@@ -44,6 +44,10 @@ class MultiChannelConfig:
     jira_webhook_secret: str
     gemini_api_key: str
     gemini_model: str
+    # Webhook HTTP client (ai.alerts.transport): read/connect timeouts in seconds, pool size per host
+    http_timeout: float = 15.0
+    http_connect_timeout: float = 5.0
+    http_max_per_host: int = 4
 
     def __post_init__(self) -> None:
         required = [
@@ -56,6 +60,8 @@ class MultiChannelConfig:
         missing = [name for name, val in required if not (val and str(val).strip())]
         if missing:
             raise ValueError(f"MultiChannelConfig missing required: {', '.join(missing)}")
+        if self.http_timeout <= 0 or self.http_connect_timeout <= 0 or self.http_max_per_host < 1:
+            raise ValueError("MultiChannelConfig http_* settings must be positive")
 
 
 def load_config(env_path: Path | None = None) -> MultiChannelConfig:
@@ -77,6 +83,9 @@ def load_config(env_path: Path | None = None) -> MultiChannelConfig:
         jira_webhook_secret=_get_env("JIRA_WEBHOOK_SECRET"),
         gemini_api_key=_get_env("GEMINI_API_KEY"),
         gemini_model=_get_env("GEMINI_MODEL") or "gemini-2.5-flash",
+        http_timeout=float(_get_env("ALERT_HTTP_TIMEOUT", "15")),
+        http_connect_timeout=float(_get_env("ALERT_HTTP_CONNECT_TIMEOUT", "5")),
+        http_max_per_host=int(_get_env("ALERT_HTTP_MAX_PER_HOST", "4")),
     )
 
 
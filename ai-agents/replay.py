@@ -0,0 +1,256 @@
+"""Record/replay layer for Gemini generate_content: offline, deterministic reruns.
+
+Requests are keyed on model name + SHA-256 of the canonical request (prompt text,
+image hashes, config), minus VOLATILE_FIELDS: per-run values such as local evidence
+paths, which would otherwise make every turn after the first miss. Modes:
+
+- ``passthrough``: call Gemini, store nothing (default).
+- ``record``: call Gemini and store every response on disk.
+- ``replay``: serve stored responses only; a miss raises ReplayMiss.
+
+generate_content_stream is covered too: the chunks of a recorded stream are
+stored together and replayed in order.
+
+Set GEMINI_REPLAY_MODE / GEMINI_REPLAY_DIR, or call wrap_client() explicitly.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator
+
+logger = logging.getLogger(__name__)
+
+MODES = ("passthrough", "record", "replay")
+DEFAULT_REPLAY_DIR = ".gemini_replay"
+
+# Dict keys left out of request keys wherever they appear (e.g. in a
+# FunctionResponse's response): they change from run to run, the question doesn't.
+VOLATILE_FIELDS = frozenset({"screenshot_path"})
+
+
+class ReplayMiss(LookupError):
+    """No stored response for a request in replay mode."""
+
+
+def _canonical(obj: Any, volatile: frozenset[str] = VOLATILE_FIELDS) -> Any:
+    """JSON-safe, order-stable view of a request. Bytes are reduced to their hash; volatile keys dropped."""
+    if hasattr(obj, "model_dump"):
+        return _canonical(obj.model_dump(exclude_none=True), volatile)
+    if isinstance(obj, dict):
+        return {
+            str(k): _canonical(v, volatile)
+            for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))
+            if str(k) not in volatile
+        }
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v, volatile) for v in obj]
+    if isinstance(obj, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(obj).hexdigest()}
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    return str(obj)
+
+
+def request_key(model: str, contents: Any, config: Any = None) -> str:
+    payload = json.dumps(
+        {"model": model, "contents": _canonical(contents), "config": _canonical(config)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReplayStore:
+    """One JSON file per request under <root>/<model>/<key>.json."""
+
+    def __init__(self, root: str | Path) -> None:
+        self._root = Path(root)
+        self._lock = threading.Lock()
+
+    def _path(self, model: str, key: str) -> Path:
+        safe_model = model.replace("/", "_")
+        return self._root / safe_model / f"{key}.json"
+
+    def get(self, model: str, key: str) -> Any | None:
+        path = self._path(model, key)
+        if not path.is_file():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def put(self, model: str, key: str, data: Any) -> None:
+        path = self._path(model, key)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+            os.replace(tmp, path)
+
+
+def _dump_response(response: Any) -> Any:
+    return response.model_dump(mode="json", exclude_none=True)
+
+
+def _load_response(data: Any) -> Any:
+    from google.genai import types
+
+    return types.GenerateContentResponse.model_validate(data)
+
+
+class _ReplayCore:
+    """Shared bookkeeping for the sync and async model wrappers."""
+
+    def __init__(self, mode: str, store: ReplayStore) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown replay mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def lookup(self, model: str, contents: Any, config: Any, stream: bool = False) -> tuple[str, Any | None]:
+        key = request_key(model, contents, config)
+        if self.mode != "replay":
+            return key, None
+        data = self.store.get(_store_model(model, stream), key)
+        if data is None:
+            self.misses += 1
+            kind = "stream" if stream else "response"
+            raise ReplayMiss(f"No recorded Gemini {kind} for {model} request {key[:12]}")
+        self.hits += 1
+        if stream:
+            return key, [_load_response(chunk) for chunk in data]
+        return key, _load_response(data)
+
+    def save(self, model: str, key: str, response: Any) -> None:
+        if self.mode == "record":
+            self.store.put(model, key, _dump_response(response))
+            self.recorded += 1
+
+    def save_stream(self, model: str, key: str, chunks: list[Any]) -> None:
+        if self.mode == "record":
+            self.store.put(_store_model(model, True), key, [_dump_response(c) for c in chunks])
+            self.recorded += 1
+
+
+def _store_model(model: str, stream: bool) -> str:
+    return f"{model}@stream" if stream else model
+
+
+class _ReplayModels:
+    def __init__(self, models: Any, core: _ReplayCore) -> None:
+        self._models = models
+        self._core = core
+
+    def generate_content(self, *, model: str, contents: Any, config: Any = None, **kwargs: Any) -> Any:
+        key, cached = self._core.lookup(model, contents, config)
+        if cached is not None:
+            return cached
+        response = self._models.generate_content(model=model, contents=contents, config=config, **kwargs)
+        self._core.save(model, key, response)
+        return response
+
+    def generate_content_stream(self, *, model: str, contents: Any, config: Any = None, **kwargs: Any) -> Iterator[Any]:
+        key, cached = self._core.lookup(model, contents, config, stream=True)
+        if cached is not None:
+            return iter(cached)
+        stream = self._models.generate_content_stream(model=model, contents=contents, config=config, **kwargs)
+        return self._record_stream(model, key, stream)
+
+    def _record_stream(self, model: str, key: str, stream: Iterator[Any]) -> Iterator[Any]:
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        self._core.save_stream(model, key, chunks)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._models, name)
+
+
+class _AsyncReplayModels:
+    def __init__(self, models: Any, core: _ReplayCore) -> None:
+        self._models = models
+        self._core = core
+
+    async def generate_content(self, *, model: str, contents: Any, config: Any = None, **kwargs: Any) -> Any:
+        key, cached = self._core.lookup(model, contents, config)
+        if cached is not None:
+            return cached
+        response = await self._models.generate_content(model=model, contents=contents, config=config, **kwargs)
+        self._core.save(model, key, response)
+        return response
+
+    async def generate_content_stream(
+        self, *, model: str, contents: Any, config: Any = None, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        key, cached = self._core.lookup(model, contents, config, stream=True)
+        if cached is not None:
+            return _aiter(cached)
+        stream = await self._models.generate_content_stream(model=model, contents=contents, config=config, **kwargs)
+        return self._record_stream(model, key, stream)
+
+    async def _record_stream(self, model: str, key: str, stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        self._core.save_stream(model, key, chunks)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._models, name)
+
+
+async def _aiter(items: list[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+class _AsyncNamespace:
+    def __init__(self, aio: Any, core: _ReplayCore) -> None:
+        self.models = _AsyncReplayModels(aio.models if aio is not None else None, core)
+
+
+class ReplayClient:
+    """Drop-in for genai.Client: .models and .aio.models go through the replay layer.
+
+    In replay mode `client` may be None, so no API key or network is needed.
+    """
+
+    def __init__(self, client: Any, mode: str, root: str | Path = DEFAULT_REPLAY_DIR) -> None:
+        if client is None and mode != "replay":
+            raise ValueError("A real genai client is required unless mode is 'replay'")
+        self._client = client
+        self._core = _ReplayCore(mode, ReplayStore(root))
+        self.models = _ReplayModels(client.models if client is not None else None, self._core)
+        self.aio = _AsyncNamespace(client.aio if client is not None else None, self._core)
+
+    @property
+    def mode(self) -> str:
+        return self._core.mode
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self._core.hits, "misses": self._core.misses, "recorded": self._core.recorded}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def replay_mode_from_env() -> str:
+    return (os.environ.get("GEMINI_REPLAY_MODE") or "passthrough").strip().lower()
+
+
+def wrap_client(client: Any, mode: str | None = None, root: str | Path | None = None) -> Any:
+    """Wrap a genai client per GEMINI_REPLAY_MODE / GEMINI_REPLAY_DIR. Passthrough returns it as-is."""
+    mode = (mode or replay_mode_from_env()).lower()
+    if mode == "passthrough":
+        return client
+    root = root or os.environ.get("GEMINI_REPLAY_DIR") or DEFAULT_REPLAY_DIR
+    logger.info("Gemini replay layer: mode=%s dir=%s", mode, root)
+    return ReplayClient(client, mode, root)
@@ -1,6 +1,8 @@
-"""Routing agent and queue. Public API: RoutingAgent, PriorityAlertQueue, RoutedAlert, rules helpers."""
+"""Routing agent and queues. Public API: RoutingAgent, PriorityAlertQueue, AlertOutbox, RoutedAlert, rules helpers."""
 
 from ai.routing.agent import RoutingAgent
+from ai.routing.fingerprint import normalize_root_cause, report_fingerprint
+from ai.routing.outbox import AlertOutbox, OutboxWorkerPool
 from ai.routing.queue import PriorityAlertQueue
 from ai.routing.rules import assign_team_by_rules, extract_context_links, format_alert_summary
 from ai.routing.types import RoutedAlert
@@ -8,8 +10,12 @@ from ai.routing.types import RoutedAlert
 __all__ = [
     "RoutingAgent",
     "PriorityAlertQueue",
+    "AlertOutbox",
+    "OutboxWorkerPool",
     "RoutedAlert",
     "assign_team_by_rules",
     "format_alert_summary",
     "extract_context_links",
+    "report_fingerprint",
+    "normalize_root_cause",
 ]
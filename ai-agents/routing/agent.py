@@ -5,6 +5,7 @@ from __future__ import annotations
 import logging
 
 from ai.models.report import IssueReport, Team
+from ai.replay import ReplayMiss
 from ai.routing.rules import assign_team_by_rules, extract_context_links, format_alert_summary
 from ai.routing.types import RoutedAlert
 
@@ -54,6 +55,8 @@ class RoutingAgent:
         )
         try:
             text = self._gemini_generate(prompt)
+        except ReplayMiss:
+            raise   # replay must fail loudly, not fall back to rules
         except Exception as e:
             logger.warning("Gemini team assignment failed: %s", e)
             return None
@@ -68,7 +71,8 @@ class RoutingAgent:
     def _gemini_generate(self, prompt: str) -> str:
         try:
             from google import genai
-            client = genai.Client(api_key=self._gemini_api_key)
+            from ai.replay import wrap_client
+            client = wrap_client(genai.Client(api_key=self._gemini_api_key))
             response = client.models.generate_content(model=self._gemini_model, contents=prompt)
             return getattr(response, "text", None) or str(response) or ""
         except ImportError:
@@ -0,0 +1,41 @@
+"""Report fingerprints: the same friction on the same screen hashes the same across runs."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+
+from ai.models.report import IssueReport
+
+# Run-specific noise in root causes, most specific first
+_NOISE = [
+    (re.compile(r"https?://\S+"), "<url>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{8,}\b"), "<hex>"),
+    (re.compile(r"\d+(?:[.:]\d+)*"), "<n>"),
+]
+_NON_WORD = re.compile(r"[^a-z0-9<>]+")
+
+
+def normalize_root_cause(text: str) -> str:
+    """Lowercase, mask URLs / ids / numbers / times, collapse punctuation and spacing."""
+    text = (text or "").lower()
+    for pattern, token in _NOISE:
+        text = pattern.sub(token, text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def report_fingerprint(report: IssueReport) -> str:
+    """
+    sha256 over category, screen, friction_type and the normalized root
+    cause. Screen and friction type come from report.metadata
+    ("screen_type" / "screen", "friction_type"); missing ones hash as "".
+    """
+    metadata = report.metadata if isinstance(report.metadata, dict) else {}
+    parts = [
+        (report.category or "").strip().lower(),
+        str(metadata.get("screen_type") or metadata.get("screen") or "").strip().lower(),
+        str(metadata.get("friction_type") or "").strip().lower(),
+        normalize_root_cause(report.root_cause),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
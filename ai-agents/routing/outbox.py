@@ -0,0 +1,524 @@
+"""Durable alert outbox: SQLite (WAL) queue of RoutedAlerts with leased, per-backend delivery."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from ai.alerts.ratelimit import RetryLater, get_rate_limiter
+from ai.models.report import IssueReport, Severity, Team
+from ai.routing.fingerprint import report_fingerprint
+from ai.routing.queue import SEVERITY_PRIORITY
+from ai.routing.types import RoutedAlert
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOX_PATH = ".alert_outbox.sqlite3"
+BACKENDS = ("slack", "teams", "discord", "webhook")
+# Backends that can amend the original message with an occurrence count;
+# duplicates for the others are only counted
+UPDATABLE_BACKENDS = ("slack", "webhook")
+
+SEND = "send"
+UPDATE = "update"
+
+PENDING = "pending"
+LEASED = "leased"
+SENT = "sent"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id              INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    fingerprint     TEXT NOT NULL,
+    payload         TEXT NOT NULL,
+    created_at      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    alert_id    INTEGER NOT NULL REFERENCES alerts(id),
+    backend     TEXT NOT NULL,
+    kind        TEXT NOT NULL,      -- send: the alert; update: occurrence count on the sent message
+    priority    INTEGER NOT NULL,
+    state       TEXT NOT NULL,
+    due_at      REAL NOT NULL,      -- pending: next attempt; leased: lease expiry
+    lease_owner TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    permalink   TEXT,
+    last_error  TEXT,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (alert_id, backend, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS deliveries_open
+    ON deliveries (priority, due_at) WHERE state IN ('pending', 'leased');
+-- Dedupe index: the alert a fingerprint was first sent as, within the window
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fingerprint TEXT PRIMARY KEY,
+    alert_id    INTEGER NOT NULL REFERENCES alerts(id),
+    first_seen  REAL NOT NULL,
+    last_seen   REAL NOT NULL,
+    occurrences INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def idempotency_key(routed: RoutedAlert) -> str:
+    """Same test run + same report => same key, so re-enqueueing is a no-op."""
+    report = routed.report
+    parts = [routed.test_id, report.title, report.severity.value, report.category, report.root_cause]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _dump(routed: RoutedAlert) -> str:
+    return json.dumps(asdict(routed), default=str)
+
+
+def _load(payload: str) -> RoutedAlert:
+    data = json.loads(payload)
+    report = data.pop("report")
+    report["severity"] = Severity(report["severity"])
+    report["team"] = Team(report["team"])
+    return RoutedAlert(report=IssueReport(**report), **data)
+
+
+@dataclass
+class Delivery:
+    """One (alert, backend, kind) claimed by a worker."""
+
+    alert_id: int
+    backend: str
+    kind: str
+    attempts: int
+    idempotency_key: str
+    routed: RoutedAlert
+    lease_owner: str
+    # kind == UPDATE only: the original send and the fingerprint's count so far
+    sent_state: str | None = None
+    sent_permalink: str | None = None
+    occurrences: int = 1
+
+
+class AlertOutbox:
+    """
+    Alerts are written once; each backend gets its own delivery row
+    (pending -> leased -> sent | failed). Workers claim due rows under a
+    lease; a worker that dies leaves its leases to expire and be claimed
+    again, so delivery is at-least-once. The idempotency key (per alert,
+    plus the backend name) travels with each send so receivers can drop
+    repeats. Safe to share between threads and processes.
+
+    Reports are also fingerprinted (ai.routing.fingerprint). A report
+    whose fingerprint was first enqueued less than dedupe_window seconds
+    ago is not sent again: its occurrence is counted, and one "update"
+    delivery per UPDATABLE_BACKENDS backend edits the original message
+    with the count. Updates wait update_delay seconds so a burst of
+    duplicates coalesces into a single edit.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        backends: Sequence[str] = BACKENDS,
+        max_attempts: int = 8,
+        base_backoff: float = 2.0,
+        max_backoff: float = 300.0,
+        dedupe_window: float = 3600.0,
+        update_delay: float = 30.0,
+    ) -> None:
+        self.path = str(path or os.environ.get("ALERT_OUTBOX_PATH") or DEFAULT_OUTBOX_PATH)
+        if not backends:
+            raise ValueError("backends must not be empty")
+        self.backends = tuple(backends)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.dedupe_window = dedupe_window
+        self.update_delay = update_delay
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside the single writer."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql_fn):
+        """Run sql_fn(conn) in a write transaction taken up front (no upgrade deadlocks)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = sql_fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def enqueue(self, routed: RoutedAlert, key: str | None = None) -> int:
+        """
+        Persist the alert and one pending delivery per backend. Returns the
+        alert id; for a duplicate inside the dedupe window, the id of the
+        alert it was folded into.
+        """
+        return self.enqueue_many([routed], [key] if key else None)[0]
+
+    def enqueue_many(self, routed_alerts: Sequence[RoutedAlert], keys: Sequence[str] | None = None) -> list[int]:
+        """enqueue() for a batch, in one transaction. Known keys return their existing id."""
+        now = time.time()
+        keys = list(keys) if keys else [idempotency_key(r) for r in routed_alerts]
+
+        def insert(conn: sqlite3.Connection) -> list[int]:
+            ids = []
+            for routed, key in zip(routed_alerts, keys):
+                known = conn.execute("SELECT id FROM alerts WHERE idempotency_key = ?", (key,)).fetchone()
+                if known:
+                    ids.append(known[0])
+                    continue
+
+                fingerprint = report_fingerprint(routed.report)
+                priority = SEVERITY_PRIORITY.get(routed.report.severity, 4)
+                original = self._count_duplicate(conn, fingerprint, priority, now)
+                if original is not None:
+                    ids.append(original)
+                    continue
+
+                routed.report.metadata["fingerprint"] = fingerprint
+                alert_id = conn.execute(
+                    "INSERT INTO alerts (idempotency_key, fingerprint, payload, created_at) VALUES (?, ?, ?, ?)",
+                    (key, fingerprint, _dump(routed), now),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO deliveries (alert_id, backend, kind, priority, state, due_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(alert_id, backend, SEND, priority, PENDING, now, now) for backend in self.backends],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO fingerprints (fingerprint, alert_id, first_seen, last_seen, occurrences)"
+                    " VALUES (?, ?, ?, ?, 1)",
+                    (fingerprint, alert_id, now, now),
+                )
+                ids.append(alert_id)
+            return ids
+
+        return self._write(insert)
+
+    def _count_duplicate(self, conn: sqlite3.Connection, fingerprint: str, priority: int, now: float) -> int | None:
+        """Count an occurrence of a fingerprint still in its window; returns the original alert id."""
+        if self.dedupe_window <= 0:
+            return None
+        row = conn.execute(
+            "SELECT alert_id, first_seen FROM fingerprints WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        if row is None or now - row[1] >= self.dedupe_window:
+            return None
+        alert_id = row[0]
+        conn.execute(
+            "UPDATE fingerprints SET occurrences = occurrences + 1, last_seen = ? WHERE fingerprint = ?",
+            (now, fingerprint),
+        )
+        # One pending update per backend: re-arm a finished one, leave a pending one to coalesce
+        conn.executemany(
+            "INSERT INTO deliveries (alert_id, backend, kind, priority, state, due_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (alert_id, backend, kind) DO UPDATE SET"
+            " state = excluded.state, due_at = excluded.due_at, attempts = 0, last_error = NULL,"
+            " updated_at = excluded.updated_at"
+            " WHERE deliveries.state IN ('sent', 'failed')",
+            [
+                (alert_id, backend, UPDATE, priority, PENDING, now + self.update_delay, now)
+                for backend in self.backends if backend in UPDATABLE_BACKENDS
+            ],
+        )
+        return alert_id
+
+    def claim(self, owner: str, limit: int = 16, lease_seconds: float = 60.0) -> list[Delivery]:
+        """Lease up to `limit` due deliveries, most severe first, including expired leases."""
+        now = time.time()
+
+        def lease(conn: sqlite3.Connection) -> list[tuple]:
+            rows = conn.execute(
+                "SELECT d.alert_id, d.backend, d.kind, d.attempts, a.idempotency_key, a.payload,"
+                "       s.state, s.permalink, f.occurrences"
+                " FROM deliveries d JOIN alerts a ON a.id = d.alert_id"
+                " LEFT JOIN deliveries s ON d.kind = 'update'"
+                "      AND s.alert_id = d.alert_id AND s.backend = d.backend AND s.kind = 'send'"
+                " LEFT JOIN fingerprints f ON d.kind = 'update' AND f.fingerprint = a.fingerprint"
+                " WHERE d.state IN ('pending', 'leased') AND d.due_at <= ?"
+                " ORDER BY d.priority, d.due_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE deliveries SET state = ?, lease_owner = ?, due_at = ?, updated_at = ?"
+                " WHERE alert_id = ? AND backend = ? AND kind = ?",
+                [(LEASED, owner, now + lease_seconds, now, row[0], row[1], row[2]) for row in rows],
+            )
+            return rows
+
+        return [
+            Delivery(
+                alert_id, backend, kind, attempts, key, _load(payload), owner,
+                sent_state=sent_state, sent_permalink=sent_permalink, occurrences=occurrences or 1,
+            )
+            for alert_id, backend, kind, attempts, key, payload, sent_state, sent_permalink, occurrences
+            in self._write(lease)
+        ]
+
+    def complete(self, delivery: Delivery, permalink: str | None = None) -> bool:
+        """Mark sent. False if the lease was lost (another worker owns it now)."""
+        now = time.time()
+        return self._write(lambda conn: conn.execute(
+            "UPDATE deliveries SET state = ?, permalink = ?, attempts = attempts + 1, lease_owner = NULL,"
+            " last_error = NULL, updated_at = ?"
+            " WHERE alert_id = ? AND backend = ? AND kind = ? AND lease_owner = ? AND state = ?",
+            (SENT, permalink, now, delivery.alert_id, delivery.backend, delivery.kind, delivery.lease_owner, LEASED),
+        ).rowcount == 1)
+
+    def fail(self, delivery: Delivery, error: str, retry_in: float | None = None, final: bool = False) -> str:
+        """Record a failed attempt; back off exponentially, or give up after max_attempts (or if final)."""
+        now = time.time()
+        attempts = delivery.attempts + 1
+        if final or attempts >= self.max_attempts:
+            state, due_at = FAILED, now
+        else:
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+            state, due_at = PENDING, now + max(backoff, retry_in or 0.0)
+        self._write(lambda conn: conn.execute(
+            "UPDATE deliveries SET state = ?, due_at = ?, attempts = ?, lease_owner = NULL, last_error = ?,"
+            " updated_at = ? WHERE alert_id = ? AND backend = ? AND kind = ? AND lease_owner = ? AND state = ?",
+            (state, due_at, attempts, error[:2000], now, delivery.alert_id, delivery.backend, delivery.kind,
+             delivery.lease_owner, LEASED),
+        ))
+        return state
+
+    def extend(self, delivery: Delivery, seconds: float) -> bool:
+        """Push a held lease out by `seconds` from now. False if the lease was lost."""
+        now = time.time()
+        return self._write(lambda conn: conn.execute(
+            "UPDATE deliveries SET due_at = ?, updated_at = ?"
+            " WHERE alert_id = ? AND backend = ? AND kind = ? AND lease_owner = ? AND state = ?",
+            (now + seconds, now, delivery.alert_id, delivery.backend, delivery.kind, delivery.lease_owner, LEASED),
+        ).rowcount == 1)
+
+    def defer(self, delivery: Delivery, seconds: float) -> None:
+        """Hand a leased delivery back for later without counting an attempt."""
+        now = time.time()
+        self._write(lambda conn: conn.execute(
+            "UPDATE deliveries SET state = ?, due_at = ?, lease_owner = NULL, updated_at = ?"
+            " WHERE alert_id = ? AND backend = ? AND kind = ? AND lease_owner = ? AND state = ?",
+            (PENDING, now + seconds, now, delivery.alert_id, delivery.backend, delivery.kind,
+             delivery.lease_owner, LEASED),
+        ))
+
+    def status(self, alert_id: int) -> dict[str, dict[str, Any]]:
+        """Per-backend delivery state for one alert (updates keyed "<backend>:update")."""
+        rows = self._conn().execute(
+            "SELECT backend, kind, state, attempts, permalink, last_error FROM deliveries WHERE alert_id = ?",
+            (alert_id,),
+        ).fetchall()
+        return {
+            backend if kind == SEND else f"{backend}:{kind}": {
+                "state": state, "attempts": attempts, "permalink": permalink, "error": error,
+            }
+            for backend, kind, state, attempts, permalink, error in rows
+        }
+
+    def occurrences(self, alert_id: int) -> int:
+        """How many times the alert's fingerprint has been enqueued in its window (1 = no duplicates)."""
+        row = self._conn().execute(
+            "SELECT f.occurrences FROM fingerprints f JOIN alerts a ON a.fingerprint = f.fingerprint"
+            " WHERE a.id = ? AND f.alert_id = a.id",
+            (alert_id,),
+        ).fetchone()
+        return row[0] if row else 1
+
+    def dedupe_stats(self) -> dict[str, int]:
+        """Fingerprints tracked and duplicate reports suppressed."""
+        tracked, suppressed = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(occurrences - 1), 0) FROM fingerprints"
+        ).fetchone()
+        return {"fingerprints": tracked, "suppressed": suppressed}
+
+    def counts(self) -> dict[str, int]:
+        """Deliveries by state."""
+        rows = self._conn().execute("SELECT state, COUNT(*) FROM deliveries GROUP BY state").fetchall()
+        return {state: 0 for state in (PENDING, LEASED, SENT, FAILED)} | dict(rows)
+
+    def __len__(self) -> int:
+        """Deliveries not yet sent or given up on."""
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM deliveries WHERE state IN ('pending', 'leased')"
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class OutboxWorkerPool:
+    """
+    Delivery workers for an AlertOutbox. Each worker claims a batch, sends
+    every delivery through the shared rate limiter (so a batch fans out
+    across backends), and records the outcome before claiming again.
+    """
+
+    def __init__(
+        self,
+        outbox: AlertOutbox,
+        backends: Mapping[str, Any],
+        workers: int = 4,
+        batch_size: int = 16,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 0.5,
+    ) -> None:
+        missing = [name for name in outbox.backends if name not in backends]
+        if missing:
+            raise ValueError(f"No backend for outbox deliveries: {', '.join(missing)}")
+        self.outbox = outbox
+        self.backends = dict(backends)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def start(self) -> OutboxWorkerPool:
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, args=(f"{self._prefix}:{i}",), name=f"outbox-worker-{i}", daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop claiming; batches in flight finish (or their leases expire)."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Wait until nothing is pending or leased. False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self.outbox):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval / 5)
+        return True
+
+    def __enter__(self) -> OutboxWorkerPool:
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _work(self, owner: str) -> None:
+        while not self._stop.is_set():
+            try:
+                batch = self.outbox.claim(owner, self.batch_size, self.lease_seconds)
+            except sqlite3.Error:
+                logger.exception("Outbox claim failed")
+                batch = []
+            if not batch:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._deliver(batch)
+
+    def _deliver(self, batch: list[Delivery]) -> None:
+        limiter = get_rate_limiter()
+        started = time.monotonic()
+        futures = []
+        for delivery in batch:
+            backend = self.backends[delivery.backend]
+            routed = delivery.routed
+            report = routed.report
+            key = f"{delivery.idempotency_key}:{delivery.backend}"
+            if delivery.kind == UPDATE:
+                key += f":{delivery.occurrences}"
+            # Set before submit: with no bucket delay the send may start at once
+            report.metadata["idempotency_key"] = key
+            if delivery.kind == UPDATE:
+                future = self._submit_update(limiter, delivery, backend)
+                if future is None:
+                    continue
+            else:
+                future = limiter.submit(
+                    delivery.backend, backend.rate_key(report), backend.deliver,
+                    report, routed.screenshot_url, routed.test_id,
+                )
+            futures.append((delivery, future))
+
+        # Record each result as it lands, before the lease runs out (with a
+        # margin), or another worker may claim and send it again
+        pending = {future: delivery for delivery, future in futures}
+        deadline = started + self.lease_seconds * 0.8
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                self._record(pending.pop(future), future)
+            if done or time.monotonic() < deadline:
+                continue
+            # A send that never started is dropped; one in flight can't be
+            # cancelled and may still land, so hold its lease until it settles
+            for future, delivery in list(pending.items()):
+                if future.cancel():
+                    del pending[future]
+                    self.outbox.fail(delivery, f"no result within the {self.lease_seconds:g}s lease")
+                elif not self.outbox.extend(delivery, self.lease_seconds):
+                    del pending[future]
+                    logger.warning("Lease on alert %s/%s lost while its send was in flight",
+                                   delivery.alert_id, delivery.backend)
+            deadline = time.monotonic() + self.lease_seconds * 0.8
+
+    def _record(self, delivery: Delivery, future: Future[Any]) -> None:
+        try:
+            permalink = future.result()
+        except RetryLater as e:
+            self.outbox.fail(delivery, str(e), retry_in=e.delay)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Delivery of alert %s to %s failed: %s", delivery.alert_id, delivery.backend, e)
+            self.outbox.fail(delivery, str(e))
+        else:
+            if not self.outbox.complete(delivery, permalink):
+                logger.warning("Lease on alert %s/%s lost before completion", delivery.alert_id, delivery.backend)
+
+    def _submit_update(self, limiter: Any, delivery: Delivery, backend: Any):
+        """Queue the occurrence-count edit, or settle it here if it can't run (yet)."""
+        if delivery.sent_state in (PENDING, LEASED):
+            # Original not delivered yet: it will carry the count when the update runs
+            self.outbox.defer(delivery, self.poll_interval * 10)
+            return None
+        if delivery.sent_state != SENT or not hasattr(backend, "update"):
+            self.outbox.fail(delivery, "original alert was not delivered; nothing to update", final=True)
+            return None
+        routed = delivery.routed
+        return limiter.submit(
+            delivery.backend, backend.rate_key(routed.report), backend.update,
+            routed.report, routed.screenshot_url, routed.test_id,
+            delivery.sent_permalink, delivery.occurrences,
+        )
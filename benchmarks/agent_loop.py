@@ -0,0 +1,198 @@
+"""
+Benchmark main.run_agent_loop apart from device and LLM latency.
+
+Runs every flow from agent/flows.json N times against a FakeDriver (tunable
+tap / swipe / type / screenshot / page-source latency) and a ScriptedVision model
+(tunable latency), and reports p50/p95 per phase as JSON:
+
+    python -m benchmarks.agent_loop --iterations 50 --out bench.json
+    python -m benchmarks.agent_loop --screenshot-ms 120 --vision-ms 800
+
+(`python benchmarks/agent_loop.py` works too.) Runs are live: no action
+traces are recorded, so real recordings under ACTION_TRACE_DIR are left
+alone.
+
+Phases: decide, execute, screenshot, vision, tracker, friction, plus
+step (one loop iteration) and run (one whole flow). Timings nested inside
+another phase (e.g. settle samples inside execute) count only
+toward the outer phase.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+_repo_root = Path(__file__).resolve().parent.parent
+if str(_repo_root) not in sys.path:
+    sys.path.insert(0, str(_repo_root))
+
+import main
+from agent.decision import get_flow_graph
+from agent.mock_ai import ScriptedVision
+from agent.screen_cache import ScreenCache
+from controller.fake_driver import FakeDriver
+
+FLOWS = tuple(get_flow_graph().flows)
+
+# One distinct screen per step (along each flow's default path) so a
+# healthy flow runs to completion
+SCRIPTS = {
+    "login": ["home_scrolled", "login", "login_submitted", "account"],
+    "contact": ["home_scrolled", "contact", "contact_name", "contact_email",
+                "contact_subject", "contact_message", "contact_sent"],
+    "buy": ["flavours", "product"],
+}
+
+
+def script_for(flow):
+    return SCRIPTS.get(flow) or [f"{flow}_{i}" for i in range(len(get_flow_graph().linear(flow)))]
+
+
+PHASES = ("decide", "execute", "screenshot", "vision", "tracker", "friction")
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._depth = 0
+
+    def wrap(self, phase, fn):
+        def timed(*args, **kwargs):
+            outer = self._depth == 0
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                if outer:
+                    self.samples[phase].append((time.perf_counter() - start) * 1000)
+        return timed
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 3) if values else None,
+        "p95_ms": round(percentile(values, 95), 3) if values else None,
+        "mean_ms": round(sum(values) / len(values), 3) if values else None,
+    }
+
+
+def bench_flow(flow, iterations, latencies, vision_latency, use_cache, evidence_root):
+    timer = PhaseTimer()
+    run_times = []
+    step_times = []
+    statuses = defaultdict(int)
+
+    class TimedTracker(main.StateTracker):
+        update = timer.wrap("tracker", main.StateTracker.update)
+
+    class TimedFrictions(main.FrictionEngine):
+        evaluate = timer.wrap("friction", main.FrictionEngine.evaluate)
+
+    patches = {
+        "next_intent": timer.wrap("decide", main.next_intent),
+        "execute_action": timer.wrap("execute", main.execute_action),
+        "StateTracker": TimedTracker,
+        "FrictionEngine": TimedFrictions,
+        "get_screen_cache": lambda: None,
+    }
+    originals = {name: getattr(main, name) for name in list(patches) + ["analyze_screen"]}
+
+    try:
+        for name, value in patches.items():
+            setattr(main, name, value)
+
+        for i in range(iterations):
+            vision = ScriptedVision([{"screen_type": s, "elements": [s.upper()]} for s in script_for(flow)],
+                                    latency=vision_latency)
+            main.analyze_screen = timer.wrap("vision", vision)
+
+            driver = FakeDriver(screens=len(script_for(flow)) + 1, **latencies)
+            driver.get_screenshot_as_png = timer.wrap("screenshot", driver.get_screenshot_as_png)
+
+            cache = ScreenCache(":memory:") if use_cache else None
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                summary = main.run_agent_loop(flow, driver=driver, run_id=f"bench-{flow}-{i}",
+                                              evidence_root=evidence_root, screen_cache=cache, mode="live")
+            elapsed = (time.perf_counter() - start) * 1000
+            run_times.append(elapsed)
+            if summary["steps"]:
+                step_times.append(elapsed / max(1, summary["steps"]))
+            statuses[summary["status"]] += 1
+            if cache is not None:
+                cache.close()
+    finally:
+        for name, value in originals.items():
+            setattr(main, name, value)
+
+    phases = {phase: summarize(timer.samples.get(phase, [])) for phase in PHASES}
+    phases["step"] = summarize(step_times)
+    phases["run"] = summarize(run_times)
+    return {"iterations": iterations, "statuses": dict(statuses), "phases": phases}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--flows", default=",".join(FLOWS))
+    parser.add_argument("--tap-ms", type=float, default=0.0)
+    parser.add_argument("--swipe-ms", type=float, default=0.0)
+    parser.add_argument("--type-ms", type=float, default=0.0)
+    parser.add_argument("--screenshot-ms", type=float, default=0.0)
+    parser.add_argument("--source-ms", type=float, default=0.0, help="Page source (settle sample) latency")
+    parser.add_argument("--vision-ms", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="Use an in-memory screen cache")
+    parser.add_argument("--out", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    latencies = {
+        "tap_latency": args.tap_ms / 1000,
+        "swipe_latency": args.swipe_ms / 1000,
+        "type_latency": args.type_ms / 1000,
+        "screenshot_latency": args.screenshot_ms / 1000,
+        "source_latency": args.source_ms / 1000,
+    }
+
+    report = {
+        "benchmark": "agent_loop",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {**latencies, "vision_latency": args.vision_ms / 1000,
+                   "iterations": args.iterations, "cache": args.cache},
+        "flows": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="specter-bench-") as evidence_root:
+        for flow in [f.strip() for f in args.flows.split(",") if f.strip()]:
+            report["flows"][flow] = bench_flow(flow, args.iterations, latencies,
+                                               args.vision_ms / 1000, args.cache, evidence_root)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,162 @@
+"""
+Benchmark the durable alert outbox (ai.routing.outbox).
+
+Enqueues N RoutedAlerts into a fresh SQLite outbox, then drains it with
+an OutboxWorkerPool per worker count against in-process stub backends
+(tunable latency and failure rate, rate limits lifted), and reports
+enqueue and delivery throughput as JSON:
+
+    python -m benchmarks.alert_outbox --alerts 5000 --workers 1,4,8
+    python -m benchmarks.alert_outbox --backend-ms 20 --fail-rate 0.05 --out outbox.json
+
+Each alert is one delivery per backend, so deliveries = 4 x alerts.
+--distinct K makes the alerts repeat K distinct reports (same screen and
+root cause, as scheduled runs hitting the same friction do); duplicates
+are coalesced by the outbox's dedupe index, and backend_calls shows the
+outbound calls that remain:
+
+    python -m benchmarks.alert_outbox --alerts 2000 --distinct 20 --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+
+from ai.alerts.ratelimit import get_rate_limiter
+from ai.models.report import IssueReport, Severity, Team
+from ai.routing.outbox import BACKENDS, AlertOutbox, OutboxWorkerPool
+from ai.routing.types import RoutedAlert
+
+
+class StubBackend:
+    """Counts calls; deliver/update sleep `latency_ms` and fail at `fail_rate`."""
+
+    def __init__(self, name, latency_ms, fail_rate):
+        self.name = name
+        self.latency = latency_ms / 1000
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def rate_key(self, report):
+        return self.name
+
+    def deliver(self, report, screenshot_url, test_id):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise RuntimeError(f"{self.name} stub failure")
+        return f"{self.name}:{test_id}"
+
+    def update(self, report, screenshot_url, test_id, permalink, occurrences):
+        return self.deliver(report, screenshot_url, test_id)
+
+
+def build_alerts(count, distinct=0):
+    """`count` alerts, each from its own test run, cycling through `distinct` reports (0 = all distinct)."""
+    distinct = distinct or count
+    severities = list(Severity)
+    return [
+        RoutedAlert(
+            report=IssueReport(
+                title=f"Checkout button unresponsive #{i % distinct}",
+                severity=severities[i % distinct % len(severities)],
+                team=Team.FRONTEND,
+                category="Regression",
+                impact="Users cannot complete checkout.",
+                root_cause="Click handler detached after re-render.",
+                reproduction_steps=["Open cart", "Tap checkout"],
+                expected_behavior="Checkout opens.",
+                actual_behavior="Nothing happens.",
+                recommended_actions=["Re-bind handler on render"],
+                metadata={"screen_type": f"checkout-{i % distinct}", "friction_type": "dead_click"},
+            ),
+            screenshot_url=f"https://cdn.invalid/{i}.png",
+            test_id=f"bench-{i}",
+        )
+        for i in range(count)
+    ]
+
+
+def run(workers, alerts, args, tmpdir):
+    outbox = AlertOutbox(
+        os.path.join(tmpdir, f"outbox-{workers}.sqlite3"),
+        base_backoff=0.01, max_backoff=0.05, update_delay=0.05,
+    )
+    backends = {name: StubBackend(name, args.backend_ms, args.fail_rate) for name in BACKENDS}
+
+    start = time.perf_counter()
+    for i in range(0, len(alerts), args.enqueue_batch):
+        outbox.enqueue_many(alerts[i:i + args.enqueue_batch])
+    enqueue_s = time.perf_counter() - start
+
+    pool = OutboxWorkerPool(outbox, backends, workers=workers, batch_size=args.batch, poll_interval=0.05)
+    start = time.perf_counter()
+    with pool:
+        drained = pool.drain(timeout=args.timeout)
+    drain_s = time.perf_counter() - start
+
+    counts = outbox.counts()
+    dedupe = outbox.dedupe_stats()
+    outbox.close()
+    deliveries = counts["sent"] + counts["failed"]
+    return {
+        "workers": workers,
+        "alerts": len(alerts),
+        "enqueue_s": round(enqueue_s, 3),
+        "enqueue_per_s": round(len(alerts) / enqueue_s, 1),
+        "drain_s": round(drain_s, 3),
+        "deliveries_per_s": round(deliveries / drain_s, 1),
+        "drained": drained,
+        "states": counts,
+        "dedupe": dedupe,
+        "backend_calls": sum(b.calls for b in backends.values()),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=0, help="Distinct reports among the alerts (0 = all)")
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--batch", type=int, default=16, help="Deliveries claimed per worker round")
+    parser.add_argument("--enqueue-batch", type=int, default=1, help="Alerts per enqueue transaction")
+    parser.add_argument("--backend-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--out", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    logging.getLogger("ai").setLevel(logging.ERROR)   # stub failures are expected
+    # Measure the outbox, not Slack's 1 msg/s per channel
+    get_rate_limiter().limits.update({name: (1e9, 1e9) for name in BACKENDS})
+
+    alerts = build_alerts(args.alerts, args.distinct)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = [run(int(w), alerts, args, tmpdir) for w in args.workers.split(",") if w.strip()]
+
+    report = {
+        "benchmark": "alert_outbox",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,166 @@
+"""
+Benchmark the pooled webhook transport (ai.alerts.transport) against the
+per-request urllib.request.urlopen the alert backends used before.
+
+Starts a local stub webhook server (HTTP/1.1, keep-alive, optional
+per-request delay), fires N alert-sized JSON POSTs from C threads with
+each client, and reports throughput, p50/p95 latency and how many TCP
+connections the server accepted, as JSON:
+
+    python -m benchmarks.alert_transport --requests 2000 --concurrency 8
+    python -m benchmarks.alert_transport --server-ms 20 --out transport.json
+
+Plain HTTP on loopback only shows the TCP setup the pool saves; against
+real Slack/Discord/Teams endpoints every avoided connection is also a
+TLS handshake and one or more network round trips.
+"""
+
+import argparse
+import json
+import platform
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ai.alerts.transport import HttpTransport
+
+# Roughly a Discord embed for one IssueReport
+PAYLOAD = {
+    "embeds": [{
+        "title": "Signup form fails on iOS Safari with autofill",
+        "color": 0xE67E22,
+        "fields": [{"name": f"Field {i}", "value": "x" * 120, "inline": False} for i in range(10)],
+    }],
+}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay_ms: float):
+        self.delay = delay_ms / 1000
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+    def count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.server.count("requests")
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def urllib_post(url):
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(PAYLOAD).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=15) as resp:
+        resp.read()
+        return resp.status
+
+
+def run_client(name, post, server, url, requests, concurrency):
+    server.reset()
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        status = post(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+        return status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        statuses = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "client": name,
+        "requests": requests,
+        "errors": sum(1 for s in statuses if s not in (200, 204)),
+        "seconds": round(elapsed, 3),
+        "requests_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "server_connections": server.connections,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server-ms", type=float, default=0.0, help="Stub server delay per request")
+    parser.add_argument("--out", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    server = StubServer(args.server_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/webhooks/bench"
+
+    transport = HttpTransport(max_per_host=args.concurrency)
+    try:
+        results = [
+            run_client("urllib", urllib_post, server, url, args.requests, args.concurrency),
+            run_client("pooled", lambda u: transport.post_json(u, PAYLOAD).status,
+                       server, url, args.requests, args.concurrency),
+        ]
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
+
+    report = {
+        "benchmark": "alert_transport",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {"requests": args.requests, "concurrency": args.concurrency, "server_ms": args.server_ms},
+        "results": results,
+        "speedup": round(results[0]["seconds"] / results[1]["seconds"], 2),
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
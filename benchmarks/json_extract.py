@@ -0,0 +1,121 @@
+"""
+Microbenchmark: JSON extraction from model replies.
+
+Compares agent.computer_use.extract_json_from_text (single-pass scanner)
+with the regex extractor it replaced, on well-formed replies and on
+adversarial ones (unclosed code fences, brace floods, long brace runs
+without "screen_type", runs of invalid objects that each fail to decode),
+at growing sizes. Linear code should scale ~10x
+per 10x size; the regex grows quadratically on the adversarial inputs.
+
+    python -m benchmarks.json_extract
+    python -m benchmarks.json_extract --sizes 1000,10000 --legacy-max 20000 --out json.json
+"""
+
+import argparse
+import json
+import platform
+import re
+import time
+
+from agent.computer_use import extract_json_from_text
+
+ANALYSIS = '{"screen_type": "login", "elements": ["Email", "Password", "Log in"], "confidence": 0.93}'
+
+
+def legacy_extract(text: str) -> dict:
+    """The regex extractor extract_json_from_text used to be."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```|(\{[^{}]*"screen_type"[^{}]*\})'
+        matches = re.findall(json_pattern, text, re.DOTALL)
+        for match in matches:
+            json_str = match[0] or match[1]
+            try:
+                return json.loads(json_str)
+            except json.JSONDecodeError:
+                continue
+        return None
+
+
+def _fill(unit: str, size: int) -> str:
+    return unit * max(1, size // len(unit))
+
+
+CASES = {
+    # Prose, then the analysis in a fence: the normal case
+    "fenced_reply": lambda n: _fill("The page shows a login form. ", n) + "\n```json\n" + ANALYSIS + "\n```\n",
+    # Many fences that never close: lazy .*? runs to the end from every one
+    "unclosed_fences": lambda n: _fill("```json\n{ ", n) + ANALYSIS,
+    # Brace runs without screen_type: [^{}]* scans and backtracks from every {
+    "brace_runs": lambda n: _fill("{" + "a" * 40 + " ", n) + ANALYSIS,
+    # Lots of small objects before the one we want
+    "many_objects": lambda n: _fill('{"k": [1, {"v": "}"}]} ', n) + ANALYSIS,
+    # Object-shaped but invalid: every candidate fails to decode
+    "invalid_objects": lambda n: _fill('{"a": x} ', n) + ANALYSIS,
+    # The same, nested: salvage must not re-decode every inner level
+    "nested_invalid": lambda n: _fill('{"a": {"b": {"c": x}}} ', n) + ANALYSIS,
+    # Nested objects (the regex alternative only sees flat ones)
+    "nested": lambda n: _fill('{"a": {"b": {"c": {"d": [1, 2]}}}} ', n) + '{"screen": ' + ANALYSIS + "}",
+}
+
+
+def time_call(fn, text, budget=0.2):
+    """Best-of per-call time in ms, repeating until `budget` seconds have passed."""
+    best = None
+    deadline = time.perf_counter() + budget
+    runs = 0
+    while runs < 3 or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn(text)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+        runs += 1
+        if elapsed > budget * 1000:
+            break
+    return round(best, 4)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--legacy-max", type=int, default=100000,
+                        help="Skip the regex extractor above this size (it can take minutes)")
+    parser.add_argument("--out", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    report = {
+        "benchmark": "json_extract",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cases": {},
+    }
+    for name, build in CASES.items():
+        rows = []
+        for size in sizes:
+            text = build(size)
+            found = extract_json_from_text(text)
+            row = {
+                "chars": len(text),
+                "scanner_ms": time_call(extract_json_from_text, text),
+                "scanner_found": bool(found and found.get("screen_type")),
+            }
+            if len(text) <= args.legacy_max:
+                legacy = legacy_extract(text)
+                row["legacy_ms"] = time_call(legacy_extract, text)
+                row["legacy_found"] = bool(isinstance(legacy, dict) and legacy.get("screen_type"))
+            rows.append(row)
+        report["cases"][name] = rows
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,36 @@
+"""
+Appium capabilities for the Android Chrome target.
+"""
+
+from appium.options.android import UiAutomator2Options
+
+from config.settings import APPIUM_IDLE_TIMEOUT
+
+
+def build_options(udid=None, system_port=None):
+    """
+    UiAutomator2 options for Chrome on Android.
+
+    udid / system_port only matter when several sessions run at once:
+    each concurrent session needs its own device and UiAutomator2 port.
+    """
+    options = UiAutomator2Options()
+
+    options.platform_name = "Android"
+    options.device_name = "Android Emulator"
+    options.automation_name = "UiAutomator2"
+
+    if udid:
+        options.udid = udid
+    if system_port:
+        options.system_port = system_port
+
+    # Launch Chrome
+    options.app_package = "com.android.chrome"
+    options.app_activity = "com.google.android.apps.chrome.Main"
+    options.arguments = ["--disable-fre", "--no-first-run"]
+
+    # Keep pooled sessions alive on the server while they sit idle
+    options.new_command_timeout = int(APPIUM_IDLE_TIMEOUT) + 60
+
+    return options
@@ -0,0 +1,131 @@
+"""
+Runtime settings for the mobile agent loop.
+
+Every value can be overridden from the environment so CI / nightly jobs
+can tune the run without touching code.
+"""
+
+import os
+
+
+def _env_list(key):
+    return [v.strip() for v in os.getenv(key, "").split(",") if v.strip()]
+
+
+# -------------------------
+# Agent loop
+# -------------------------
+MAX_STEPS = int(os.getenv("SPECTER_MAX_STEPS", "15"))   # hard cap for demo
+
+# -------------------------
+# Appium
+# -------------------------
+APPIUM_SERVER_URL = os.getenv("APPIUM_SERVER_URL", "http://127.0.0.1:4723")
+
+# Pooled sessions idle longer than this are quit instead of reused
+APPIUM_IDLE_TIMEOUT = float(os.getenv("APPIUM_IDLE_TIMEOUT", "300"))
+
+# -------------------------
+# Parallel runner
+# -------------------------
+MAX_SESSIONS = int(os.getenv("SPECTER_MAX_SESSIONS", "2"))
+
+# One UDID per session slot. Empty → let Appium pick the device.
+APPIUM_UDIDS = _env_list("APPIUM_UDIDS")
+
+# UiAutomator2 needs a distinct systemPort per concurrent session
+APPIUM_SYSTEM_PORT_BASE = int(os.getenv("APPIUM_SYSTEM_PORT_BASE", "8200"))
+
+# -------------------------
+# Evidence
+# -------------------------
+EVIDENCE_ROOT = os.getenv("SPECTER_EVIDENCE_ROOT", "evidence/runs")
+
+# -------------------------
+# Vision agent history
+# -------------------------
+# Screenshots kept inline in the request; older turns become text summaries
+HISTORY_MAX_SCREENSHOTS = int(os.getenv("SPECTER_HISTORY_MAX_SCREENSHOTS", "3"))
+
+# Optional request budget (0 = no budget)
+HISTORY_MAX_BYTES = int(os.getenv("SPECTER_HISTORY_MAX_BYTES", "0")) or None
+HISTORY_MAX_TOKENS = int(os.getenv("SPECTER_HISTORY_MAX_TOKENS", "0")) or None
+
+# -------------------------
+# Screenshot encoding (model upload only; evidence keeps the original PNG)
+# -------------------------
+SCREENSHOT_MAX_EDGE = int(os.getenv("SPECTER_SCREENSHOT_MAX_EDGE", "1024"))   # 0 = keep size
+SCREENSHOT_FORMAT = os.getenv("SPECTER_SCREENSHOT_FORMAT", "JPEG").upper()   # PNG | JPEG | WEBP
+SCREENSHOT_QUALITY = int(os.getenv("SPECTER_SCREENSHOT_QUALITY", "75"))
+SCREENSHOT_GRAYSCALE = os.getenv("SPECTER_SCREENSHOT_GRAYSCALE", "0") == "1"
+
+# -------------------------
+# Screen analysis cache
+# -------------------------
+SCREEN_CACHE_ENABLED = os.getenv("SPECTER_SCREEN_CACHE", "1") == "1"
+SCREEN_CACHE_PATH = os.getenv("SPECTER_SCREEN_CACHE_PATH", "evidence/screen_cache.sqlite3")
+
+# Max Hamming distance (out of 64 bits) for two screens to count as the same
+SCREEN_CACHE_MAX_DISTANCE = int(os.getenv("SPECTER_SCREEN_CACHE_MAX_DISTANCE", "4"))
+SCREEN_CACHE_MAX_ENTRIES = int(os.getenv("SPECTER_SCREEN_CACHE_MAX_ENTRIES", "5000"))
+
+# -------------------------
+# Settle detection (replaces fixed sleeps after actions)
+# -------------------------
+# Screen counts as settled after this many identical consecutive samples
+SETTLE_STABLE_FRAMES = int(os.getenv("SPECTER_SETTLE_STABLE_FRAMES", "3"))
+SETTLE_INTERVAL = float(os.getenv("SPECTER_SETTLE_INTERVAL", "0.1"))   # seconds between samples
+SETTLE_TIMEOUT = float(os.getenv("SPECTER_SETTLE_TIMEOUT", "5.0"))     # give up after this
+
+# -------------------------
+# Browser (Playwright vision loop)
+# -------------------------
+BROWSER_HEADLESS = os.getenv("SPECTER_BROWSER_HEADLESS", "1") == "1"
+BROWSER_POOL_SIZE = int(os.getenv("SPECTER_BROWSER_POOL_SIZE", "2"))   # warm contexts kept
+
+# -------------------------
+# Tracing
+# -------------------------
+# JSONL file for per-phase spans (empty = tracing off)
+TRACE_PATH = os.getenv("SPECTER_TRACE_PATH", "")
+
+# -------------------------
+# Friction rules
+# -------------------------
+FRICTION_RULES_PATH = os.getenv(
+    "SPECTER_FRICTION_RULES", os.path.join(os.path.dirname(__file__), "frictions.json")
+)
+
+# -------------------------
+# Diagnosis
+# -------------------------
+# 1 = ask the model (batched across runs); 0 = instant heuristic
+DIAGNOSIS_LLM = os.getenv("SPECTER_DIAGNOSIS_LLM", "0") == "1"
+DIAGNOSIS_MAX_BATCH = int(os.getenv("SPECTER_DIAGNOSIS_MAX_BATCH", "16"))
+DIAGNOSIS_MAX_WAIT = float(os.getenv("SPECTER_DIAGNOSIS_MAX_WAIT", "0.5"))   # seconds to fill a batch
+DIAGNOSIS_TIMEOUT = float(os.getenv("SPECTER_DIAGNOSIS_TIMEOUT", "20"))      # then fall back to heuristic
+
+# -------------------------
+# Flows
+# -------------------------
+FLOWS_PATH = os.getenv(
+    "SPECTER_FLOWS", os.path.join(os.path.dirname(os.path.dirname(__file__)), "agent", "flows.json")
+)
+
+# -------------------------
+# Action traces (record / replay)
+# -------------------------
+# live:   run live, no trace written (default)
+# record: run live and save the action trace of runs that pass
+# replay: re-execute the saved trace, only calling the model where the screen diverges
+RUN_MODE = os.getenv("SPECTER_RUN_MODE", "live").lower()
+ACTION_TRACE_DIR = os.getenv("SPECTER_ACTION_TRACE_DIR", "evidence/traces")
+
+# -------------------------
+# Vision loop output
+# -------------------------
+# Request and print the model's thought summaries (off = smaller, faster turns)
+PRINT_THOUGHTS = os.getenv("SPECTER_PRINT_THOUGHTS", "0") == "1"
+
+# Constrain analyze_screen replies to a JSON schema (0 = free text, scanned for JSON)
+VISION_STRUCTURED_OUTPUT = os.getenv("SPECTER_VISION_STRUCTURED_OUTPUT", "1") == "1"
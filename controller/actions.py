@@ -1,5 +1,7 @@
 import time
 
+from controller.stability import wait_for_driver_stable
+
 COORDINATES = {
     # Test Case 1
     "LOGIN": (600, 458),
@@ -18,28 +20,53 @@ COORDINATES = {
     "BUY": (609, 1852),
 }
 
-def execute_action(driver, intent):
+def execute_action(driver, intent, locator=None):
+    """
+    Run one intent on the device. An intent replayed from an action trace
+    carries its recorded "point". Otherwise, with a Locator, tap targets are
+    resolved from the latest screen analysis; without one (or when it has
+    no match) COORDINATES is used.
+    """
     start = time.time()
+    source = None
+    tapped = None
+
+    def point(target):
+        nonlocal source, tapped
+        if intent.get("point"):
+            xy, source = tuple(intent["point"]), "trace"
+        elif locator is None:
+            xy, source = COORDINATES[target], "static"
+        else:
+            xy, source = locator.locate(driver, target)
+        tapped = xy
+        return xy
 
     try:
         action = intent["action"]
         target = intent.get("target")
 
+        settle = None
+
         if action == "tap":
-            x, y = COORDINATES[target]
+            x, y = point(target)
             driver.tap([(x, y)])
+            settle = wait_for_driver_stable(driver)
 
         elif action == "type":
-            x, y = COORDINATES[target]
+            x, y = point(target)
             driver.tap([(x, y)])
-            time.sleep(0.5)
+            # Let the field take focus (and the keyboard open) before typing
+            wait_for_driver_stable(driver)
             driver.execute_script(
                 "mobile: type",
                 {"text": intent["text"]}
             )
+            settle = wait_for_driver_stable(driver)
 
         elif action == "scroll":
             driver.swipe(950, 820, 52, 803, 600)
+            settle = wait_for_driver_stable(driver)
 
         elif action == "wait":
             time.sleep(intent.get("seconds", 2))
@@ -47,6 +74,9 @@ def execute_action(driver, intent):
         return {
             "success": True,
             "execution_time": round(time.time() - start, 2),
+            "settled": settle.stable if settle else None,
+            "locator": source,
+            "point": tapped,
             "action": intent
         }
 
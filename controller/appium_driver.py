@@ -1,30 +1,188 @@
-from appium import webdriver
-from appium.options.android import UiAutomator2Options
+import threading
 import time
 
-URL = "https://penny-juice.com/#slide-2"
-
-def get_driver():
-    options = UiAutomator2Options()
+from appium import webdriver
 
-    options.platform_name = "Android"
-    options.device_name = "Android Emulator"
-    options.automation_name = "UiAutomator2"
+from config.appium_caps import build_options
+from config.settings import APPIUM_SERVER_URL, APPIUM_IDLE_TIMEOUT
+from controller.stability import wait_for_driver_stable
 
-    # Launch Chrome
-    options.app_package = "com.android.chrome"
-    options.app_activity = "com.google.android.apps.chrome.Main"
-    options.arguments = ["--disable-fre", "--no-first-run"]
+URL = "https://penny-juice.com/#slide-2"
 
+def get_driver(udid=None, system_port=None, server_url=APPIUM_SERVER_URL):
+    """
+    Open a new Appium session on Chrome and load the target site.
+    """
     driver = webdriver.Remote(
-        command_executor="http://127.0.0.1:4723",
-        options=options
+        command_executor=server_url,
+        options=build_options(udid=udid, system_port=system_port)
     )
 
-    time.sleep(3)
+    # Wait for Chrome to finish launching, then for the page to render
+    wait_for_driver_stable(driver, timeout=10)
 
     # Load target website
-    driver.get(URL)
-    time.sleep(3)
+    reset_to_start(driver)
 
     return driver
+
+
+def reset_to_start(driver, url=URL):
+    """
+    Cheap reset between runs: reload the start URL instead of tearing the
+    session down and creating a new one.
+    """
+    driver.get(url)
+    wait_for_driver_stable(driver, timeout=10)
+
+
+def is_healthy(driver) -> bool:
+    """One cheap round trip to check the session is still alive."""
+    try:
+        driver.get_window_size()
+        return True
+    except Exception:
+        return False
+
+
+class AppiumSessionPool:
+    """
+    Reusable Appium sessions for batches of test cases.
+
+    Each session is bound to a slot (0 .. max_sessions-1) so device / port
+    assignments stay unique. acquire() hands out an idle session after a
+    health check and reset_to_start(), or opens a new one on a free slot;
+    release() puts it back. Sessions idle longer than idle_timeout are quit.
+
+    driver_factory(slot) opens a session; it defaults to get_driver with no
+    device pinning, so the pool can also run against a local WebDriver
+    stand-in (see controller.webdriver_stub).
+    """
+
+    def __init__(self, max_sessions=1, driver_factory=None, idle_timeout=APPIUM_IDLE_TIMEOUT,
+                 reset=reset_to_start, health_check=is_healthy):
+        self.max_sessions = max_sessions
+        self.driver_factory = driver_factory or (lambda slot: get_driver())
+        self.idle_timeout = idle_timeout
+        self.reset = reset
+        self.health_check = health_check
+
+        self._cond = threading.Condition()
+        self._idle = []                             # (driver, slot, released_at)
+        self._free_slots = list(range(max_sessions))
+        self._slot_of = {}                          # id(driver) -> slot
+        self._closed = False
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Warning: failed to quit Appium session: {e}")
+
+    def reap(self):
+        """Quit sessions that have been idle for longer than idle_timeout."""
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            keep = []
+            for driver, slot, released_at in self._idle:
+                if now - released_at > self.idle_timeout:
+                    expired.append(driver)
+                    self._slot_of.pop(id(driver), None)
+                    self._free_slots.append(slot)
+                else:
+                    keep.append((driver, slot, released_at))
+            self._idle = keep
+            if expired:
+                self._cond.notify_all()
+        for driver in expired:
+            self._quit(driver)
+
+    def acquire(self, timeout=None):
+        """Return a ready-to-use driver, waiting if every slot is busy."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.reap()
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("AppiumSessionPool is closed")
+                if self._idle:
+                    driver, slot, _ = self._idle.pop()
+                    new_slot = None
+                elif self._free_slots:
+                    driver, slot = None, None
+                    new_slot = self._free_slots.pop(0)
+                else:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("No Appium session available")
+                    self._cond.wait(remaining)
+                    continue
+
+            if driver is not None:
+                # Warm session: health check + cheap reset outside the lock
+                try:
+                    if not self.health_check(driver):
+                        raise RuntimeError("health check failed")
+                    self.reset(driver)
+                    self.reused += 1
+                    return driver
+                except Exception as e:
+                    print(f"Appium session on slot {slot} unusable ({e}), replacing it")
+                    self.discard(driver)
+                    continue
+
+            try:
+                driver = self.driver_factory(new_slot)
+            except Exception:
+                with self._cond:
+                    self._free_slots.append(new_slot)
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._slot_of[id(driver)] = new_slot
+            self.created += 1
+            return driver
+
+    def release(self, driver):
+        """Return a driver to the pool for reuse."""
+        with self._cond:
+            slot = self._slot_of.get(id(driver))
+            if slot is None:
+                return
+            if self._closed:
+                self._slot_of.pop(id(driver), None)
+            else:
+                self._idle.append((driver, slot, time.monotonic()))
+                self._cond.notify()
+                return
+        self._quit(driver)
+
+    def discard(self, driver):
+        """Quit a broken driver and free its slot."""
+        with self._cond:
+            slot = self._slot_of.pop(id(driver), None)
+            if slot is not None:
+                self._free_slots.append(slot)
+                self._cond.notify()
+        self.discarded += 1
+        self._quit(driver)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = [driver for driver, _, _ in self._idle]
+            for driver in idle:
+                self._slot_of.pop(id(driver), None)
+            self._idle = []
+            self._cond.notify_all()
+        for driver in idle:
+            self._quit(driver)
+
+    def stats(self) -> dict:
+        return {"created": self.created, "reused": self.reused, "discarded": self.discarded}
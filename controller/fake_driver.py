@@ -0,0 +1,100 @@
+"""
+In-process stand-in for an Appium driver, for benchmarks and dry runs.
+
+Implements the driver calls the agent loop makes (tap, swipe,
+execute_script, screenshots, page_source, current_url, window size, quit). Each call
+sleeps for a tunable latency. Every gesture moves to the next scripted
+screen, and each screen has its own PNG so perceptual hashing tells
+them apart.
+"""
+
+import base64
+import struct
+import time
+import zlib
+
+WIDTH = 108
+HEIGHT = 240
+
+
+def make_png(seed: int, width: int = WIDTH, height: int = HEIGHT) -> bytes:
+    """Small grayscale PNG with a per-seed stripe pattern (no Pillow needed)."""
+    period = 3 + seed % 11
+    phase = (seed * 7) % period
+    rows = []
+    for y in range(height):
+        row = bytes(
+            255 if ((x + phase + (y // (4 + seed % 5))) // period) % 2 else (seed * 37) % 200
+            for x in range(width)
+        )
+        rows.append(b"\x00" + row)
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + chunk(b"IEND", b""))
+
+
+class FakeDriver:
+    """
+    screens: number of distinct screens to cycle through.
+    Latencies are in seconds.
+    """
+
+    def __init__(self, screens: int = 8, tap_latency=0.0, swipe_latency=0.0,
+                 type_latency=0.0, screenshot_latency=0.0, source_latency=0.0, url="https://fake.local/"):
+        self.tap_latency = tap_latency
+        self.swipe_latency = swipe_latency
+        self.type_latency = type_latency
+        self.screenshot_latency = screenshot_latency
+        self.source_latency = source_latency
+        self.current_url = url
+
+        self._frames = [make_png(i) for i in range(max(1, screens))]
+        self.screen_index = 0
+        self.calls = {"tap": 0, "swipe": 0, "type": 0, "screenshot": 0, "source": 0}
+
+    def _advance(self):
+        self.screen_index = (self.screen_index + 1) % len(self._frames)
+
+    def tap(self, positions, duration=None):
+        self.calls["tap"] += 1
+        time.sleep(self.tap_latency)
+        self._advance()
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=0):
+        self.calls["swipe"] += 1
+        time.sleep(self.swipe_latency)
+        self._advance()
+
+    def execute_script(self, script, *args):
+        if script == "mobile: type":
+            self.calls["type"] += 1
+            time.sleep(self.type_latency)
+
+    def get_screenshot_as_png(self) -> bytes:
+        self.calls["screenshot"] += 1
+        time.sleep(self.screenshot_latency)
+        return self._frames[self.screen_index]
+
+    def get_screenshot_as_base64(self) -> str:
+        return base64.b64encode(self.get_screenshot_as_png()).decode("ascii")
+
+    @property
+    def page_source(self) -> str:
+        self.calls["source"] += 1
+        time.sleep(self.source_latency)
+        return f'<hierarchy><android.view.View screen="{self.screen_index}"/></hierarchy>'
+
+    def get_window_size(self):
+        return {"width": 1080, "height": 2400}
+
+    def get(self, url):
+        self.current_url = url
+        self.screen_index = 0
+
+    def quit(self):
+        pass
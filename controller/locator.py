@@ -0,0 +1,110 @@
+"""
+Resolve action targets ("LOGIN", "CONTACT_US", ...) to tap points.
+
+After each screenshot the loop hands the locator the screen's
+fingerprint and the latest vision (or DOM) output. Targets in that
+output carry centres in normalized 0-1000 coordinates, the same
+convention the computer-use model uses:
+
+    {"targets": [{"label": "Login", "x": 555, "y": 190}, ...]}
+
+so a resolution works on any device size and survives layout shifts.
+Resolutions are cached per (fingerprint, target): a second tap on the
+same screen costs a dict lookup. When the output has no match, the
+static COORDINATES table in controller/actions.py is used.
+"""
+
+import re
+from collections import OrderedDict
+
+from controller.actions import COORDINATES
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+def normalize_label(label) -> str:
+    """'Contact us' / 'contact-us' / 'CONTACT_US' -> 'CONTACT_US'."""
+    return _NON_ALNUM.sub("_", str(label).upper()).strip("_")
+
+
+def find_target(targets, target: str):
+    """
+    Normalized (x, y) of `target` in a list of {"label", "x", "y"} dicts.
+    Exact label match wins; otherwise the target as a whole word of a
+    label ("BUY" in "BUY_NOW"). Returns None when nothing matches.
+    """
+    wanted = normalize_label(target)
+    partial = None
+    for item in targets or ():
+        try:
+            label = normalize_label(item["label"])
+            point = (float(item["x"]), float(item["y"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not (0 <= point[0] <= 1000 and 0 <= point[1] <= 1000):
+            continue
+        if label == wanted:
+            return point
+        if partial is None and f"_{wanted}_" in f"_{label}_":
+            partial = point
+    return partial
+
+
+class Locator:
+    """
+    Per-run target resolver. Not shared between runs: it remembers the
+    current screen and the driver's window size.
+    """
+
+    def __init__(self, static=None, max_entries: int = 2048):
+        self.static = COORDINATES if static is None else static
+        self.max_entries = max_entries
+        self.fingerprint = None
+        self._targets = ()
+        self._cache = OrderedDict()      # (fingerprint, target) -> normalized (x, y) | None
+        self._window = None
+
+        self.hits = 0
+        self.resolved = 0
+        self.fallbacks = 0
+
+    def observe(self, fingerprint, output):
+        """Record the screen the next action will run on."""
+        self.fingerprint = fingerprint
+        self._targets = (output or {}).get("targets") or ()
+
+    def _window_size(self, driver):
+        if self._window is None:
+            size = driver.get_window_size()
+            self._window = (size["width"], size["height"])
+        return self._window
+
+    def locate(self, driver, target: str):
+        """
+        Pixel point for `target` on the current screen and where it came
+        from: "cache", "vision" or "static". Raises KeyError if no source
+        knows the target.
+        """
+        key = (self.fingerprint, target)
+        if self.fingerprint is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            point, source = self._cache[key], "cache"
+            self.hits += 1
+        else:
+            point, source = find_target(self._targets, target), "vision"
+            if self.fingerprint is not None:
+                self._cache[key] = point
+                if len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        if point is None:
+            self.fallbacks += 1
+            return self.static[target], "static"
+
+        if source == "vision":
+            self.resolved += 1
+        width, height = self._window_size(driver)
+        return (int(point[0] / 1000 * width), int(point[1] / 1000 * height)), source
+
+    def stats(self) -> dict:
+        return {"cache_hits": self.hits, "resolved": self.resolved, "fallbacks": self.fallbacks}
@@ -0,0 +1,171 @@
+"""
+Settle detection: wait until the screen stops changing instead of sleeping
+for a fixed time.
+
+A cheap sample (DOM mutation count, a digest of a low-resolution
+screenshot, or on Appium a digest of the page source) is taken in a short
+loop; as soon as `stable_frames` consecutive samples are identical the
+wait returns. `timeout` bounds the wait for pages that never settle
+(carousels, video, spinners).
+"""
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+
+from config.settings import SETTLE_STABLE_FRAMES, SETTLE_INTERVAL, SETTLE_TIMEOUT
+
+
+@dataclass
+class SettleResult:
+    stable: bool
+    elapsed: float
+    samples: int
+
+
+# Installs a MutationObserver once per document and reports the running
+# count, readyState and URL. A navigation replaces the document, so the
+# counter restarts from zero and the URL changes; both break the streak.
+_DOM_PROBE = """() => {
+    if (!window.__specterMutations) {
+        window.__specterMutations = {count: 0};
+        new MutationObserver(m => { window.__specterMutations.count += m.length; })
+            .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    }
+    return [window.__specterMutations.count, document.readyState, location.href];
+}"""
+
+
+class _Unstable:
+    """Sample that never equals anything, including itself."""
+
+    def __eq__(self, other):
+        return False
+
+
+def wait_until_stable(sample, stable_frames=SETTLE_STABLE_FRAMES,
+                      interval=SETTLE_INTERVAL, timeout=SETTLE_TIMEOUT) -> SettleResult:
+    """
+    Call sample() until it returns the same value `stable_frames` times in a
+    row, or until `timeout` seconds have passed.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    previous = _Unstable()
+    streak = 0
+    samples = 0
+
+    while True:
+        current = sample()
+        samples += 1
+        streak = streak + 1 if current == previous else 1
+        previous = current
+
+        if streak >= stable_frames:
+            return SettleResult(True, time.monotonic() - start, samples)
+        if time.monotonic() + interval > deadline:
+            return SettleResult(False, time.monotonic() - start, samples)
+        time.sleep(interval)
+
+
+def wait_for_page_stable(page, mode="dom", **kwargs) -> SettleResult:
+    """
+    Playwright: settle on DOM mutations (default) or on screenshots.
+
+    mode="dom" is the cheapest and waits for readyState == "complete";
+    mode="screenshot" also catches canvas / CSS-only animations.
+    """
+    def dom_sample():
+        try:
+            count, ready_state, url = page.evaluate(_DOM_PROBE)
+        except Exception:
+            # Execution context destroyed mid-navigation
+            return _Unstable()
+        if ready_state != "complete":
+            return _Unstable()
+        return count, url
+
+    def screenshot_sample():
+        try:
+            shot = page.screenshot(type="jpeg", quality=20, scale="css")
+        except Exception:
+            return _Unstable()
+        return hashlib.blake2b(shot, digest_size=16).digest()
+
+    return wait_until_stable(dom_sample if mode == "dom" else screenshot_sample, **kwargs)
+
+
+def wait_for_driver_stable(driver, mode="source", **kwargs) -> SettleResult:
+    """
+    Appium: settle on page-source digests (default) or on screenshots.
+
+    mode="source" hashes the UI hierarchy XML: no image capture or PNG
+    encoding on the device and a far smaller payload than a full-resolution
+    screenshot. mode="screenshot" also catches changes the hierarchy does
+    not show (animations, canvas) at the cost of one full screenshot per
+    sample.
+
+    Every sample is a device round trip, which already spaces them out, so
+    no extra sleep is added between samples unless `interval` is passed.
+    """
+    kwargs.setdefault("interval", 0)
+
+    def source_sample():
+        try:
+            source = driver.page_source
+        except Exception:
+            return _Unstable()
+        return hashlib.blake2b(source.encode("utf-8"), digest_size=16).digest()
+
+    def screenshot_sample():
+        try:
+            shot = driver.get_screenshot_as_base64()
+        except Exception:
+            return _Unstable()
+        return hashlib.blake2b(shot.encode("ascii"), digest_size=16).digest()
+
+    return wait_until_stable(source_sample if mode == "source" else screenshot_sample, **kwargs)
+
+
+async def wait_until_stable_async(sample, stable_frames=SETTLE_STABLE_FRAMES,
+                                  interval=SETTLE_INTERVAL, timeout=SETTLE_TIMEOUT) -> SettleResult:
+    """asyncio twin of wait_until_stable; `sample` is a coroutine function."""
+    start = time.monotonic()
+    deadline = start + timeout
+    previous = _Unstable()
+    streak = 0
+    samples = 0
+
+    while True:
+        current = await sample()
+        samples += 1
+        streak = streak + 1 if current == previous else 1
+        previous = current
+
+        if streak >= stable_frames:
+            return SettleResult(True, time.monotonic() - start, samples)
+        if time.monotonic() + interval > deadline:
+            return SettleResult(False, time.monotonic() - start, samples)
+        await asyncio.sleep(interval)
+
+
+async def wait_for_page_stable_async(page, mode="dom", **kwargs) -> SettleResult:
+    """Async Playwright version of wait_for_page_stable."""
+    async def dom_sample():
+        try:
+            count, ready_state, url = await page.evaluate(_DOM_PROBE)
+        except Exception:
+            return _Unstable()
+        if ready_state != "complete":
+            return _Unstable()
+        return count, url
+
+    async def screenshot_sample():
+        try:
+            shot = await page.screenshot(type="jpeg", quality=20, scale="css")
+        except Exception:
+            return _Unstable()
+        return hashlib.blake2b(shot, digest_size=16).digest()
+
+    return await wait_until_stable_async(dom_sample if mode == "dom" else screenshot_sample, **kwargs)
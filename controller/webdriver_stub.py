@@ -0,0 +1,148 @@
+"""
+Local stand-in for an Appium server.
+
+Implements the slice of the W3C WebDriver HTTP protocol the agent uses
+(sessions, navigation, window rect, screenshots, page source, actions,
+execute) so the
+session pool and the agent loop can be exercised without a device:
+
+    python -m controller.webdriver_stub --port 4799
+    APPIUM_SERVER_URL=http://127.0.0.1:4799 python main.py
+
+Every call is counted in `WebDriverStub.calls` for assertions and
+benchmarks.
+"""
+
+import argparse
+import base64
+import json
+import re
+import threading
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 1x1 white PNG
+_PNG = base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010802000000907753de"
+    "0000000c4944415408d763f8ffff3f0005fe02fea7d6a4a30000000049454e44ae426082"
+)).decode("ascii")
+
+_SESSION_PATH = re.compile(r"^/session/([^/]+)(/.*)?$")
+
+
+class WebDriverStub:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.sessions = {}
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _route(self, method, path, body):
+        """Return (status, value) for one WebDriver command."""
+        if path == "/status":
+            return 200, {"ready": True, "message": "webdriver stub"}
+
+        if path == "/session" and method == "POST":
+            session_id = uuid.uuid4().hex
+            caps = (body.get("capabilities") or {}).get("alwaysMatch", {})
+            with self._lock:
+                self.sessions[session_id] = {"url": "about:blank", "capabilities": caps}
+            return 200, {"sessionId": session_id, "capabilities": caps}
+
+        match = _SESSION_PATH.match(path)
+        if not match:
+            return 404, {"error": "unknown command", "message": path}
+        session_id, command = match.group(1), match.group(2) or ""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return 404, {"error": "invalid session id", "message": session_id}
+
+        if command == "" and method == "DELETE":
+            with self._lock:
+                self.sessions.pop(session_id, None)
+            return 200, None
+        if command == "/url":
+            if method == "POST":
+                session["url"] = body.get("url", "")
+                return 200, None
+            return 200, session["url"]
+        if command == "/window/rect":
+            return 200, {"x": 0, "y": 0, "width": 1080, "height": 2400}
+        if command == "/screenshot":
+            return 200, _PNG
+        if command == "/source":
+            return 200, "<hierarchy/>"
+        if command in ("/actions", "/execute/sync", "/cookie"):
+            return 200, None
+        return 404, {"error": "unknown command", "message": command}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else {}
+                path = self.path.split("?", 1)[0].rstrip("/")
+
+                # Count by route shape, not by session id
+                route = _SESSION_PATH.sub(r"/session/:id\2", path)
+                stub.calls[f"{method} {route}"] += 1
+                status, value = stub._route(method, path, body)
+
+                payload = json.dumps({"value": value}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=4799)
+    args = parser.parse_args()
+
+    stub = WebDriverStub(port=args.port)
+    print(f"WebDriver stub listening on {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,125 @@
+"""
+Evidence store shared by the Appium loop (main.py) and the vision loops.
+
+Screenshots are handed to a background writer thread so disk I/O never
+sits on the agent's hot path. Files are named by the SHA-256 of their
+content, so identical frames (a stuck screen, a repeated step) are stored
+once. Every put() is recorded in a per-run manifest (step → hash, url,
+timestamp) that is written when the store is closed.
+
+close() flushes the queue and writes the manifest; it is also run at
+interpreter exit for any store that was never closed explicitly.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import weakref
+from pathlib import Path
+
+_STOP = object()
+_open_stores = weakref.WeakSet()
+
+
+class EvidenceStore:
+    def __init__(self, run_dir, objects_dir=None, max_pending: int = 256):
+        self.run_dir = Path(run_dir)
+        self.objects_dir = Path(objects_dir) if objects_dir else self.run_dir / "screenshots"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+        self.manifest = []
+        self.errors = []
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._writer, name="evidence-writer", daemon=True)
+        self._thread.start()
+        _open_stores.add(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, step, data: bytes, url: str = "", ext: str = "png", **extra) -> str:
+        """
+        Queue `data` for writing and record it under `step`.
+
+        Returns the path the file will have once written. Only the first
+        copy of a given frame is queued.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.objects_dir / f"{digest}.{ext}"
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EvidenceStore is closed")
+            self.manifest.append({
+                "step": step,
+                "hash": digest,
+                "file": str(path),
+                "url": url,
+                "timestamp": time.time(),
+                **extra,
+            })
+            is_new = digest not in self._seen
+            self._seen.add(digest)
+
+        if is_new:
+            self._queue.put((path, data))
+        return str(path)
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                path, data = item
+                if not path.exists():
+                    tmp = path.with_suffix(path.suffix + ".tmp")
+                    tmp.write_bytes(data)
+                    os.replace(tmp, path)
+            except Exception as e:
+                self.errors.append(str(e))
+                print(f"Warning: evidence write failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued write is on disk."""
+        self._queue.join()
+
+    def close(self):
+        """Flush pending writes, stop the writer and write manifest.json."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        self._queue.put(_STOP)
+        self._thread.join()
+
+        manifest_path = self.run_dir / "manifest.json"
+        tmp = manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({
+            "run_id": self.run_dir.name,
+            "steps": self.manifest,
+            "unique_frames": len(self._seen),
+            "write_errors": self.errors,
+        }, indent=2))
+        os.replace(tmp, manifest_path)
+        _open_stores.discard(self)
+
+
+@atexit.register
+def _close_open_stores():
+    for store in list(_open_stores):
+        store.close()
@@ -1,99 +1,323 @@
-from controller.appium_driver import get_driver
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from controller.appium_driver import get_driver, AppiumSessionPool
 from controller.actions import execute_action
+from controller.locator import Locator
 
-from agent.decision import decide_next_action
+from agent.decision import next_intent
 from agent.vision import analyze_screen
+from agent.screen_cache import ScreenCache
+from agent.action_trace import ActionTrace, check_mode, fingerprint, same_screen
+from agent.tracing import span, trace_run
+from agent.diagnosis import diagnose, get_diagnosis_service
+
+from evidence.collector import EvidenceStore
 
 from state.tracker import StateTracker
-from state.frictions import detect_friction
+from state.frictions import FrictionEngine
 
+from config.settings import (
+    MAX_STEPS,
+    MAX_SESSIONS,
+    APPIUM_UDIDS,
+    APPIUM_SYSTEM_PORT_BASE,
+    EVIDENCE_ROOT,
+    SCREEN_CACHE_ENABLED,
+    DIAGNOSIS_LLM,
+    RUN_MODE,
+)
 
-MAX_STEPS = 15   # hard cap for demo
+_screen_cache = None
 
 
-def run_agent_loop(test_case: str):
-    print(f"\n▶ Running test case: {test_case}")
+def get_screen_cache():
+    """Process-wide screen cache, shared by every run (and thread)."""
+    global _screen_cache
+    if _screen_cache is None and SCREEN_CACHE_ENABLED:
+        _screen_cache = ScreenCache()
+    return _screen_cache
 
-    driver = get_driver()
-    tracker = StateTracker()
-
-    step_index = 0
 
+def current_url(driver) -> str:
     try:
-        while step_index < MAX_STEPS:
-            print(f"\n--- Loop step {step_index} ---")
-
-            # STEP 1 — Decide next intent
-            intent = decide_next_action(test_case, step_index)
-
-            if intent is None:
-                print("✅ Flow completed normally.")
-                break
-
-            # STEP 2 — Execute action
-            result = execute_action(driver, intent)
-
-            # STEP 3 — Screenshot
-            screenshot_path = f"evidence/screenshots/step_{step_index}.png"
-            driver.save_screenshot(screenshot_path)
-
-            # STEP 4 — Vision
-            vision_output = analyze_screen(screenshot_path)
-
-            # STEP 5 — State update
-            state_snapshot = tracker.update(
-                vision_output=vision_output,
-                action_result=result
-            )
-            tracker.set_last_action(intent)
-
-            # 🔒 NORMALISE STATE KEYS (match detect_friction expectations)
-            state_snapshot = {
-            "current_screen_id": state_snapshot.get("Current_screen_id"),
-            "time_on_screen": state_snapshot.get("time_on_Screen", 0),
-            "attempts_on_screen": state_snapshot.get("Attempts_on_screen", 0),
-            "screen_repeat_count": state_snapshot.get("Screen_repeat_count", 0),
-            "history": state_snapshot.get("history", []),
-            "action_succeeded": state_snapshot.get("action_succeeded", False),
-            
-            }
+        return driver.current_url or ""
+    except Exception:
+        # Native context has no URL; the hash alone keys the cache
+        return ""
+
 
+def intent_for_trace(intent: dict) -> dict:
+    return {k: v for k, v in intent.items() if k != "point"}
 
-            
 
-            print("State snapshot:", state_snapshot)
+def new_run_id(test_case: str) -> str:
+    return f"{test_case}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
 
-            # STEP 6 — Friction detection
-            is_stuck, friction_type = detect_friction(state_snapshot)
 
-            # STEP 7 — If friction detected → PRINT + STOP
-            if is_stuck:
-                print("\n⚠️ FRICTION DETECTED")
-                print("Type:", friction_type)
+def run_agent_loop(test_case: str, driver=None, run_id: str = None, evidence_root: str = EVIDENCE_ROOT,
+                   screen_cache=None, mode: str = RUN_MODE):
+    """
+    Run one test case end to end.
 
-                diagnosis = {
-                    "issue_type": "UX Friction",
-                    "severity": "P2",
-                    "root_cause": f"Detected friction: {friction_type}",
-                    "suggested_team": "Frontend",
-                }
+    If a driver is passed in, the caller owns it and it is NOT quit here.
+    Screenshots go to <evidence_root>/<run_id>/screenshots, named by
+    content hash and written off the hot path; manifest.json maps each
+    step to its frame when the run ends.
 
-                print("\n🧠 DIAGNOSIS")
-                for k, v in diagnosis.items():
-                    print(f"{k}: {v}")
+    screen_cache defaults to the shared on-disk cache (see
+    SPECTER_SCREEN_CACHE); pass one explicitly to isolate a run.
 
-                print("\n🛑 Agent stopping after detecting issue.")
-                break
+    mode "live" (the default) writes no trace. mode "record" runs live
+    and saves the action trace when the flow completes. mode "replay" re-executes the saved trace: recorded taps
+    and screen analyses are reused while each screen matches its recorded
+    fingerprint, and the run goes live (vision + flow graph) from the
+    first mismatch on.
 
-            step_index += 1
+    Returns a summary dict for the run.
+    """
+    run_id = run_id or new_run_id(test_case)
+    check_mode(mode)
+    print(f"\n▶ Running test case: {test_case} (run {run_id}, {mode})")
 
-        else:
-            print("\n⏹ Max steps reached without friction.")
+    replay = ActionTrace.load("agent_loop", test_case) if mode == "replay" else None
+    if mode == "replay" and replay is None:
+        print(f"No recorded trace for {test_case}; running live.")
+    recording = ActionTrace("agent_loop", test_case)
+
+    evidence_dir = os.path.join(evidence_root, run_id)
+    evidence = EvidenceStore(evidence_dir)
+
+    owns_driver = driver is None
+    if owns_driver:
+        driver = get_driver()
+    tracker = StateTracker()
+    frictions = FrictionEngine()
+    locator = Locator()
+    screen_cache = screen_cache or get_screen_cache()
+
+    summary = {
+        "run_id": run_id,
+        "test_case": test_case,
+        "status": "max_steps",
+        "steps": 0,
+        "friction_type": None,
+        "frictions": [],
+        "diagnosis": None,
+        "evidence_dir": evidence_dir,
+        "duration": 0.0,
+        "cache": {"hits": 0, "misses": 0},
+        "mode": mode,
+        "replay": {"replayed": 0, "diverged_at": None} if replay else None,
+    }
+    start = time.time()
+
+    step_index = 0
+    node = None            # current flow node (None = not started)
+    screen_type = None     # what the last step's screen was classified as
+    fp = None              # fingerprint of the last screenshot
+
+    try:
+        with trace_run(run_id), span("run", test_case=test_case):
+            while step_index < MAX_STEPS:
+                print(f"\n--- [{run_id}] Loop step {step_index} ---")
+
+                with span("step", step=step_index) as step_span:
+                    recorded = replay.step(step_index) if replay else None
+
+                    # STEP 1 — Decide next intent (trace, or flow graph conditioned on the last screen)
+                    with span("decide", screen=screen_type, replayed=recorded is not None) as decide_span:
+                        if recorded is not None:
+                            node = recorded["node"]
+                            intent = dict(recorded["intent"], point=recorded.get("point"))
+                        else:
+                            node, intent = next_intent(test_case, node, screen_type)
+                        decide_span.set(node=node)
+
+                    if intent is None:
+                        print("✅ Flow completed normally.")
+                        summary["status"] = "completed"
+                        if mode == "record":
+                            print(f"Action trace saved: {recording.save()}")
+                        break
+
+                    # STEP 2 — Execute action
+                    with span("execute", action=intent.get("action")):
+                        result = execute_action(driver, intent, locator=locator)
+
+                    # STEP 3 — Screenshot
+                    with span("screenshot"):
+                        png = driver.get_screenshot_as_png()
+                        url = current_url(driver)
+                        evidence.put(step_index, png, url=url, action=intent)
+
+                    before = fp
+                    fp = fingerprint(png)
+
+                    # STEP 4 — Vision (recorded while replay matches, else cached on perceptual hash + URL)
+                    with span("vision") as vision_span:
+                        if recorded is not None and same_screen(fp, recorded["after"]):
+                            vision_output = recorded["vision"]
+                            summary["replay"]["replayed"] += 1
+                            vision_span.set(replayed=True)
+                        elif recorded is not None:
+                            print(f"Replay diverged at step {step_index}; continuing live.")
+                            summary["replay"]["diverged_at"] = step_index
+                            replay = None
+                            vision_output = analyze_screen(png)
+                        elif screen_cache is not None:
+                            vision_output, hit = screen_cache.analyze(png, url, analyze_screen)
+                            summary["cache"]["hits" if hit else "misses"] += 1
+                            vision_span.set(cache_hit=hit)
+                            if hit:
+                                print("Vision: cache hit")
+                        else:
+                            vision_output = analyze_screen(png)
+                        # Next step's tap targets resolve against this screen
+                        locator.observe(fp, vision_output)
+                        screen_type = vision_output.get("screen_type")
+
+                    recording.add(step=step_index, node=node, intent=intent_for_trace(intent),
+                                  point=result.get("point"), before=before, after=fp, vision=vision_output)
+
+                    # STEP 5 — State update
+                    with span("state_update"):
+                        state_snapshot = tracker.update(
+                            vision_output=vision_output,
+                            action_result=result
+                        )
+                        tracker.set_last_action(intent)
+
+                    print("State snapshot:", state_snapshot)
+
+                    # STEP 6 — Friction detection
+                    with span("friction") as friction_span:
+                        matches = frictions.evaluate(state_snapshot)
+                        is_stuck = bool(matches)
+                        friction_type = matches[0].friction_type if matches else None
+                        friction_span.set(friction_type=friction_type,
+                                          matches=[m.friction_type for m in matches])
+
+                    step_span.set(screen=state_snapshot.current_screen_id)
+
+                # STEP 7 — If friction detected → PRINT + STOP
+                if is_stuck:
+                    print("\n⚠️ FRICTION DETECTED")
+                    print("Type:", friction_type)
+                    if len(matches) > 1:
+                        print("Also matched:", ", ".join(m.friction_type for m in matches[1:]))
+
+                    with span("diagnosis", friction_type=friction_type) as diagnosis_span:
+                        if DIAGNOSIS_LLM:
+                            diagnosis = get_diagnosis_service().diagnose(
+                                vision_output, state_snapshot, friction_type, severity=matches[0].severity
+                            )
+                        else:
+                            diagnosis = diagnose(vision_output, state_snapshot, friction_type,
+                                                 severity=matches[0].severity)
+                            diagnosis_span.set(source="heuristic")
+
+                    print("\n🧠 DIAGNOSIS")
+                    for k, v in diagnosis.items():
+                        print(f"{k}: {v}")
+
+                    summary["status"] = "friction"
+                    summary["friction_type"] = friction_type
+                    summary["frictions"] = [m.friction_type for m in matches]
+                    summary["diagnosis"] = diagnosis
+
+                    print("\n🛑 Agent stopping after detecting issue.")
+                    break
+
+                step_index += 1
+
+            else:
+                print("\n⏹ Max steps reached without friction.")
 
     finally:
-        driver.quit()
-        print("\n🧹 Driver closed.")
-        print("🏁 Agent loop finished.\n")
+        evidence.close()
+        summary["steps"] = step_index
+        summary["duration"] = round(time.time() - start, 2)
+        summary["locator"] = locator.stats()
+        print(f"Screen cache: {summary['cache']['hits']} hits / {summary['cache']['misses']} misses")
+        if owns_driver:
+            driver.quit()
+            print("\n🧹 Driver closed.")
+        print(f"🏁 Agent loop finished ({run_id}).\n")
+
+    return summary
+
+
+# -------------------------
+# PARALLEL RUNNER
+# -------------------------
+def _default_driver_factory(slot: int):
+    udid = APPIUM_UDIDS[slot] if slot < len(APPIUM_UDIDS) else None
+    return get_driver(udid=udid, system_port=APPIUM_SYSTEM_PORT_BASE + slot)
+
+
+def run_parallel(test_cases, max_sessions: int = MAX_SESSIONS, driver_factory=None,
+                 evidence_root: str = EVIDENCE_ROOT, session_pool: AppiumSessionPool = None):
+    """
+    Run several test cases at the same time over at most `max_sessions`
+    driver sessions.
+
+    Sessions come from an AppiumSessionPool, so a batch longer than the
+    pool reuses warm sessions (reset to the start URL) instead of opening
+    a new one per run. driver_factory(slot) builds the driver for a session
+    slot (0 .. max_sessions-1); the slot is what keeps device / port
+    assignments unique between concurrent runs. Pass session_pool to keep
+    sessions warm across batches.
+
+    Each run gets its own StateTracker and evidence directory.
+    Returns one summary dict per test case, in input order.
+    """
+    max_sessions = max(1, min(max_sessions, len(test_cases) or 1))
+    owns_pool = session_pool is None
+    if owns_pool:
+        session_pool = AppiumSessionPool(max_sessions, driver_factory or _default_driver_factory)
+
+    def worker(test_case):
+        run_id = new_run_id(test_case)
+        driver = None
+        try:
+            driver = session_pool.acquire()
+            summary = run_agent_loop(test_case, driver=driver, run_id=run_id,
+                                     evidence_root=evidence_root)
+        except Exception as e:
+            print(f"❌ Run {run_id} crashed: {e}")
+            if driver is not None:
+                session_pool.discard(driver)
+            return {
+                "run_id": run_id,
+                "test_case": test_case,
+                "status": "error",
+                "error": str(e),
+                "evidence_dir": os.path.join(evidence_root, run_id),
+            }
+        session_pool.release(driver)
+        return summary
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="specter-run") as pool:
+            summaries = list(pool.map(worker, test_cases))
+    finally:
+        if owns_pool:
+            session_pool.close()
+
+    print("\n📋 RUN SUMMARY")
+    for s in summaries:
+        print(f"  {s['run_id']}: {s['status']}"
+              + (f" ({s['friction_type']})" if s.get("friction_type") else "")
+              + (f" — {s['error']}" if s.get("error") else ""))
+    cache = get_screen_cache()
+    if cache is not None:
+        print(f"  screen cache: {cache.hits} hits / {cache.misses} misses")
+    print(f"  sessions: {session_pool.stats()}")
+
+    return summaries
 
 
 # -------------------------
@@ -106,6 +330,7 @@ Select test case:
 1 - Login button issue
 2 - Contact Us form issue
 3 - Buy flow issue
+4 - All of the above, in parallel
 """)
 
     choice = input("Enter choice: ").strip()
@@ -116,6 +341,10 @@ Select test case:
         "3": "buy"
     }
 
+    if choice == "4":
+        run_parallel(list(TEST_CASES.values()))
+        exit(0)
+
     if choice not in TEST_CASES:
         print("❌ Invalid choice")
         exit(1)
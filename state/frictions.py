@@ -1,23 +1,210 @@
-def detect_friction(state):
-    """
-    Detect if the agent is experiencing friction (stuck/confused).
-    Returns (is_stuck: bool, friction_type: str | None)
-    """
+"""
+Friction rules: when is the agent stuck?
+
+Rules live in config/frictions.json (SPECTER_FRICTION_RULES points
+elsewhere). Each rule compares one StateSnapshot field to a threshold:
+
+    {"friction_type": "SCREEN_LOOP", "field": "screen_repeat_count",
+     "op": ">=", "threshold": 2, "window": 1, "severity": "P2"}
+
+`window` is how many consecutive evaluations the condition must hold
+before the rule fires. Rules are checked in file order and every match
+is returned, so the first match is the highest-priority one.
+
+A FrictionEngine keeps the window streaks and per-rule hit counters, so
+use one engine per run (evaluate) or per supervisor (evaluate_batch).
+"""
+
+import json
+import operator
+from dataclasses import dataclass
+
+from config.settings import FRICTION_RULES_PATH
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+OPS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def _missing(value) -> bool:
+    """None or NaN: the field has no value this step, so no rule matches it."""
+    return value is None or value != value
+
+
+@dataclass(frozen=True)
+class FrictionRule:
+    friction_type: str
+    field: str
+    op: str
+    threshold: object
+    window: int = 1
+    severity: str = "P2"
+    name: str = ""
+
+    def __post_init__(self):
+        if self.op not in OPS:
+            raise ValueError(f"Unknown operator {self.op!r} in friction rule {self.friction_type}")
+        if self.window < 1:
+            raise ValueError(f"window must be >= 1 in friction rule {self.friction_type}")
+        if not self.name:
+            object.__setattr__(self, "name", self.friction_type)
+
+    def test(self, value) -> bool:
+        return not _missing(value) and bool(OPS[self.op](value, self.threshold))
+
+    def test_column(self, column):
+        """Vectorised test(): a NumPy bool array, False wherever the value is missing."""
+        values = np.asarray(column)
+        if values.dtype.kind == "O":
+            # None in the column: compare only the rows that have a value
+            present = np.array([not _missing(v) for v in values], dtype=bool)
+            condition = np.zeros(len(values), dtype=bool)
+            if present.any():
+                condition[present] = np.asarray(OPS[self.op](values[present], self.threshold), dtype=bool)
+            return condition
+        condition = np.asarray(OPS[self.op](values, self.threshold), dtype=bool)
+        if values.dtype.kind in "fc":
+            condition &= ~np.isnan(values)
+        return condition
+
+
+@dataclass(frozen=True)
+class FrictionMatch:
+    friction_type: str
+    severity: str
+    rule: str
+    value: object
+
 
-    # RULE 1: Too long on same screen
-    if state.get("time_on_screen", 0) > 15:
-        return True, "TIME_STUCK"
+_rules_cache = {}
 
-    # RULE 2: Too many attempts on same screen
-    if state.get("attempts_on_screen", 0) >= 3:
-        return True, "REPEATED_ACTIONS"
 
-    # RULE 3: Screen loop
-    if state.get("screen_repeat_count", 0) >= 2:
-        return True, "SCREEN_LOOP"
+def load_rules(path: str = FRICTION_RULES_PATH) -> tuple:
+    """Parse a rules file (cached per path)."""
+    if path not in _rules_cache:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        rules = tuple(FrictionRule(**rule) for rule in data.get("rules", []))
+        names = [r.name for r in rules]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Duplicate friction rule names in {path}; give each a unique 'name'")
+        _rules_cache[path] = rules
+    return _rules_cache[path]
 
-    # RULE 4: Action failed
-    if not state.get("action_succeeded", True):
-        return True, "ACTION_FAILED"
 
+def _field(state, name):
+    if isinstance(state, dict):
+        return state.get(name)
+    return getattr(state, name, None)
+
+
+class FrictionEngine:
+    def __init__(self, rules=None):
+        self.rules = tuple(rules) if rules is not None else load_rules()
+        self.hits = {rule.name: 0 for rule in self.rules}
+        self.evaluations = 0
+        self._streaks = {rule.name: 0 for rule in self.rules}
+        self._batch_streaks = None
+
+    @classmethod
+    def from_config(cls, path: str = FRICTION_RULES_PATH):
+        return cls(load_rules(path))
+
+    def evaluate(self, state) -> list:
+        """
+        Check every rule against one snapshot (StateSnapshot or dict).
+        Returns all FrictionMatches, in rule order.
+        """
+        self.evaluations += 1
+        matches = []
+        for rule in self.rules:
+            value = _field(state, rule.field)
+            streak = self._streaks[rule.name] + 1 if rule.test(value) else 0
+            self._streaks[rule.name] = streak
+            if streak >= rule.window:
+                self.hits[rule.name] += 1
+                matches.append(FrictionMatch(rule.friction_type, rule.severity, rule.name, value))
+        return matches
+
+    def evaluate_batch(self, columns, reset: bool = False) -> dict:
+        """
+        Check every rule against many sessions at once.
+
+        `columns` maps field name -> sequence (NumPy array or list), one
+        row per session, or is a list of snapshots. Row i must be the same
+        session on every call for windows to carry over; a change in row
+        count (or reset=True) starts the streaks again.
+
+        Returns {rule name: boolean mask}. Masks are NumPy arrays when
+        NumPy is installed, lists otherwise.
+        """
+        if not isinstance(columns, dict):
+            columns = to_columns(columns, {rule.field for rule in self.rules})
+        rows = len(next(iter(columns.values()))) if columns else 0
+
+        if reset or self._batch_streaks is None or self._batch_streaks[0] != rows:
+            zeros = (lambda: np.zeros(rows, dtype=np.int64)) if np is not None else (lambda: [0] * rows)
+            self._batch_streaks = (rows, {rule.name: zeros() for rule in self.rules})
+        streaks = self._batch_streaks[1]
+
+        self.evaluations += rows
+        masks = {}
+        for rule in self.rules:
+            column = columns.get(rule.field)
+            if column is None:
+                condition = [False] * rows
+            elif np is not None:
+                condition = rule.test_column(column)
+            else:
+                condition = [rule.test(v) for v in column]
+
+            if np is not None:
+                streak = np.where(condition, streaks[rule.name] + 1, 0)
+                fired = streak >= rule.window
+                self.hits[rule.name] += int(fired.sum())
+            else:
+                streak = [s + 1 if c else 0 for s, c in zip(streaks[rule.name], condition)]
+                fired = [s >= rule.window for s in streak]
+                self.hits[rule.name] += sum(fired)
+            streaks[rule.name] = streak
+            masks[rule.name] = fired
+        return masks
+
+    def reset(self):
+        """Forget window streaks (hit counters are kept)."""
+        self._streaks = {rule.name: 0 for rule in self.rules}
+        self._batch_streaks = None
+
+    def stats(self) -> dict:
+        return {"evaluations": self.evaluations, "hits": dict(self.hits)}
+
+
+def to_columns(snapshots, fields) -> dict:
+    """Turn a list of snapshots into {field: column} for evaluate_batch."""
+    columns = {field: [_field(s, field) for s in snapshots] for field in fields}
+    if np is not None:
+        columns = {field: np.asarray(values) for field, values in columns.items()}
+    return columns
+
+
+def detect_friction(state):
+    """
+    Detect if the agent is experiencing friction (stuck/confused).
+
+    One-off check with the configured rules (no window history).
+    Returns (is_stuck: bool, friction_type: str | None)
+    """
+    matches = FrictionEngine().evaluate(state)
+    if matches:
+        return True, matches[0].friction_type
     return False, None
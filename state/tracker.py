@@ -1,18 +1,47 @@
 import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass
+
+# How many recent screens a snapshot carries
+HISTORY_LENGTH = 5
+
+
+@dataclass(slots=True, frozen=True)
+class StateSnapshot:
+    """What the tracker knows after one step (this is what detect_friction reads)."""
+    current_screen_id: str
+    time_on_screen: float
+    screen_repeat_count: int
+    attempts_on_screen: int
+    last_action: str | None
+    history: tuple
+    action_succeeded: bool
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["history"] = list(self.history)
+        return data
+
 
 class StateTracker:
-    def __init__(self):
-        #Runs once when we create the tracker
-        #It's like opening a fresh notebook
+    """
+    Per-run screen state. Every update is O(1) and the tracker stays the
+    same size however long the run is: visits live in a Counter, recent
+    screens in a fixed-size ring buffer.
+    """
 
-        self.current_screen_id = None 
-        self.screen_enter_time = None      #when did I arrive here?
-        self.screen_history = []           #where have i been ?( a list)
-        self.attempts_on_screen = 0
-        self.last_actions = None
+    __slots__ = ("current_screen_id", "screen_enter_time", "screen_visits",
+                 "screen_history", "attempts_on_screen", "last_action")
 
-    def update(self,vision_output, action_result):
+    def __init__(self, history_length: int = HISTORY_LENGTH):
+        self.current_screen_id = None
+        self.screen_enter_time = None                           # monotonic, when did I arrive here?
+        self.screen_visits = Counter()                          # screen -> times entered
+        self.screen_history = deque(maxlen=history_length)      # where have I been recently?
+        self.attempts_on_screen = 0
+        self.last_action = None
 
+    def update(self, vision_output, action_result) -> StateSnapshot:
         '''
        Update state after an action
 
@@ -20,43 +49,33 @@ class StateTracker:
                 vision_output: dict with "screen_type" from vision.py
                 action_result: dict with "success" from actions.py
 
-        Returns: 
-            dict: Current state metrics
+        Returns:
+            StateSnapshot: Current state metrics
         '''
-        # to extract the current screen from screenshot
-        screen_type = vision_output.get("screen_type","unknown")
+        screen_type = vision_output.get("screen_type", "unknown")
+        now = time.monotonic()
 
-        #to check if the screen changed
         if screen_type != self.current_screen_id:
-            # Its a new screen, so we reset all the counters
+            # New screen, so we reset the per-screen counters
             self.current_screen_id = screen_type
-            self.screen_enter_time = time.time()
+            self.screen_enter_time = now
             self.attempts_on_screen = 0
+            self.screen_visits[screen_type] += 1
             self.screen_history.append(screen_type)
         else:
-            # Same screen, increments how many times on the same screen
+            # Same screen, one more attempt on it
             self.attempts_on_screen += 1
 
-        # Calcultate time on current screen
-        if self.screen_enter_time:
-            time_on_screen = time.time() - self.screen_enter_time
-        else:
-            time_on_screen = 0
-        
-        #Count how many times we have already seen this screen
-        screen_repeat_count = self.screen_history.count(self.current_screen_id)
-
-        #Build state snapshot
-        return {
-            "Current_screen_id": self.current_screen_id,
-            "time_on_Screen": round(time_on_screen, 1),
-            "Screen_repeat_count": screen_repeat_count,
-            "Attempts_on_screen":self.attempts_on_screen,
-            "last_action":self.last_actions,
-            "history":self.screen_history[-5:], # only last 5 screens
-            "action_succeeded": action_result.get("success", False)
-        }
-    
+        return StateSnapshot(
+            current_screen_id=self.current_screen_id,
+            time_on_screen=round(now - self.screen_enter_time, 1),
+            screen_repeat_count=self.screen_visits[self.current_screen_id],
+            attempts_on_screen=self.attempts_on_screen,
+            last_action=self.last_action,
+            history=tuple(self.screen_history),
+            action_succeeded=action_result.get("success", False),
+        )
+
     def set_last_action(self, action):
         """Remember what action we just tried."""
-        self.last_actions = action.get("action")
\ No newline at end of file
+        self.last_action = action.get("action")
@@ -0,0 +1,38 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+_repo_root = Path(__file__).resolve().parent.parent
+if str(_repo_root) not in sys.path:
+    sys.path.insert(0, str(_repo_root))
+
+# ai-agents/ is deployed as the `ai` package; outside such a checkout, import it under that name
+if "ai" not in sys.modules and importlib.util.find_spec("ai") is None:
+    _spec = importlib.util.spec_from_file_location(
+        "ai", _repo_root / "ai-agents" / "__init__.py",
+        submodule_search_locations=[str(_repo_root / "ai-agents")])
+    sys.modules["ai"] = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(sys.modules["ai"])
+
+import main
+from agent.mock_ai import ScriptedVision
+from benchmarks.agent_loop import script_for
+
+
+@pytest.fixture
+def scripted_flow(monkeypatch):
+    """
+    Call with a flow name before run_agent_loop: the loop then sees that
+    flow's scripted screens instead of calling the model, and runs without
+    the on-disk screen cache.
+    """
+    monkeypatch.setattr(main, "get_screen_cache", lambda: None)
+
+    def install(flow):
+        vision = ScriptedVision([{"screen_type": s, "elements": [s.upper()]} for s in script_for(flow)])
+        monkeypatch.setattr(main, "analyze_screen", vision)
+        return vision
+
+    return install
@@ -0,0 +1,29 @@
+from controller.actions import execute_action
+from controller.fake_driver import FakeDriver
+
+
+class OrderedDriver(FakeDriver):
+    def __init__(self):
+        super().__init__()
+        self.log = []
+
+    def tap(self, positions, duration=None):
+        self.log.append("tap")
+        super().tap(positions, duration)
+
+    def execute_script(self, script, *args):
+        self.log.append(script)
+        super().execute_script(script, *args)
+
+    @property
+    def page_source(self):
+        if self.log[-1:] != ["source"]:
+            self.log.append("source")
+        return FakeDriver.page_source.fget(self)
+
+
+def test_type_settles_between_focus_tap_and_typing():
+    driver = OrderedDriver()
+    result = execute_action(driver, {"action": "type", "target": "EMAIL", "text": "a@b.c"})
+    assert result["success"] and result["settled"]
+    assert driver.log == ["tap", "source", "mobile: type", "source"]
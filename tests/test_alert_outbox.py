@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("slack_sdk")   # ai.routing delivers through ai.alerts
+
+from ai.models.report import IssueReport, Severity, Team
+from ai.routing.fingerprint import normalize_root_cause, report_fingerprint
+from ai.routing.outbox import BACKENDS, AlertOutbox, OutboxWorkerPool
+from ai.routing.types import RoutedAlert
+
+
+def routed(test_id="run-1", root_cause="Submit returns 500 at 12:03:44 for order 8812", **metadata):
+    report = IssueReport(
+        title="Checkout fails", severity=Severity.P1, team=Team.BACKEND, category="checkout",
+        impact="No orders", root_cause=root_cause, reproduction_steps=["Pay"],
+        expected_behavior="Order placed", actual_behavior="Error page", recommended_actions=["Fix"],
+        metadata={"screen_type": "payment", "friction_type": "ACTION_FAILED", **metadata},
+    )
+    return RoutedAlert(report=report, screenshot_url="https://s/1.png", test_id=test_id)
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = AlertOutbox(tmp_path / "outbox.sqlite3", base_backoff=60.0, max_attempts=2, update_delay=0.0)
+    yield box
+    box.close()
+
+
+def test_fingerprint_ignores_run_noise():
+    assert normalize_root_cause("Timeout after 30s at https://a/b?x=1") == "timeout after <n>s at <url>"
+    first = report_fingerprint(routed().report)
+    assert report_fingerprint(routed(root_cause="Submit returns 500 at 09:15:02 for order 9").report) == first
+    assert report_fingerprint(routed(screen_type="cart").report) != first
+
+
+def test_enqueue_is_idempotent(outbox):
+    alert_id = outbox.enqueue(routed())
+    assert outbox.enqueue(routed()) == alert_id
+    assert outbox.counts()["pending"] == len(BACKENDS)
+    assert set(outbox.status(alert_id)) == set(BACKENDS)
+
+
+def test_expired_lease_is_claimed_again(outbox):
+    outbox.enqueue(routed())
+    first = outbox.claim("a", lease_seconds=0.01)
+    assert len(first) == len(BACKENDS)
+    assert outbox.claim("b") == []
+    time.sleep(0.02)
+    second = outbox.claim("b")
+    assert {d.backend for d in second} == set(BACKENDS)
+    # The first owner lost its lease and can't settle the delivery any more
+    assert not outbox.complete(first[0], "late")
+    assert outbox.complete(second[0], "link")
+    assert outbox.status(second[0].alert_id)[second[0].backend]["permalink"] == "link"
+
+
+def test_failures_back_off_then_give_up(tmp_path):
+    box = AlertOutbox(tmp_path / "outbox.sqlite3", backends=["slack"], base_backoff=0.05, max_attempts=2)
+    alert_id = box.enqueue(routed())
+    (delivery,) = box.claim("a")
+    assert box.fail(delivery, "503") == "pending"
+    assert box.claim("a") == []   # backing off
+    time.sleep(0.06)
+    (delivery,) = box.claim("a")
+    assert delivery.attempts == 1
+    assert box.fail(delivery, "503 again") == "failed"
+    assert box.status(alert_id)["slack"] == {"state": "failed", "attempts": 2, "permalink": None, "error": "503 again"}
+    box.close()
+
+
+def test_duplicates_fold_into_one_alert(outbox):
+    alert_id = outbox.enqueue(routed("run-1"))
+    assert outbox.enqueue(routed("run-2", root_cause="Submit returns 500 at 13:00:00 for order 1")) == alert_id
+    assert outbox.enqueue(routed("run-3")) == alert_id
+    assert outbox.occurrences(alert_id) == 3
+    assert outbox.dedupe_stats() == {"fingerprints": 1, "suppressed": 2}
+    # One coalesced update per updatable backend, no new sends
+    status = outbox.status(alert_id)
+    assert sorted(k for k in status if k.endswith(":update")) == ["slack:update", "webhook:update"]
+    assert outbox.counts()["pending"] == len(BACKENDS) + 2
+
+
+def test_outside_the_window_is_a_new_alert(tmp_path):
+    box = AlertOutbox(tmp_path / "outbox.sqlite3", dedupe_window=0.01)
+    first = box.enqueue(routed("run-1"))
+    time.sleep(0.02)
+    assert box.enqueue(routed("run-2")) != first
+    box.close()
+
+
+class _Backend:
+    def __init__(self, name):
+        self.name = name
+        self.sent = []
+        self.updates = []
+        self._lock = threading.Lock()
+
+    def rate_key(self, report):
+        return "test-channel"
+
+    def deliver(self, report, screenshot_url, test_id):
+        with self._lock:
+            self.sent.append(report.metadata["idempotency_key"])
+        return f"{self.name}:permalink"
+
+    def update(self, report, screenshot_url, test_id, permalink, occurrences):
+        with self._lock:
+            self.updates.append((permalink, occurrences, report.metadata["idempotency_key"]))
+        return f"{self.name}:updated"
+
+
+def test_workers_deliver_once_and_update_the_original(outbox):
+    backends = {name: _Backend(name) for name in BACKENDS}
+    with OutboxWorkerPool(outbox, backends, workers=2, poll_interval=0.05) as pool:
+        alert_id = outbox.enqueue(routed("run-1"))
+        assert pool.drain(timeout=10)
+        outbox.enqueue(routed("run-2"))
+        assert pool.drain(timeout=10)
+
+    for name, backend in backends.items():
+        assert len(backend.sent) == 1
+        assert backend.sent[0].endswith(f":{name}")
+        assert outbox.status(alert_id)[name]["state"] == "sent"
+    assert backends["slack"].updates == [("slack:permalink", 2, backends["slack"].sent[0] + ":2")]
+    assert backends["webhook"].updates[0][:2] == ("webhook:permalink", 2)
+    assert backends["teams"].updates == backends["discord"].updates == []
@@ -0,0 +1,124 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("slack_sdk")   # ai.alerts imports the Slack backend
+
+from ai.alerts.backends import DiscordAlertBackend, TeamsAlertBackend, WebhookAlertBackend
+from ai.alerts.ratelimit import RateLimiter, RetryLater
+from ai.alerts.transport import HttpResponse, HttpTransport, PoolTimeoutError
+from ai.models.report import IssueReport, Severity, Team
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.delay)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.delay = 0.0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(httpd):
+    return f"http://127.0.0.1:{httpd.server_address[1]}/hook"
+
+
+def test_connections_are_reused(server):
+    transport = HttpTransport()
+    for _ in range(5):
+        assert transport.post_json(url(server), {"n": 1}).status == 200
+    assert transport.stats() == {"requests": 5, "connections_opened": 1, "idle_connections": 1}
+    transport.close()
+    assert transport.stats()["idle_connections"] == 0
+
+
+def test_idle_connections_expire(server):
+    transport = HttpTransport(idle_timeout=0.05)
+    transport.post_json(url(server), {})
+    time.sleep(0.1)
+    transport.post_json(url(server), {})
+    assert transport.stats()["connections_opened"] == 2
+
+
+def test_full_pool_times_out(server):
+    server.delay = 0.5
+    transport = HttpTransport(max_per_host=1, pool_timeout=0.05)
+    busy = threading.Thread(target=transport.post_json, args=(url(server), {}))
+    busy.start()
+    time.sleep(0.1)
+    with pytest.raises(PoolTimeoutError):
+        transport.post_json(url(server), {})
+    busy.join()
+
+
+def report():
+    return IssueReport(
+        title="Checkout fails", severity=Severity.P1, team=Team.BACKEND, category="checkout",
+        impact="No orders", root_cause="500 from /pay", reproduction_steps=["Pay"],
+        expected_behavior="Order placed", actual_behavior="Error page", recommended_actions=["Fix"],
+    )
+
+
+class _ScriptedTransport:
+    """Fails or answers from a script, one entry per request."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+
+    def post_json(self, url, payload, headers=None):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return HttpResponse(status=outcome)
+
+
+BACKENDS = [
+    lambda t: DiscordAlertBackend("https://discord.test/hook", transport=t),
+    lambda t: TeamsAlertBackend("https://teams.test/hook", transport=t),
+    lambda t: WebhookAlertBackend("https://jira.test/hook", transport=t),
+]
+
+
+@pytest.mark.parametrize("make", BACKENDS)
+@pytest.mark.parametrize("error", [TimeoutError("read timed out"), ConnectionResetError(), PoolTimeoutError("busy"), 503])
+def test_transient_failures_are_retried(make, error):
+    backend = make(_ScriptedTransport(error))
+    with pytest.raises(RetryLater):
+        backend.deliver(report(), "", "t1")
+
+
+@pytest.mark.parametrize("make", BACKENDS)
+def test_client_errors_are_permanent(make):
+    backend = make(_ScriptedTransport(400))
+    with pytest.raises(RuntimeError):
+        backend.deliver(report(), "", "t1")
+
+
+@pytest.mark.parametrize("make", BACKENDS)
+def test_limiter_redelivers_after_a_reset(make):
+    backend = make(_ScriptedTransport(ConnectionResetError(), 200))
+    limiter = RateLimiter(base_backoff=0.01)
+    future = limiter.submit("test", "hook", backend.deliver, report(), "", "t1")
+    assert future.result(timeout=5)
+    assert limiter.stats()["retries"] == 1
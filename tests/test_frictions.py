@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from state import frictions
+from state.frictions import FrictionEngine, FrictionRule, detect_friction
+
+RULES = [
+    FrictionRule("SCREEN_LOOP", "screen_repeat_count", ">=", 2),
+    FrictionRule("TIME_STUCK", "time_on_screen", ">", 15, window=2, severity="P1"),
+    FrictionRule("ERROR_SCREEN", "screen_type", "==", "error", severity="P0"),
+]
+
+# Three sessions over four steps; None and NaN are fields with no value yet
+STEPS = [
+    {"screen_repeat_count": [0, None, 3], "time_on_screen": [20.0, math.nan, 1.0], "screen_type": ["home", None, "error"]},
+    {"screen_repeat_count": [2, 2, None], "time_on_screen": [30.0, 16.0, None], "screen_type": ["error", "home", None]},
+    {"screen_repeat_count": [None, 5, 1], "time_on_screen": [math.nan, 40.0, 16.0], "screen_type": [None, None, "home"]},
+    {"screen_repeat_count": [1, 0, 2], "time_on_screen": [16.0, 17.0, 18.0], "screen_type": ["home", "error", "error"]},
+]
+
+
+def test_evaluate_windows_and_counts():
+    engine = FrictionEngine(RULES)
+    assert engine.evaluate({"time_on_screen": 20}) == []
+    (match,) = engine.evaluate({"time_on_screen": 21})
+    assert (match.friction_type, match.severity, match.value) == ("TIME_STUCK", "P1", 21)
+    # A missing value breaks the streak like a non-match
+    assert engine.evaluate({"time_on_screen": None}) == []
+    assert engine.evaluate({"time_on_screen": 22}) == []
+    assert engine.stats() == {"evaluations": 4, "hits": {"SCREEN_LOOP": 0, "TIME_STUCK": 1, "ERROR_SCREEN": 0}}
+
+
+def test_detect_friction_uses_configured_rules():
+    assert detect_friction({"screen_repeat_count": 5}) == (True, "SCREEN_LOOP")
+    assert detect_friction({}) == (False, None)
+
+
+@pytest.fixture(params=["numpy", "lists"])
+def batch_path(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(frictions, "np", None)
+    return request.param
+
+
+def test_batch_agrees_with_evaluate(batch_path):
+    batch = FrictionEngine(RULES)
+    singles = [FrictionEngine(RULES) for _ in range(3)]
+    for columns in STEPS:
+        masks = batch.evaluate_batch(columns)
+        for row, engine in enumerate(singles):
+            fired = {m.rule for m in engine.evaluate({f: col[row] for f, col in columns.items()})}
+            assert {name for name, mask in masks.items() if mask[row]} == fired
+    assert batch.hits == {
+        name: sum(engine.hits[name] for engine in singles) for name in batch.hits
+    }
+
+
+def test_batch_accepts_snapshots(batch_path):
+    engine = FrictionEngine(RULES)
+    masks = engine.evaluate_batch([{"screen_repeat_count": 4}, {"screen_type": "error"}, {}])
+    assert [bool(v) for v in masks["SCREEN_LOOP"]] == [True, False, False]
+    assert [bool(v) for v in masks["ERROR_SCREEN"]] == [False, True, False]
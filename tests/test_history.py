@@ -0,0 +1,67 @@
+from google.genai.types import Content, FunctionCall, FunctionResponse, FunctionResponseBlob, FunctionResponsePart, Part
+
+from agent.history import ConversationHistory, measure, turn_summary
+
+SCREENSHOT = b"\x89PNG" + b"\0" * 20_000
+
+
+def model_turn(i):
+    return Content(role="model", parts=[Part(function_call=FunctionCall(name="click_at", args={"x": i, "y": 10}))])
+
+
+def response_turn(i):
+    screenshot = FunctionResponsePart(inline_data=FunctionResponseBlob(mime_type="image/png", data=SCREENSHOT))
+    return Content(role="user", parts=[Part(function_response=FunctionResponse(
+        name="click_at", response={"url": f"https://shop/{i}"}, parts=[screenshot],
+    ))])
+
+
+def run(history, turns):
+    history.start("Buy the cheapest item", SCREENSHOT)
+    history.contents()
+    for i in range(1, turns + 1):
+        history.add_turn(model_turn(i), response_turn(i), summary=f"Turn {i}: screen=s{i}")
+        contents = history.contents()
+    return contents
+
+
+def test_window_keeps_last_screenshots_inline():
+    history = ConversationHistory(max_screenshots=2)
+    contents = run(history, 6)
+    stats = history.payload_log[-1]
+    assert (stats.inline_screenshots, stats.compacted_turns) == (2, 4)
+    text = "\n".join(p.text for c in contents for p in c.parts if p.text)
+    assert "Turn 4: screen=s4" in text and "Turn 5" not in text
+    # Newest turns are sent verbatim, oldest first
+    urls = [p.function_response.response["url"] for c in contents for p in c.parts if p.function_response]
+    assert urls == ["https://shop/5", "https://shop/6"]
+
+
+def test_payload_stays_flat():
+    history = ConversationHistory(max_screenshots=2)
+    run(history, 20)
+    sizes = [s.bytes for s in history.payload_log]
+    assert max(s.inline_screenshots for s in history.payload_log) <= 2
+    assert sizes[-1] < sizes[3] + 2_000   # only the summary lines grow
+
+
+def test_byte_budget_compacts_more():
+    history = ConversationHistory(max_screenshots=3, max_bytes=45_000)
+    run(history, 5)
+    stats = history.payload_log[-1]
+    assert stats.bytes <= 45_000
+    assert stats.inline_screenshots == 2
+
+
+def test_budget_always_keeps_the_newest_turn():
+    history = ConversationHistory(max_screenshots=3, max_bytes=1)
+    contents = run(history, 3)
+    assert history.payload_log[-1].compacted_turns == 2
+    assert measure(contents)[2] == 1
+
+
+def test_turn_summary():
+    line = turn_summary(3, [{"screen_type": "cart", "elements": ["Checkout", "Remove"]}],
+                        [FunctionCall(name="click_at", args={"x": 5, "y": 9}), FunctionCall(name="go_back")],
+                        "https://shop/cart")
+    assert line == "Turn 3: screen=cart; elements=Checkout, Remove; action=click_at(5,9), go_back; url=https://shop/cart"
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from agent import computer_use
+from agent.computer_use import extract_json_from_text, extract_json_objects
+
+ANALYSIS = {"screen_type": "login", "elements": ["Email"], "confidence": 0.9}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1} prose {"b": {"c": 2}}', [{"a": 1}, {"b": {"c": 2}}]),
+    ('```json\n{"screen_type": "login"}\n```', [{"screen_type": "login"}]),
+    ('{"s": "}{"} {"t": "\\"}"}', [{"s": "}{"}, {"t": '"}'}]),
+    # Unclosed prefix: the objects inside it are still found
+    ('{ {"a": 1} {"b": 2}', [{"a": 1}, {"b": 2}]),
+    # Invalid outer object: its valid inner object is salvaged
+    ('{"a": {"b": 1} "c": 2} {"d": 3}', [{"b": 1}, {"d": 3}]),
+    ('{"a": x} {"b": 1}', [{"b": 1}]),
+    ("no json here", []),
+])
+def test_extract_json_objects(text, expected):
+    assert extract_json_objects(text) == expected
+
+
+def test_screen_analysis_found_at_any_depth():
+    text = 'Thinking... {"meta": 1} then {"result": ' + json.dumps(ANALYSIS) + "}"
+    assert extract_json_from_text(text) == ANALYSIS
+
+
+class _CountingDecoder:
+    """Counts characters the decoder touches, including a failed decode's rescan to its position."""
+
+    def __init__(self):
+        self.chars = 0
+
+    def raw_decode(self, text, idx=0):
+        try:
+            obj, end = computer_use.json.JSONDecoder().raw_decode(text, idx)
+        except json.JSONDecodeError as e:
+            self.chars += e.pos   # building the error counts lines from 0
+            raise
+        self.chars += end - idx
+        return obj, end
+
+
+@pytest.mark.parametrize("unit", ['{"a": x} ', '{"a": {"b": {"c": x}}} '])
+def test_invalid_objects_decode_in_linear_work(monkeypatch, unit):
+    work = {}
+    for copies in (1000, 8000):
+        decoder = _CountingDecoder()
+        monkeypatch.setattr(computer_use, "_DECODER", decoder)
+        text = unit * copies + json.dumps(ANALYSIS)
+        assert extract_json_from_text(text) == ANALYSIS
+        work[copies] = decoder.chars / len(text)
+    # Work per character stays flat as the text grows 8x
+    assert work[8000] < 2 * work[1000] + 1
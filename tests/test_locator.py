@@ -0,0 +1,73 @@
+import pytest
+
+from controller.actions import COORDINATES, execute_action
+from controller.fake_driver import FakeDriver
+from controller.locator import Locator, find_target, normalize_label
+
+TARGETS = [
+    {"label": "Log in", "x": 500, "y": 250},
+    {"label": "Buy now", "x": 100, "y": 900},
+    {"label": "Broken", "x": "left", "y": 1},
+    {"label": "Off screen", "x": 1200, "y": 10},
+]
+
+
+def test_normalize_label():
+    assert normalize_label("Contact us") == normalize_label("contact-us") == "CONTACT_US"
+
+
+@pytest.mark.parametrize("target, expected", [
+    ("LOG_IN", (500.0, 250.0)),
+    ("BUY", (100.0, 900.0)),      # whole word of "BUY_NOW"
+    ("NOW", (100.0, 900.0)),
+    ("LOG", (500.0, 250.0)),
+    ("BUYN", None),               # not a whole word
+    ("BROKEN", None),             # malformed entries are skipped
+    ("OFF_SCREEN", None),         # outside 0-1000
+])
+def test_find_target(target, expected):
+    assert find_target(TARGETS, target) == expected
+
+
+def test_exact_label_beats_partial():
+    targets = [{"label": "Buy now", "x": 1, "y": 1}, {"label": "Buy", "x": 2, "y": 2}]
+    assert find_target(targets, "BUY") == (2.0, 2.0)
+
+
+def test_locate_scales_caches_and_falls_back():
+    driver = FakeDriver()   # 1080 x 2400
+    locator = Locator()
+    locator.observe("screen-a", {"targets": TARGETS})
+    assert locator.locate(driver, "LOG_IN") == ((540, 600), "vision")
+    assert locator.locate(driver, "LOG_IN") == ((540, 600), "cache")
+    # Unknown on this screen: the static table, and the miss is cached too
+    assert locator.locate(driver, "LOGIN") == (COORDINATES["LOGIN"], "static")
+    assert locator.locate(driver, "LOGIN") == (COORDINATES["LOGIN"], "static")
+    assert locator.stats() == {"cache_hits": 2, "resolved": 1, "fallbacks": 2}
+
+    locator.observe("screen-b", {"targets": [{"label": "Log in", "x": 0, "y": 1000}]})
+    assert locator.locate(driver, "LOG_IN") == ((0, 2400), "vision")
+    with pytest.raises(KeyError):
+        locator.locate(driver, "NOT_A_TARGET")
+
+
+def test_cache_is_bounded():
+    locator = Locator(max_entries=2)
+    driver = FakeDriver()
+    for fingerprint in ("a", "b", "c"):
+        locator.observe(fingerprint, {"targets": [{"label": "Login", "x": 500, "y": 500}]})
+        locator.locate(driver, "LOGIN")
+    # "a" was evicted, "c" is still cached
+    locator.observe("a", {"targets": []})
+    assert locator.locate(driver, "LOGIN") == (COORDINATES["LOGIN"], "static")
+    locator.observe("c", {"targets": []})
+    assert locator.locate(driver, "LOGIN") == ((540, 1200), "cache")
+
+
+def test_execute_action_reports_where_the_point_came_from():
+    locator = Locator()
+    locator.observe("screen-a", {"targets": TARGETS})
+    result = execute_action(FakeDriver(), {"action": "tap", "target": "BUY"}, locator=locator)
+    assert (result["success"], result["locator"], result["point"]) == (True, "vision", (108, 2160))
+    replayed = execute_action(FakeDriver(), {"action": "tap", "target": "BUY", "point": [1, 2]}, locator=locator)
+    assert (replayed["locator"], replayed["point"]) == ("trace", (1, 2))
@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("slack_sdk")   # ai.alerts imports the Slack backend
+
+from ai.alerts.ratelimit import (
+    RateLimited, RateLimiter, RetryLater, TokenBucket, retry_after, send_and_wait, send_limited,
+)
+
+
+def test_bucket_spends_burst_then_spaces_at_rate():
+    bucket = TokenBucket(rate=10.0, burst=3)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.1, abs=0.02)
+    assert waits[4] == pytest.approx(0.2, abs=0.02)
+
+
+def test_bucket_hold_pauses_refill():
+    bucket = TokenBucket(rate=100.0, burst=5)
+    bucket.hold(0.5)
+    assert bucket.held_for() == pytest.approx(0.5, abs=0.05)
+    assert bucket.reserve() == pytest.approx(0.51, abs=0.05)
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "3"}, 3.0),
+    ({"x-ratelimit-reset-after": "0.25"}, 0.25),
+    ({"Retry-After": "soon"}, None),
+    ({}, None),
+])
+def test_retry_after(headers, expected):
+    assert retry_after(headers) == expected
+
+
+def test_retries_then_gives_up():
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        raise RetryLater(None, "503")
+
+    limiter = RateLimiter(max_retries=2, base_backoff=0.01)
+    with pytest.raises(RetryLater):
+        limiter.submit("test", "c", flaky).result(timeout=5)
+    assert len(attempts) == 3
+    assert limiter.stats()["retries"] == 2
+
+
+def test_rate_limited_holds_the_bucket():
+    calls = []
+
+    def send():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RateLimited(0.2)
+        return "ok"
+
+    limiter = RateLimiter()
+    assert limiter.submit("test", "c", send).result(timeout=5) == "ok"
+    assert calls[1] - calls[0] >= 0.19
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_hung_backend_keeps_to_its_in_flight_cap():
+    release = threading.Event()
+    limiter = RateLimiter(limits={"hung": (1000.0, 100), "ok": (1000.0, 100)}, max_workers=3, max_in_flight=2)
+    hung = [limiter.submit("hung", "c", release.wait) for _ in range(6)]
+    time.sleep(0.1)
+    stats = limiter.stats()
+    assert (stats["in_flight"], stats["waiting"]) == (2, 4)
+
+    # Another backend still gets a worker
+    assert limiter.submit("ok", "c", lambda: "sent").result(timeout=1) == "sent"
+    # A send still waiting for a slot can be cancelled
+    assert hung[-1].cancel()
+
+    release.set()
+    assert all(f.result(timeout=5) for f in hung[:-1])
+    stats = limiter.stats()
+    assert (stats["in_flight"], stats["waiting"], stats["sent"]) == (0, 0, 6)
+
+
+class _Backend:
+    def rate_key(self, report):
+        return "c"
+
+    def deliver(self, report, screenshot_url, test_id):
+        time.sleep(0.05)
+        return f"sent:{test_id}"
+
+    def send(self, report, screenshot_url, test_id):
+        return send_limited("test", self, report, screenshot_url, test_id)
+
+
+def test_send_returns_a_future_and_waiting_is_opt_in():
+    backend = _Backend()
+    future = backend.send(None, "", "t1")
+    assert isinstance(future, Future) and not future.done()
+    assert future.result(timeout=5) == "sent:t1"
+    assert send_and_wait(backend, None, "", "t2", timeout=5) == "sent:t2"
@@ -0,0 +1,65 @@
+import pytest
+from google.genai import types
+
+from ai.replay import ReplayClient, ReplayMiss, request_key
+
+
+def turn(screenshot_path):
+    response = {"url": "https://shop.example/login", "screenshot_path": screenshot_path}
+    return [
+        types.Content(role="user", parts=[types.Part(text="Log in")]),
+        types.Content(role="user", parts=[
+            types.Part(function_response=types.FunctionResponse(name="click_at", response=response)),
+        ]),
+    ]
+
+
+def test_request_key_ignores_per_run_paths():
+    first = request_key("m", turn("evidence/run-1/step_001.png"))
+    assert first == request_key("m", turn("evidence/run-2/step_001.png"))
+    # The rest of the function response still counts
+    other = turn("evidence/run-1/step_001.png")
+    other[1].parts[0].function_response.response["url"] = "https://shop.example/cart"
+    assert request_key("m", other) != first
+
+
+class _Models:
+    def generate_content(self, model, contents, config=None):
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text="ok")]))])
+
+
+class _Client:
+    models = _Models()
+    aio = None
+
+
+def test_recorded_turn_replays_in_a_later_run(tmp_path):
+    recorder = ReplayClient(_Client(), "record", tmp_path)
+    recorder.models.generate_content(model="m", contents=turn("evidence/run-1/step_002.png"))
+
+    replayer = ReplayClient(None, "replay", tmp_path)
+    response = replayer.models.generate_content(model="m", contents=turn("evidence/run-2/step_002.png"))
+    assert response.text == "ok"
+    with pytest.raises(ReplayMiss):
+        replayer.models.generate_content(model="m", contents="never recorded")
+    assert replayer.stats() == {"hits": 1, "misses": 1, "recorded": 0}
+
+
+def test_routing_does_not_swallow_replay_misses(monkeypatch):
+    pytest.importorskip("slack_sdk")
+    from ai.models.report import IssueReport, Severity, Team
+    from ai.routing import RoutingAgent
+
+    agent = RoutingAgent(gemini_api_key="test")
+
+    def miss(prompt):
+        raise ReplayMiss(prompt)
+
+    monkeypatch.setattr(agent, "_gemini_generate", miss)
+    report = IssueReport(
+        title="Checkout button unresponsive", severity=Severity.P1, team=Team.FRONTEND,
+        category="ui", impact="Users cannot pay", root_cause="click handler throws",
+        reproduction_steps=[], expected_behavior="", actual_behavior="", recommended_actions=[])
+    with pytest.raises(ReplayMiss):
+        agent.enrich(report, screenshot_url="", test_id="t1")
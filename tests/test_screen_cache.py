@@ -0,0 +1,110 @@
+import random
+import sqlite3
+
+import pytest
+
+from agent.screen_cache import ScreenCache, dhash, hamming, hash_bands
+from controller.fake_driver import make_png
+
+
+def flip(phash, bits):
+    for bit in bits:
+        phash ^= 1 << bit
+    return phash
+
+
+@pytest.mark.parametrize("count", [2, 5, 64])
+def test_hash_bands_cover_all_bits(count):
+    phash = random.Random(count).getrandbits(64)
+    bands = hash_bands(phash, count)
+    assert len(bands) == count
+    rebuilt = 0
+    for band, value in bands:
+        width = 64 // count + (band < 64 % count)
+        assert value < 1 << width
+        rebuilt = (rebuilt << width) | value
+    assert rebuilt == phash
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 4])
+def test_high_bit_hashes_store_and_match(max_distance):
+    # One 64-bit band would overflow SQLite's signed INTEGER
+    cache = ScreenCache(":memory:", max_distance=max_distance)
+    cache.store(0xF000000000000000, "", {"screen_type": "home"})
+    assert cache.lookup(0xF000000000000000, "") == {"screen_type": "home"}
+    assert cache.lookup(flip(0xF000000000000000, [0]), "") == (
+        {"screen_type": "home"} if max_distance else None
+    )
+
+
+def test_lookup_matches_brute_force():
+    rng = random.Random(7)
+    cache = ScreenCache(":memory:", max_distance=4)
+    hashes = [rng.getrandbits(64) for _ in range(2000)]
+    for h in hashes:
+        cache.store(h, "", {"h": h})
+
+    for _ in range(200):
+        query = flip(rng.choice(hashes), rng.sample(range(64), rng.randint(0, 6)))
+        best = min(hamming(query, h) for h in hashes)
+        result = cache.lookup(query, "")
+        if best <= 4:
+            assert result is not None and hamming(query, result["h"]) == best
+        else:
+            assert result is None
+
+
+def test_urls_are_separate_and_stats_count():
+    cache = ScreenCache(":memory:")
+    cache.store(123, "https://a/", {"screen_type": "a"})
+    assert cache.lookup(123, "https://b/") is None
+    assert cache.lookup(123, "https://a/") == {"screen_type": "a"}
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_eviction_drops_bands():
+    cache = ScreenCache(":memory:", max_entries=10)
+    hashes = [random.Random(i).getrandbits(64) for i in range(50)]
+    for i, h in enumerate(hashes):
+        cache.store(h, "", {"i": i})
+    (screens,) = cache._db.execute("SELECT COUNT(*) FROM screens").fetchone()
+    (bands,) = cache._db.execute("SELECT COUNT(*) FROM screen_bands").fetchone()
+    assert screens == 10
+    assert bands == 10 * cache.bands
+    assert cache.lookup(hashes[0], "") is None
+    assert cache.lookup(hashes[49], "") == {"i": 49}
+
+
+def test_rows_from_older_files_are_indexed(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE screens (id INTEGER PRIMARY KEY, url TEXT NOT NULL, phash TEXT NOT NULL,"
+               " result TEXT NOT NULL, last_used REAL NOT NULL)")
+    db.execute("INSERT INTO screens (url, phash, result, last_used) VALUES ('', ?, '{\"old\": 1}', 0)",
+               (f"{0xDEADBEEF12345678:016x}",))
+    db.commit()
+    db.close()
+
+    cache = ScreenCache(path)
+    assert cache.lookup(flip(0xDEADBEEF12345678, [3]), "") == {"old": 1}
+    cache.close()
+    # Another max_distance gets its own band layout over the same rows
+    cache = ScreenCache(path, max_distance=1)
+    assert cache.lookup(flip(0xDEADBEEF12345678, [3]), "") == {"old": 1}
+    cache.close()
+
+
+def test_analyze_calls_model_once_per_screen():
+    cache = ScreenCache(":memory:")
+    calls = []
+
+    def analyze(png):
+        calls.append(png)
+        return {"screen_type": f"s{len(calls)}"}
+
+    first, second = make_png(1), make_png(2)
+    assert dhash(first) != dhash(second)
+    assert cache.analyze(first, "", analyze) == ({"screen_type": "s1"}, False)
+    assert cache.analyze(first, "", analyze) == ({"screen_type": "s1"}, True)
+    assert cache.analyze(second, "", analyze) == ({"screen_type": "s2"}, False)
+    assert len(calls) == 2
@@ -0,0 +1,44 @@
+import main
+from agent.tracing import InMemoryExporter, set_exporter
+from controller.fake_driver import FakeDriver
+
+STEP_PHASES = ["decide", "execute", "screenshot", "vision", "state_update", "friction"]
+
+
+def test_agent_loop_span_tree(tmp_path, scripted_flow):
+    vision = scripted_flow("login")
+    exporter = InMemoryExporter()
+    previous = set_exporter(exporter)
+    try:
+        summary = main.run_agent_loop("login", driver=FakeDriver(screens=len(vision.screens) + 1),
+                                      run_id="trace-test", evidence_root=str(tmp_path), mode="live")
+    finally:
+        set_exporter(previous)
+
+    assert summary["status"] == "completed"
+    spans = exporter.spans
+    assert {s.run_id for s in spans} == {"trace-test"}
+    by_id = {s.span_id: s for s in spans}
+
+    (run,) = exporter.by_name("run")
+    assert run.parent_id is None
+    assert run.attributes["test_case"] == "login"
+
+    steps = sorted(exporter.by_name("step"), key=lambda s: s.attributes["step"])
+    assert [s.attributes["step"] for s in steps] == list(range(summary["steps"] + 1))
+    assert all(s.parent_id == run.span_id for s in steps)
+
+    def children(parent):
+        # Finish order is start order for siblings run one after another
+        return [s.name for s in spans if s.parent_id == parent.span_id]
+
+    *acting, last = steps
+    for step in acting:
+        assert children(step) == STEP_PHASES
+    # The flow ends when decide returns no intent
+    assert children(last) == ["decide"]
+
+    # Every phase span inherits its step's number
+    for s in spans:
+        if s.name in STEP_PHASES:
+            assert s.attributes["step"] == by_id[s.parent_id].attributes["step"]
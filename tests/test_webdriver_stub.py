@@ -0,0 +1,34 @@
+import main
+from controller.appium_driver import AppiumSessionPool, get_driver
+from controller.webdriver_stub import WebDriverStub
+
+
+def test_pool_and_agent_loop_against_stub(tmp_path, scripted_flow):
+    with WebDriverStub() as stub:
+        pool = AppiumSessionPool(max_sessions=1, driver_factory=lambda slot: get_driver(server_url=stub.url))
+        summaries = []
+        for flow in ("login", "contact"):
+            scripted_flow(flow)
+            driver = pool.acquire(timeout=10)
+            try:
+                summaries.append(main.run_agent_loop(flow, driver=driver, evidence_root=str(tmp_path), mode="live"))
+            finally:
+                pool.release(driver)
+        pool.close()
+
+        assert [s["status"] for s in summaries] == ["completed", "completed"]
+        assert pool.stats() == {"created": 1, "reused": 1, "discarded": 0}
+
+        calls = stub.calls
+        steps = sum(s["steps"] for s in summaries)
+        # One session, reused for the second flow and quit on close
+        assert calls["POST /session"] == 1
+        assert calls["DELETE /session/:id"] == 1
+        assert not stub.sessions
+        # Start URL loaded on creation, reloaded on reuse
+        assert calls["POST /session/:id/url"] == 2
+        # Every step takes one screenshot; taps and swipes go through W3C actions
+        assert calls["GET /session/:id/screenshot"] == steps
+        assert calls["POST /session/:id/actions"] >= steps
+        # Settling samples the page source, never extra screenshots
+        assert calls["GET /session/:id/source"] >= 3 * (steps + 2)